@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark the persistent cliclick co-process against fork-per-tick.
+
+Fork-per-tick runs a stand-in `cliclick` script once per tick, the way
+jiggly_puff.sh does. The co-process mode writes each tick as one batch to the
+dry-run pointer helper. Both skip the 100ms pause so only the call overhead
+is measured. Helper CPU time is read from /proc, so run this on Linux.
+Results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_cliclick.py [--ticks 1000] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import resource
+import stat
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jigglypuff import CliclickBackend  # noqa: E402
+
+STAND_IN_HELPER = [sys.executable, "-m", "jigglypuff.cliclick_helper", "--dry-run"]
+
+
+def _cpu(who: int) -> float:
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _helper_cpu(backend: CliclickBackend) -> float:
+    """CPU seconds used so far by the live helper process (Linux /proc)."""
+    if backend.coprocess is None:
+        return 0.0
+    with open(f"/proc/{backend.coprocess.pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _measure(backend: CliclickBackend, ticks: int) -> dict:
+    # Warm up so the co-process start-up is not counted as a tick
+    backend.jiggle(1)
+
+    latencies = []
+    self_before = _cpu(resource.RUSAGE_SELF)
+    children_before = _cpu(resource.RUSAGE_CHILDREN)
+    helper_before = _helper_cpu(backend)
+    for _ in range(ticks):
+        began = time.perf_counter()
+        backend.jiggle(1)
+        latencies.append(time.perf_counter() - began)
+    cpu = (_cpu(resource.RUSAGE_SELF) - self_before) + (
+        _cpu(resource.RUSAGE_CHILDREN) - children_before
+    ) + (_helper_cpu(backend) - helper_before)
+    backend.close()
+
+    latencies.sort()
+    return {
+        "ticks": ticks,
+        "latency_mean_us": round(statistics.mean(latencies) * 1e6, 1),
+        "latency_p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "latency_p99_us": round(latencies[int(len(latencies) * 0.99) - 1] * 1e6, 1),
+        "cpu_per_tick_us": round(cpu / ticks * 1e6, 1),
+    }
+
+
+def run(ticks: int) -> dict:
+    """Measure fork-per-tick and the co-process for ``ticks`` ticks each."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stand_in = os.path.join(tmp, "cliclick")
+        with open(stand_in, "w") as f:
+            f.write("#!/bin/sh\nexit 0\n")
+        os.chmod(stand_in, os.stat(stand_in).st_mode | stat.S_IEXEC)
+
+        fork_per_tick = _measure(
+            CliclickBackend(executable=stand_in, persistent=False, pause_ms=0), ticks
+        )
+
+    coprocess_backend = CliclickBackend(helper=STAND_IN_HELPER, pause_ms=0)
+    coprocess = _measure(coprocess_backend, ticks)
+    coprocess["helper_spawns"] = coprocess_backend.coprocess.spawns
+
+    return {
+        "fork_per_tick": fork_per_tick,
+        "coprocess": coprocess,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"benchmark": "cliclick_coprocess_vs_fork", **run(args.ticks)}
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process jiggle engine against the jiggly_puff.sh loop.
+
+Both run at the same short interval for the same wall-clock duration. The
+script gets a stand-in `cliclick` on PATH so it pays the real fork+exec cost
+without needing macOS. Results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_engine.py [--duration 3] [--interval 0.05] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jigglypuff import JiggleEngine, JiggleLog, RecordingBackend  # noqa: E402
+
+def _count_jiggles(path: str) -> int:
+    with open(path) as f:
+        return f.read().count("Mouse jiggled")
+
+
+def bench_script(duration: float, interval: float) -> dict:
+    """Run jiggly_puff.sh and measure its CPU time per tick, children included."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stand_in = os.path.join(tmp, "cliclick")
+        with open(stand_in, "w") as f:
+            f.write("#!/bin/sh\nexit 0\n")
+        os.chmod(stand_in, os.stat(stand_in).st_mode | stat.S_IEXEC)
+
+        log_path = os.path.join(tmp, "script.log")
+        env = dict(
+            os.environ,
+            PATH=f"{tmp}{os.pathsep}{os.environ.get('PATH', '')}",
+            JIGGLYPUFF_LOG=log_path,
+        )
+
+        began = time.monotonic()
+        proc = subprocess.Popen(
+            ["bash", os.path.join(ROOT, "jiggly_puff.sh"), str(interval), "1"], env=env
+        )
+        time.sleep(duration)
+        proc.send_signal(signal.SIGTERM)
+        _, _, usage = os.wait4(proc.pid, 0)
+        elapsed = time.monotonic() - began
+        ticks = _count_jiggles(log_path)
+
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        "ticks": ticks,
+        "elapsed_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 6),
+        "cpu_per_tick_us": round(cpu / ticks * 1e6, 1) if ticks else None,
+        # one cliclick + one date per tick, plus sleep
+        "forks_per_tick": 3,
+    }
+
+
+def bench_engine(duration: float, interval: float) -> dict:
+    """Run the engine with the recording backend and measure its CPU time per tick."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = JiggleEngine(
+            RecordingBackend(), interval, 1, log=JiggleLog(os.path.join(tmp, "jiggler.log"))
+        )
+        began = time.monotonic()
+        process_before = time.process_time()
+        engine.start()
+        time.sleep(duration)
+        engine.stop()
+        elapsed = time.monotonic() - began
+        cpu = time.process_time() - process_before
+        ticks = engine.ticks
+
+        # Cost of a single tick in isolation, log write included
+        calls = 10000
+        tick_began = time.perf_counter()
+        for _ in range(calls):
+            engine._tick(time.monotonic())
+        tick_cost = (time.perf_counter() - tick_began) / calls
+
+    return {
+        "ticks": ticks,
+        "elapsed_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 6),
+        "cpu_per_tick_us": round(cpu / ticks * 1e6, 1),
+        "tick_call_us": round(tick_cost * 1e6, 2),
+        "forks_per_tick": 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "engine_vs_script",
+        "duration_s": args.duration,
+        "interval_s": args.interval,
+        "script": bench_script(args.duration, args.interval),
+        "engine": bench_engine(args.duration, args.interval),
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
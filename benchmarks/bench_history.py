@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark jiggle history queries over a year of synthetic 5-second ticks.
+
+The history is filled with one jiggle every 5 seconds, stopped for ten
+minutes at 03:00 each day, and then queried for windows of increasing
+length at random positions. Each query is timed through the sparse index
+(bisect on the index and the mapped records) and compared with locating
+the same start by scanning the records from the beginning. Results are
+printed as JSON.
+
+Usage:
+    python benchmarks/bench_history.py [--days 365] [--interval 5]
+        [--queries 20] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jigglypuff.history import _KIND_CODES, MAGIC, RECORD, HistoryStore  # noqa: E402
+from jigglypuff.metrics import MetricsRegistry  # noqa: E402
+
+DAY = 86400.0
+OUTAGE_AT = 3 * 3600.0
+OUTAGE = 600.0
+
+
+def build(path: str, days: int, interval: float, start: float) -> int:
+    """Write ``days`` of ticks to ``path``; return the number of records."""
+    jiggled, started, stopped = _KIND_CODES["jiggled"], _KIND_CODES["started"], _KIND_CODES["stopped"]
+    pack = RECORD.pack
+    count = 0
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for day in range(days):
+            base = start + day * DAY
+            chunk = [pack(base, interval, day + 1, started, 0, 1)]
+            when = base + interval
+            while when < base + DAY:
+                if base + OUTAGE_AT <= when < base + OUTAGE_AT + OUTAGE:
+                    chunk.append(pack(base + OUTAGE_AT, interval, day + 1, stopped, 0, 1))
+                    when = base + OUTAGE_AT + OUTAGE
+                    chunk.append(pack(when, interval, day + 1, started, 0, 1))
+                else:
+                    chunk.append(pack(when, interval, day + 1, jiggled, 0, 1))
+                when += interval
+            f.write(b"".join(chunk))
+            count += len(chunk)
+    return count
+
+
+def _scan_locate(path: str, when: float) -> int:
+    """Index of the first record at or after ``when``, found by reading from the start."""
+    index = 0
+    with open(path, "rb") as f:
+        f.seek(len(MAGIC))
+        while True:
+            block = f.read(RECORD.size * 4096)
+            if not block:
+                return index
+            for record in RECORD.iter_unpack(block):
+                if record[0] >= when:
+                    return index
+                index += 1
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1e3, 3)
+
+
+def run(days: int = 365, interval: float = 5.0, queries: int = 20, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    start = 1_700_000_000.0 - 1_700_000_000.0 % DAY
+    end = start + days * DAY
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.bin")
+        began = time.perf_counter()
+        count = build(path, days, interval, start)
+        build_s = time.perf_counter() - began
+
+        store = HistoryStore(path, metrics=MetricsRegistry())
+        began = time.perf_counter()
+        # The first query maps the file and builds the sparse index
+        store.query(start, start + 1, now=end)
+        index_ms = _ms(time.perf_counter() - began)
+
+        windows = {}
+        for name, length in (("2h", 7200.0), ("1d", DAY), ("30d", 30 * DAY)):
+            if length > days * DAY:
+                continue
+            latencies, scans = [], []
+            for _ in range(queries):
+                at = start + rng.random() * (days * DAY - length)
+                began = time.perf_counter()
+                report = store.query(at, at + length, now=end)
+                latencies.append(time.perf_counter() - began)
+            for _ in range(min(3, queries)):
+                at = start + rng.random() * (days * DAY - length)
+                began = time.perf_counter()
+                _scan_locate(path, at)
+                scans.append(time.perf_counter() - began)
+            windows[name] = {
+                "records_scanned": report["records_scanned"],
+                "gap_count": report["gap_count"],
+                "query_ms_p50": _ms(statistics.median(latencies)),
+                "query_ms_max": _ms(max(latencies)),
+                "linear_locate_ms_p50": _ms(statistics.median(scans)),
+            }
+
+        began = time.perf_counter()
+        year = store.query(start, end, now=end)
+        full_ms = _ms(time.perf_counter() - began)
+        store.close()
+        size = os.path.getsize(path)
+
+    return {
+        "days": days,
+        "interval_s": interval,
+        "records": count,
+        "file_mb": round(size / 2**20, 1),
+        "build_s": round(build_s, 2),
+        "index_build_ms": index_ms,
+        "windows": windows,
+        "full_range": {
+            "query_ms": full_ms,
+            "covered_ratio": year["covered_ratio"],
+            "gap_count": year["gap_count"],
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.days, args.interval, args.queries), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
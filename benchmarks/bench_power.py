@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark CPU wakeups of the default and low-power timer profiles.
+
+Several jiggle sessions run side by side with their start times spread over
+one interval, as separate jigglers on one machine would be. Two figures are
+reported per profile:
+
+- ``thread_wakeups``, measured: the voluntary context switches of the
+  scheduler threads (from /proc, Linux only), one per sleep that ended.
+  Coalescing does not change this; every thread still wakes once per tick.
+- ``modeled_cpu_wakeups``, modeled: the groups of measured tick times that
+  fall within the timer slack of each other, since the kernel can serve such
+  timers with a single CPU wakeup. This is what alignment and slack save, but
+  it is computed from the tick times, not read from the kernel.
+
+The measured thread wakeups of the two profiles are compared per tick, and
+a second run with an interval far longer than the measurement counts the
+wakeups of sessions that have nothing to do: any above zero are polling.
+
+Results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_power.py [--sessions 10] [--duration 5]
+        [--interval 0.5] [--idle-duration 35] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jigglypuff import JiggleEngine, RecordingBackend  # noqa: E402
+from jigglypuff.metrics import MetricsRegistry  # noqa: E402
+from jigglypuff.power import PROFILES, PowerProfile  # noqa: E402
+
+# Linux's default timer slack
+DEFAULT_SLACK = 50e-6
+
+
+def _voluntary_switches(native_id: int) -> Optional[int]:
+    try:
+        with open(f"/proc/self/task/{native_id}/status") as f:
+            for line in f:
+                if line.startswith("voluntary_ctxt_switches"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def modeled_wakeups(times: List[float], slack: float) -> int:
+    """Wakeups needed to serve timers expiring at ``times`` when each may fire ``slack`` late."""
+    wakeups = 0
+    window_end = None
+    for when in sorted(times):
+        if window_end is None or when > window_end:
+            wakeups += 1
+            window_end = when + slack
+    return wakeups
+
+
+def bench_profile(profile: PowerProfile, sessions: int, duration: float, interval: float,
+                  spread: bool = True) -> dict:
+    """Run ``sessions`` engines with ``profile`` for ``duration`` seconds; measure and model their wakeups.
+
+    With ``spread`` the sessions start evenly over one interval, else all at once.
+    """
+    history = 2 * int(duration / interval + sessions + 4)
+    engines = []
+    for _ in range(sessions):
+        engine = JiggleEngine(RecordingBackend(history=history), interval, 1,
+                              metrics=MetricsRegistry(), power=profile)
+        engine.start()
+        engines.append(engine)
+        if spread:
+            time.sleep(interval / sessions)
+
+    threads = [engine._thread.native_id for engine in engines]
+    switches_before = [_voluntary_switches(native_id) for native_id in threads]
+    began = time.monotonic()
+    cpu_before = time.process_time()
+    time.sleep(duration)
+    cpu = time.process_time() - cpu_before
+    switches_after = [_voluntary_switches(native_id) for native_id in threads]
+    ended = time.monotonic()
+    for engine in engines:
+        engine.stop()
+
+    ticks = [when for engine in engines for when, dx, _ in engine.backend.moves
+             if dx > 0 and began <= when < ended]
+    modeled = modeled_wakeups(ticks, profile.timer_slack or DEFAULT_SLACK)
+    measured = None
+    if None not in switches_before and None not in switches_after:
+        measured = sum(after - before for before, after in zip(switches_before, switches_after))
+    lateness = [engine.lateness_mean for engine in engines if engine.lateness_mean is not None]
+    return {
+        "profile": profile.name,
+        "ticks": len(ticks),
+        "thread_wakeups": measured,
+        "thread_wakeups_per_hour": round(measured / duration * 3600) if measured is not None else None,
+        "thread_wakeups_per_tick": round(measured / len(ticks), 3) if measured is not None and ticks else None,
+        "modeled_cpu_wakeups": modeled,
+        "modeled_cpu_wakeups_per_hour": round(modeled / duration * 3600),
+        "cpu_per_tick_us": round(cpu / len(ticks) * 1e6, 2) if ticks else None,
+        "lateness_mean_ms": round(sum(lateness) / len(lateness) * 1e3, 3) if lateness else None,
+    }
+
+
+def run(sessions: int = 10, duration: float = 5.0, interval: float = 0.5, idle_duration: float = 35.0) -> dict:
+    default = bench_profile(PROFILES["default"], sessions, duration, interval)
+    low = bench_profile(PROFILES["low"], sessions, duration, interval)
+    saved = default["modeled_cpu_wakeups_per_hour"] - low["modeled_cpu_wakeups_per_hour"]
+    measured_saved = None
+    if default["thread_wakeups_per_hour"] and low["thread_wakeups_per_hour"] is not None:
+        measured_saved = round(
+            (default["thread_wakeups_per_hour"] - low["thread_wakeups_per_hour"])
+            / default["thread_wakeups_per_hour"] * 100, 1
+        )
+    # Sessions between two ticks of a long interval (the first tick fires before measuring)
+    idle_interval = max(300.0, 2 * idle_duration)
+    idle = {
+        name: bench_profile(PROFILES[name], sessions, idle_duration, idle_interval, spread=False)["thread_wakeups"]
+        for name in ("default", "low")
+    }
+    return {
+        "sessions": sessions,
+        "interval_s": interval,
+        "duration_s": duration,
+        "default": default,
+        "low": low,
+        "thread_wakeups_saved_pct": measured_saved,
+        "modeled_wakeups_saved_per_hour": saved,
+        "modeled_wakeups_saved_pct": round(saved / default["modeled_cpu_wakeups_per_hour"] * 100, 1)
+        if default["modeled_cpu_wakeups_per_hour"] else None,
+        "idle": {"interval_s": idle_interval, "duration_s": idle_duration, "thread_wakeups": idle},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--idle-duration", type=float, default=35.0,
+                        help="How long to watch sessions with nothing to do")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.sessions, args.duration, args.interval, args.idle_duration), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark many named targets jiggled from one scheduler thread.
+
+Every target gets its own recording backend, so no display is needed. For
+each target count the scheduler runs for the same wall-clock duration and
+the CPU time per tick, wakeups (context switches of the scheduler thread)
+per tick and tick lateness are reported. Results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_targets.py [--counts 1 10 100 500] [--duration 5]
+        [--interval 0.5] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Iterable, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jigglypuff import RecordingBackend  # noqa: E402
+from jigglypuff.metrics import MetricsRegistry  # noqa: E402
+from jigglypuff.targets import TargetScheduler  # noqa: E402
+
+
+def _thread_switches(native_id: int) -> Optional[int]:
+    try:
+        with open(f"/proc/self/task/{native_id}/status") as f:
+            return sum(
+                int(line.split()[1]) for line in f
+                if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches"))
+            )
+    except OSError:
+        return None
+
+
+def bench_count(count: int, duration: float, interval: float, pause: float = 0.0) -> dict:
+    """Run ``count`` targets for ``duration`` seconds and measure the scheduler's cost."""
+    scheduler = TargetScheduler(metrics=MetricsRegistry())
+    backends = []
+    for i in range(count):
+        backend = RecordingBackend(history=4)
+        backend.jiggle_pause = pause
+        backends.append(backend)
+        scheduler.add(f"target-{i}", backend, interval, 1)
+    thread = next(t for t in threading.enumerate() if t.name == "jigglypuff-targets")
+
+    switches_before = _thread_switches(thread.native_id)
+    cpu_before = time.process_time()
+    time.sleep(duration)
+    cpu = time.process_time() - cpu_before
+    switches_after = _thread_switches(thread.native_id)
+    targets = scheduler.targets()
+    scheduler.close()
+
+    ticks = sum(target.ticks for target in targets)
+    lateness = [target.lateness_mean for target in targets if target.lateness_mean is not None]
+    wakeups = switches_after - switches_before if switches_before is not None and switches_after else None
+    return {
+        "targets": count,
+        "ticks": ticks,
+        "cpu_s": round(cpu, 6),
+        "cpu_per_tick_us": round(cpu / ticks * 1e6, 2) if ticks else None,
+        "cpu_s_per_hour_per_target": round(cpu / duration * 3600 / count, 4),
+        "wakeups_per_tick": round(wakeups / ticks, 3) if wakeups is not None and ticks else None,
+        "lateness_mean_ms": round(sum(lateness) / len(lateness) * 1e3, 3) if lateness else None,
+        "lateness_max_ms": round(max(target.lateness_max for target in targets) * 1e3, 3),
+        "missed_ticks": sum(target.missed_ticks for target in targets),
+    }
+
+
+def run(counts: Iterable[int] = (1, 10, 100, 500), duration: float = 5.0, interval: float = 0.5) -> dict:
+    return {
+        "interval_s": interval,
+        "duration_s": duration,
+        "by_count": [bench_count(count, duration, interval) for count in counts],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.counts, args.duration, args.interval), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Headless performance benchmark suite for jigglypuff.
+
+Runs on Linux with the recording pointer backend, so no display or cliclick
+is needed. It measures:
+
+- latency of every MCP tool and resource, over real JSON-RPC on stdio
+- forks, CPU seconds and wakeups (context switches) per hour of steady-state
+  jiggling, and the server's RSS
+- tick jitter of the in-process engine
+- the engine-vs-script and cliclick co-process benchmarks
+- CPU and wakeups per tick with up to hundreds of named targets
+- scheduler thread wakeups (measured) and CPU wakeups saved (modeled) by the
+  low-power timer profile
+- jiggle history query latency over a year of 5-second ticks
+
+Results are written as JSON. Pass ``--compare`` with an older result file to
+print the relative change of every numeric metric.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output results.json] [--compare old.json]
+        [--steady-seconds 30] [--quick]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Set
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_cliclick  # noqa: E402
+import bench_engine  # noqa: E402
+import bench_history  # noqa: E402
+import bench_power  # noqa: E402
+import bench_targets  # noqa: E402
+from jigglypuff import JiggleEngine, RecordingBackend  # noqa: E402
+
+
+class StdioClient:
+    """Minimal JSON-RPC client for an MCP server on stdio."""
+
+    def __init__(self, command: List[str], env: Dict[str, str]):
+        self.proc = subprocess.Popen(
+            command, cwd=ROOT, env=env, text=True, bufsize=1,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._next_id = 1
+
+    def request(self, method: str, params: Optional[dict] = None) -> dict:
+        request_id = self._next_id
+        self._next_id += 1
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        self.proc.stdin.write(json.dumps(message) + "\n")
+        self.proc.stdin.flush()
+        while True:
+            line = self.proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"server exited while waiting for {method}")
+            response = json.loads(line)
+            if response.get("id") == request_id:
+                if "error" in response:
+                    raise RuntimeError(f"{method} failed: {response['error']}")
+                return response["result"]
+
+    def notify(self, method: str) -> None:
+        self.proc.stdin.write(json.dumps({"jsonrpc": "2.0", "method": method}) + "\n")
+        self.proc.stdin.flush()
+
+    def initialize(self) -> dict:
+        result = self.request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "jigglypuff-bench", "version": "1.0.0"},
+        })
+        self.notify("notifications/initialized")
+        return result
+
+    def call_tool(self, name: str, **arguments) -> dict:
+        return self.request("tools/call", {"name": name, "arguments": arguments})
+
+    def read_resource(self, uri: str) -> dict:
+        return self.request("resources/read", {"uri": uri})
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+def _summary_ms(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1e3, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1e3, 3),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1e3, 3),
+        "max_ms": round(ordered[-1] * 1e3, 3),
+    }
+
+
+def _timed(samples: Dict[str, List[float]], name: str, call) -> None:
+    began = time.perf_counter()
+    call()
+    samples.setdefault(name, []).append(time.perf_counter() - began)
+
+
+def _proc_stat(pid: int) -> dict:
+    """CPU seconds, context switches and RSS of a process from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    switches = {}
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/status") as f:
+                switches[task] = sum(
+                    int(line.split()[1]) for line in f
+                    if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches"))
+                )
+        except FileNotFoundError:
+            continue
+
+    rss_kb = hwm_kb = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+            elif line.startswith("VmHWM:"):
+                hwm_kb = int(line.split()[1])
+    return {"cpu_s": cpu, "switches": switches, "rss_kb": rss_kb, "hwm_kb": hwm_kb}
+
+
+def _switches_between(before: Dict[str, int], after: Dict[str, int]) -> int:
+    """Context switches per thread between two samples.
+
+    Threads that exited in between are not counted, so this is a lower bound.
+    """
+    return sum(count - before.get(task, 0) for task, count in after.items())
+
+
+def _descendants(pid: int) -> Set[int]:
+    """Live child processes of a process and of its children (/proc/<pid>/task/*/children)."""
+    found: Set[int] = set()
+    stack = [pid]
+    while stack:
+        parent = stack.pop()
+        for children in glob.glob(f"/proc/{parent}/task/*/children"):
+            try:
+                with open(children) as f:
+                    pids = [int(child) for child in f.read().split()]
+            except (FileNotFoundError, ProcessLookupError):
+                continue
+            stack.extend(child for child in pids if child not in found)
+            found.update(pids)
+    return found
+
+
+def _count_children(pid: int, seconds: float, period: float = 0.005) -> int:
+    """Child processes the server started during ``seconds``, sampled every ``period``.
+
+    A child that starts and exits between two samples is missed, so this is
+    a lower bound; the recording backend should start none at all.
+    """
+    before = _descendants(pid)
+    seen: Set[int] = set()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        seen |= _descendants(pid)
+        time.sleep(period)
+    return len(seen - before)
+
+
+def bench_server(rounds: int, steady_seconds: float) -> dict:
+    """Tool latency and steady-state cost of a real server process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            JIGGLYPUFF_BACKEND="recording",
+            JIGGLYPUFF_IDLE_SOURCE="none",
+            JIGGLYPUFF_LOG=os.path.join(tmp, "jiggler.log"),
+        )
+        began = time.perf_counter()
+        client = StdioClient([sys.executable, os.path.join(ROOT, "mcp_server.py")], env)
+        try:
+            client.initialize()
+            initialize_s = time.perf_counter() - began
+
+            samples: Dict[str, List[float]] = {}
+            for _ in range(rounds):
+                _timed(samples, "wake_up_jiggly", lambda: client.call_tool("wake_up_jiggly", interval=5))
+                _timed(samples, "check_jiggly_status", lambda: client.call_tool("check_jiggly_status"))
+                _timed(samples, "jigglypuff-config", lambda: client.read_resource("jigglypuff://config"))
+                _timed(samples, "jigglypuff-rules", lambda: client.read_resource("jigglypuff://rules"))
+                _timed(samples, "put_jiggly_to_sleep", lambda: client.call_tool("put_jiggly_to_sleep"))
+
+            # Steady state: one session at the shortest allowed interval
+            client.call_tool("wake_up_jiggly", interval=5)
+            before = _proc_stat(client.proc.pid)
+            forks = _count_children(client.proc.pid, steady_seconds)
+            after = _proc_stat(client.proc.pid)
+            client.call_tool("put_jiggly_to_sleep")
+        finally:
+            client.close()
+
+    per_hour = 3600 / steady_seconds
+    return {
+        "initialize_ms": round(initialize_s * 1e3, 1),
+        "tools": {name: _summary_ms(values) for name, values in samples.items()},
+        "steady_state": {
+            "interval_s": 5,
+            "window_s": steady_seconds,
+            "cpu_s_per_hour": round((after["cpu_s"] - before["cpu_s"]) * per_hour, 3),
+            "wakeups_per_hour": round(_switches_between(before["switches"], after["switches"]) * per_hour),
+            # Child processes of the server only, threads excluded
+            "forks_per_hour": round(forks * per_hour),
+            "rss_kb": after["rss_kb"],
+            "peak_rss_kb": after["hwm_kb"],
+        },
+    }
+
+
+def bench_jitter(ticks: int, interval: float) -> dict:
+    """Lateness of each tick of the in-process engine against its interval."""
+    backend = RecordingBackend(history=2 * ticks + 2)
+    engine = JiggleEngine(backend, interval, 1)
+    engine.start()
+    time.sleep(interval * ticks + interval / 2)
+    engine.stop()
+
+    jiggle_times = [t for t, dx, _ in backend.moves if dx > 0]
+    gaps = [b - a for a, b in zip(jiggle_times, jiggle_times[1:])]
+    errors = sorted(abs(gap - interval) for gap in gaps)
+    return {
+        "interval_s": interval,
+        "ticks": len(jiggle_times),
+        "mean_abs_jitter_ms": round(statistics.mean(errors) * 1e3, 3),
+        "p99_abs_jitter_ms": round(errors[max(0, int(len(errors) * 0.99) - 1)] * 1e3, 3),
+        "max_abs_jitter_ms": round(errors[-1] * 1e3, 3),
+        # How far the schedule slipped over the whole run
+        "total_drift_ms": round((jiggle_times[-1] - jiggle_times[0] - interval * len(gaps)) * 1e3, 3),
+    }
+
+
+def _git_version() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(data: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """Relative change of every numeric metric present in both results."""
+    old_flat, new_flat = _flatten(old["results"]), _flatten(new["results"])
+    lines = []
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[name], new_flat[name]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        lines.append(f"{name}: {before} -> {after} ({change})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="jigglypuff benchmark suite")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--steady-seconds", type=float, default=30.0)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--quick", action="store_true", help="Shorter runs for smoke testing")
+    args = parser.parse_args()
+
+    steady = 6.0 if args.quick else args.steady_seconds
+    rounds = 5 if args.quick else args.rounds
+    report = {
+        "suite": "jigglypuff",
+        "version": _git_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {
+            "server": bench_server(rounds, steady),
+            "jitter": bench_jitter(20 if args.quick else 100, 0.05),
+            "engine_vs_script": {
+                "script": bench_engine.bench_script(2.0 if args.quick else 5.0, 0.05),
+                "engine": bench_engine.bench_engine(2.0 if args.quick else 5.0, 0.05),
+            },
+            "cliclick": bench_cliclick.run(200 if args.quick else 1000),
+            "targets": bench_targets.run((1, 10, 100) if args.quick else (1, 10, 100, 500),
+                                         2.0 if args.quick else 5.0),
+            "power": bench_power.run(duration=2.0 if args.quick else 5.0,
+                                     idle_duration=2.0 if args.quick else 35.0),
+            "history": bench_history.run(days=30 if args.quick else 365, queries=5 if args.quick else 20),
+        },
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare(json.load(f), report):
+                print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,15 @@
 # Configuration
 INTERVAL=${1:-30}  # Default to 30 seconds
 OFFSET=${2:-1}     # Mouse movement offset in pixels
-LOG_FILE="/tmp/mouse_jiggler.log"
+LOG_FILE="${JIGGLYPUFF_LOG:-/tmp/mouse_jiggler.log}"
 
 # Log startup
 echo "$(date): Mouse jiggler started with interval=${INTERVAL}s, offset=${OFFSET}px" >> "$LOG_FILE"
 
-# Trap SIGTERM to log shutdown
-trap 'echo "$(date): Mouse jiggler stopped" >> "$LOG_FILE"; exit 0' SIGTERM
+# Trap SIGTERM to log shutdown. Bash only runs traps between commands, so the
+# sleep below runs in the background and the trap interrupts `wait` at once
+SLEEP_PID=""
+trap 'echo "$(date): Mouse jiggler stopped" >> "$LOG_FILE"; [ -n "$SLEEP_PID" ] && kill "$SLEEP_PID" 2>/dev/null; exit 0' SIGTERM
 
 while true; do
     # Move mouse slightly and back
@@ -20,5 +22,7 @@ while true; do
     echo "$(date): Mouse jiggled" >> "$LOG_FILE"
     
     # Wait for next jiggle
-    sleep $INTERVAL
+    sleep "$INTERVAL" &
+    SLEEP_PID=$!
+    wait "$SLEEP_PID"
 done
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+In-process jiggle engine for the jigglypuff MCP server.
+
+The engine replaces the ``jiggly_puff.sh`` loop: a scheduler thread inside
+the server drives a pluggable pointer backend, so a steady-state tick costs
+a function call instead of a handful of forked processes.
+"""
+
+from jigglypuff.backends import (
+    BACKENDS,
+    NATIVE_BACKENDS,
+    CliclickBackend,
+    CoreGraphicsBackend,
+    NativeBackend,
+    PointerBackend,
+    RecordingBackend,
+    UinputBackend,
+    XTestBackend,
+    available_backends,
+    get_backend,
+)
+from jigglypuff.engine import JiggleEngine
+from jigglypuff.logsink import JiggleLog
+
+__all__ = [
+    "BACKENDS",
+    "CliclickBackend",
+    "CoreGraphicsBackend",
+    "JiggleEngine",
+    "JiggleLog",
+    "NATIVE_BACKENDS",
+    "NativeBackend",
+    "PointerBackend",
+    "RecordingBackend",
+    "UinputBackend",
+    "XTestBackend",
+    "available_backends",
+    "get_backend",
+]
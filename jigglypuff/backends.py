@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# jigglypuff/backends.py
+
+import collections
+import ctypes
+import ctypes.util
+import fcntl
+import functools
+import inspect
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple, Type
+
+from jigglypuff.coprocess import PointerCoprocess
+
+logger = logging.getLogger(__name__)
+
+# Pause between the outward and the return move, matching `w:100` in jiggly_puff.sh
+JIGGLE_PAUSE = 0.1
+
+
+class PointerBackend:
+    """Base class for everything that can nudge the pointer.
+
+    A backend only has to implement ``move``; ``jiggle`` performs the
+    out-and-back movement the bash loop used to do with cliclick.
+    """
+
+    name = "abstract"
+    jiggle_pause = JIGGLE_PAUSE
+
+    def __init__(self):
+        self._interrupted = threading.Event()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Return True if this backend can be used on the current host."""
+        return False
+
+    def move(self, dx: int, dy: int) -> None:
+        """Move the pointer relative to its current position."""
+        raise NotImplementedError
+
+    def jiggle(self, offset: int) -> None:
+        """Move the pointer right by ``offset`` pixels and back again."""
+        self.move(offset, 0)
+        if self.jiggle_pause:
+            self._interrupted.wait(self.jiggle_pause)
+        self.move(-offset, 0)
+
+    def interrupt(self) -> None:
+        """Cut short the pause of a jiggle in progress, so a stop is not delayed by it."""
+        self._interrupted.set()
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class CliclickBackend(PointerBackend):
+    """Drive the pointer with cliclick-style commands.
+
+    By default every tick is written as a single batch to a long-lived
+    helper process (see PointerCoprocess). With ``persistent=False`` each
+    tick forks `cliclick` the way jiggly_puff.sh did.
+    """
+
+    name = "cliclick"
+
+    def __init__(
+        self,
+        executable: Optional[str] = None,
+        persistent: bool = True,
+        helper: Optional[List[str]] = None,
+        pause_ms: int = int(JIGGLE_PAUSE * 1000),
+    ):
+        super().__init__()
+        self.executable = executable or shutil.which("cliclick") or "cliclick"
+        self.pause_ms = pause_ms
+        self.coprocess: Optional[PointerCoprocess] = None
+        if persistent:
+            if helper is None and os.environ.get("JIGGLYPUFF_CLICLICK_HELPER"):
+                helper = shlex.split(os.environ["JIGGLYPUFF_CLICLICK_HELPER"])
+            self.coprocess = PointerCoprocess(helper)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return bool(shutil.which("cliclick") or os.environ.get("JIGGLYPUFF_CLICLICK_HELPER"))
+
+    def move(self, dx: int, dy: int) -> None:
+        self._run([f"m:{dx:+d},{dy:+d}"])
+
+    def jiggle(self, offset: int) -> None:
+        # Every move of the tick goes out in one batch
+        commands = [f"m:+{offset},+0", f"m:-{offset},-0"]
+        if self.pause_ms:
+            commands.insert(1, f"w:{self.pause_ms}")
+        self._run(commands)
+
+    def close(self) -> None:
+        if self.coprocess is not None:
+            self.coprocess.close()
+
+    def _run(self, commands: List[str]) -> None:
+        if self.coprocess is not None:
+            self.coprocess.send(commands)
+            return
+        subprocess.run(
+            [self.executable, *commands],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _find_library(name: str) -> Optional[str]:
+    # find_library runs ldconfig or a compiler on Linux, so each lookup is done once
+    return ctypes.util.find_library(name)
+
+
+class _CGPoint(ctypes.Structure):
+    _fields_ = [("x", ctypes.c_double), ("y", ctypes.c_double)]
+
+
+class CoreGraphicsBackend(PointerBackend):
+    """Post mouse-moved events straight through CoreGraphics (macOS)."""
+
+    name = "coregraphics"
+
+    _kCGEventMouseMoved = 5
+    _kCGHIDEventTap = 0
+    _kCGMouseButtonLeft = 0
+
+    def __init__(self):
+        super().__init__()
+        path = _find_library("ApplicationServices")
+        if not path:
+            raise OSError("CoreGraphics (ApplicationServices) is not available")
+        cg = ctypes.cdll.LoadLibrary(path)
+
+        cg.CGEventCreate.restype = ctypes.c_void_p
+        cg.CGEventCreate.argtypes = [ctypes.c_void_p]
+        cg.CGEventGetLocation.restype = _CGPoint
+        cg.CGEventGetLocation.argtypes = [ctypes.c_void_p]
+        cg.CGEventCreateMouseEvent.restype = ctypes.c_void_p
+        cg.CGEventCreateMouseEvent.argtypes = [
+            ctypes.c_void_p, ctypes.c_uint32, _CGPoint, ctypes.c_uint32
+        ]
+        cg.CGEventPost.restype = None
+        cg.CGEventPost.argtypes = [ctypes.c_uint32, ctypes.c_void_p]
+        cg.CFRelease.restype = None
+        cg.CFRelease.argtypes = [ctypes.c_void_p]
+        self._cg = cg
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return sys.platform == "darwin" and bool(_find_library("ApplicationServices"))
+
+    def move(self, dx: int, dy: int) -> None:
+        cg = self._cg
+        probe = cg.CGEventCreate(None)
+        try:
+            location = cg.CGEventGetLocation(probe)
+        finally:
+            cg.CFRelease(probe)
+
+        target = _CGPoint(location.x + dx, location.y + dy)
+        event = cg.CGEventCreateMouseEvent(
+            None, self._kCGEventMouseMoved, target, self._kCGMouseButtonLeft
+        )
+        try:
+            cg.CGEventPost(self._kCGHIDEventTap, event)
+        finally:
+            cg.CFRelease(event)
+
+
+# The CoreGraphics backend used to be the only native one
+NativeBackend = CoreGraphicsBackend
+
+
+class XTestBackend(PointerBackend):
+    """Inject relative motion into an X server with the XTEST extension.
+
+    The events are queued on the backend's own display connection and
+    flushed without waiting for a reply, so a move costs a few
+    microseconds. ``display`` picks the X server (default: ``DISPLAY``),
+    which lets each named target drive its own virtual display.
+    """
+
+    name = "xtest"
+
+    def __init__(self, display: Optional[str] = None):
+        super().__init__()
+        xlib_path = _find_library("X11")
+        xtst_path = _find_library("Xtst")
+        if not xlib_path or not xtst_path:
+            raise OSError("libX11 and libXtst are required for XTEST")
+        xlib = ctypes.cdll.LoadLibrary(xlib_path)
+        xtst = ctypes.cdll.LoadLibrary(xtst_path)
+
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XFlush.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XQueryPointer.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_uint),
+        ]
+        xtst.XTestQueryExtension.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_int)] * 4
+        xtst.XTestFakeRelativeMotionEvent.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+
+        self.display = display or os.environ.get("DISPLAY")
+        self._display = xlib.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise OSError(f"cannot open X display {self.display}")
+        unused = [ctypes.c_int() for _ in range(4)]
+        if not xtst.XTestQueryExtension(self._display, *map(ctypes.byref, unused)):
+            xlib.XCloseDisplay(self._display)
+            raise OSError(f"X display {self.display} has no XTEST extension")
+        self._xlib = xlib
+        self._xtst = xtst
+        # Xlib connections are not thread-safe; close may come from another thread
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return bool(os.environ.get("DISPLAY") and _find_library("X11") and _find_library("Xtst"))
+
+    def move(self, dx: int, dy: int) -> None:
+        with self._lock:
+            if not self._display:
+                raise OSError("X display is closed")
+            self._xtst.XTestFakeRelativeMotionEvent(self._display, dx, dy, 0)
+            self._xlib.XFlush(self._display)
+
+    def position(self) -> Tuple[int, int]:
+        """Where the pointer is on the root window (a round trip to the server)."""
+        root, child = ctypes.c_ulong(), ctypes.c_ulong()
+        x, y, win_x, win_y = (ctypes.c_int() for _ in range(4))
+        mask = ctypes.c_uint()
+        with self._lock:
+            if not self._display:
+                raise OSError("X display is closed")
+            self._xlib.XQueryPointer(
+                self._display, self._xlib.XDefaultRootWindow(self._display),
+                ctypes.byref(root), ctypes.byref(child), ctypes.byref(x), ctypes.byref(y),
+                ctypes.byref(win_x), ctypes.byref(win_y), ctypes.byref(mask),
+            )
+        return x.value, y.value
+
+    def close(self) -> None:
+        with self._lock:
+            if self._display:
+                self._xlib.XCloseDisplay(self._display)
+                self._display = None
+
+
+class _InputEvent(ctypes.Structure):
+    _fields_ = [
+        ("tv_sec", ctypes.c_long),
+        ("tv_usec", ctypes.c_long),
+        ("type", ctypes.c_uint16),
+        ("code", ctypes.c_uint16),
+        ("value", ctypes.c_int32),
+    ]
+
+
+class _UinputSetup(ctypes.Structure):
+    _fields_ = [
+        ("bustype", ctypes.c_uint16),
+        ("vendor", ctypes.c_uint16),
+        ("product", ctypes.c_uint16),
+        ("version", ctypes.c_uint16),
+        ("name", ctypes.c_char * 80),
+        ("ff_effects_max", ctypes.c_uint32),
+    ]
+
+
+def _ioc(direction: int, number: int, size: int) -> int:
+    # _IOC from <asm-generic/ioctl.h>, for the 'U' (uinput) ioctl type
+    return (direction << 30) | (size << 16) | (ord("U") << 8) | number
+
+
+class UinputBackend(PointerBackend):
+    """Move the pointer through a virtual relative mouse created with /dev/uinput.
+
+    This works below the display server (X11, Wayland or the console). Each
+    move is a single write of three input events. The compositor applies
+    pointer acceleration to them, so a move may not be exactly ``dx`` pixels,
+    but the outward and return moves of a jiggle cancel out.
+    """
+
+    name = "uinput"
+    device_name = "jigglypuff virtual pointer"
+
+    _EV_SYN, _EV_KEY, _EV_REL = 0, 1, 2
+    _SYN_REPORT, _REL_X, _REL_Y = 0, 0, 1
+    _BTN_LEFT = 0x110
+    _BUS_VIRTUAL = 0x06
+    _UI_DEV_CREATE = _ioc(0, 1, 0)
+    _UI_DEV_DESTROY = _ioc(0, 2, 0)
+    _UI_DEV_SETUP = _ioc(1, 3, ctypes.sizeof(_UinputSetup))
+    _UI_SET_EVBIT = _ioc(1, 100, ctypes.sizeof(ctypes.c_int))
+    _UI_SET_KEYBIT = _ioc(1, 101, ctypes.sizeof(ctypes.c_int))
+    _UI_SET_RELBIT = _ioc(1, 102, ctypes.sizeof(ctypes.c_int))
+
+    def __init__(self, path: str = "/dev/uinput"):
+        super().__init__()
+        self._fd: Optional[int] = os.open(path, os.O_WRONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+        try:
+            # A button makes libinput treat the device as a mouse
+            fcntl.ioctl(self._fd, self._UI_SET_EVBIT, self._EV_KEY)
+            fcntl.ioctl(self._fd, self._UI_SET_KEYBIT, self._BTN_LEFT)
+            fcntl.ioctl(self._fd, self._UI_SET_EVBIT, self._EV_REL)
+            fcntl.ioctl(self._fd, self._UI_SET_RELBIT, self._REL_X)
+            fcntl.ioctl(self._fd, self._UI_SET_RELBIT, self._REL_Y)
+            setup = _UinputSetup(bustype=self._BUS_VIRTUAL, vendor=0x1234, product=0x5678,
+                                 version=1, name=self.device_name.encode())
+            fcntl.ioctl(self._fd, self._UI_DEV_SETUP, bytes(setup))
+            fcntl.ioctl(self._fd, self._UI_DEV_CREATE)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return sys.platform.startswith("linux") and os.access("/dev/uinput", os.W_OK)
+
+    def move(self, dx: int, dy: int) -> None:
+        events = (_InputEvent * 3)(
+            _InputEvent(type=self._EV_REL, code=self._REL_X, value=dx),
+            _InputEvent(type=self._EV_REL, code=self._REL_Y, value=dy),
+            _InputEvent(type=self._EV_SYN, code=self._SYN_REPORT, value=0),
+        )
+        with self._lock:
+            if self._fd is None:
+                raise OSError("uinput device is closed")
+            os.write(self._fd, bytes(events))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                try:
+                    fcntl.ioctl(self._fd, self._UI_DEV_DESTROY)
+                finally:
+                    os.close(self._fd)
+                    self._fd = None
+
+
+class RecordingBackend(PointerBackend):
+    """In-memory backend for headless hosts and tests.
+
+    Moves are applied to a virtual pointer and the most recent ones are kept
+    in a bounded history, so memory stays flat however long it runs.
+    """
+
+    name = "recording"
+    jiggle_pause = 0.0
+
+    def __init__(self, history: int = 1024):
+        super().__init__()
+        self.x = 0
+        self.y = 0
+        self.jiggles = 0
+        self.moves: Deque[Tuple[float, int, int]] = collections.deque(maxlen=history)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    def move(self, dx: int, dy: int) -> None:
+        self.x += dx
+        self.y += dy
+        self.moves.append((time.monotonic(), dx, dy))
+
+    def jiggle(self, offset: int) -> None:
+        super().jiggle(offset)
+        self.jiggles += 1
+
+
+# In-process backends, one per platform API, in order of preference
+NATIVE_BACKENDS: Dict[str, Type[PointerBackend]] = {
+    "coregraphics": CoreGraphicsBackend,
+    "xtest": XTestBackend,
+    "uinput": UinputBackend,
+}
+
+# Backends in order of preference for "auto" selection
+BACKENDS: Dict[str, Type[PointerBackend]] = {
+    **NATIVE_BACKENDS,
+    "cliclick": CliclickBackend,
+    "recording": RecordingBackend,
+}
+
+# What "auto" and "native" resolved to, so the host is only probed once
+_chosen: Dict[str, str] = {}
+_choose_lock = threading.Lock()
+
+
+def available_backends() -> List[str]:
+    """List the backends that can be used on this host, best first."""
+    return [name for name, cls in BACKENDS.items() if cls.is_available()]
+
+
+def get_backend(name: Optional[str] = None, **options) -> PointerBackend:
+    """Instantiate a pointer backend.
+
+    Args:
+        name: Backend name, "native" for the best in-process backend, or
+            "auto" for the best available one. Defaults to the
+            JIGGLYPUFF_BACKEND environment variable, then "auto".
+        options: Passed to the backend, e.g. ``display`` for xtest.
+    """
+    name = (name or os.environ.get("JIGGLYPUFF_BACKEND") or "auto").lower()
+
+    if name in ("auto", "native"):
+        return _choose(name, options)
+
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown pointer backend: {name} (choose from auto, native, {', '.join(BACKENDS)})"
+        )
+    return _create(name, options)
+
+
+def _create(name: str, options: dict) -> PointerBackend:
+    cls = BACKENDS[name]
+    if options:
+        # Checked up front, so a TypeError raised inside the constructor is not mistaken for a bad option
+        parameters = inspect.signature(cls).parameters.values()
+        if not any(parameter.kind is parameter.VAR_KEYWORD for parameter in parameters):
+            accepted = {parameter.name for parameter in parameters
+                        if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)}
+            unknown = sorted(set(options) - accepted)
+            if unknown:
+                raise ValueError(f"The {name} backend does not take {', '.join(unknown)}")
+    return cls(**options)
+
+
+def _choose(name: str, options: dict) -> PointerBackend:
+    with _choose_lock:
+        chosen = _chosen.get(name)
+        if chosen is not None:
+            try:
+                return _create(chosen, options)
+            except OSError as e:
+                # The host changed (display gone, device removed): probe again
+                logger.warning(f"Pointer backend {chosen} unavailable: {e}")
+                del _chosen[name]
+
+        candidates = NATIVE_BACKENDS if name == "native" else BACKENDS
+        for candidate, cls in candidates.items():
+            if not cls.is_available():
+                continue
+            try:
+                backend = _create(candidate, options)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Pointer backend {candidate} unavailable: {e}")
+                continue
+            _chosen[name] = candidate
+            logger.info(f"Pointer backend for {name}: {candidate}")
+            return backend
+
+    if name == "native":
+        raise OSError("No native pointer backend is available (needs CoreGraphics, XTEST or /dev/uinput)")
+    return RecordingBackend()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# jigglypuff/children.py
+
+import atexit
+import logging
+import os
+import signal
+import subprocess
+import threading
+from typing import Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Every long-lived child is started in its own session, so its process group
+# id is its pid and killpg() reaches anything it spawned in turn
+_live: Set[subprocess.Popen] = set()
+_lock = threading.Lock()
+
+
+def track(proc: subprocess.Popen) -> None:
+    """Remember a child process group so it is torn down when the server exits."""
+    with _lock:
+        _live.add(proc)
+
+
+def terminate_group(proc: subprocess.Popen, timeout: float = 1.0) -> None:
+    """Terminate a child's process group: SIGTERM, then SIGKILL after ``timeout``.
+
+    The group is signalled even if the leader already exited, so helpers it
+    left behind do not outlive it.
+    """
+    with _lock:
+        _live.discard(proc)
+    try:
+        if proc.poll() is None:
+            os.killpg(proc.pid, signal.SIGTERM)
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # Group already gone (or the pid was reused by someone else's group)
+        proc.poll()
+
+
+def terminate_all() -> None:
+    """Tear down every tracked child process group."""
+    with _lock:
+        procs = list(_live)
+    for proc in procs:
+        terminate_group(proc, timeout=0.5)
+    if procs:
+        logger.info(f"Terminated {len(procs)} child process groups on exit")
+
+
+# Registered on import, before anything that stops the jiggler on exit, so
+# atexit (last in, first out) tears the groups down after those have run
+atexit.register(terminate_all)
+
+
+def install_signal_handlers(cleanup: Optional[Callable[[], None]] = None,
+                            signals=(signal.SIGTERM, signal.SIGHUP)) -> None:
+    """Clean up and exit on termination signals.
+
+    Raising SystemExit is not enough for a stdio server: the event loop waits
+    for its stdin reader thread, which only returns once the client writes.
+    So the handler runs ``cleanup``, tears down the child groups and exits
+    with the conventional 128+signal status. Must be called from the main
+    thread.
+    """
+    def handle(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down")
+        try:
+            if cleanup is not None:
+                cleanup()
+        finally:
+            terminate_all()
+            logging.shutdown()
+            os._exit(128 + signum)
+
+    for signum in signals:
+        signal.signal(signum, handle)
+
+
+def descendant_pids(pid: Optional[int] = None) -> List[int]:
+    """Pids of every live descendant of ``pid`` (this process by default), from /proc."""
+    pid = os.getpid() if pid is None else pid
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # Zombies are already dead; they only wait to be reaped
+        if fields[0] == "Z":
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    found = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# jigglypuff/cliclick_helper.py
+"""
+Line-oriented pointer helper used by the persistent cliclick backend.
+
+cliclick itself reads a command file to EOF before executing it, so it cannot
+sit on a pipe. This helper speaks the same `m:` / `w:` command syntax, one
+batch per line, and answers every line with ``ok`` or ``error: <reason>``.
+
+Moves go through CoreGraphics when it can be loaded, otherwise each batch is
+handed to `cliclick`. With ``--dry-run`` moves are applied to a virtual
+pointer instead; that is the stand-in used for tests and benchmarks on Linux.
+
+Usage:
+    python -m jigglypuff.cliclick_helper [--dry-run]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from jigglypuff.backends import NativeBackend, PointerBackend, RecordingBackend
+
+
+def _parse_move(argument: str):
+    x, y = argument.split(",")
+    if not (x[:1] in "+-" and y[:1] in "+-") or not x[1:] or not y[1:]:
+        raise ValueError(f"only relative moves are supported: m:{argument}")
+    return int(x), int(y)
+
+
+def execute(commands: List[str], pointer: Optional[PointerBackend]) -> None:
+    """Execute one batch of cliclick commands."""
+    if pointer is None:
+        subprocess.run(["cliclick", *commands], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+
+    for command in commands:
+        action, _, argument = command.partition(":")
+        if action == "m":
+            pointer.move(*_parse_move(argument))
+        elif action == "w":
+            time.sleep(int(argument) / 1000)
+        else:
+            raise ValueError(f"unsupported command: {command}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="jigglypuff pointer helper")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="apply moves to a virtual pointer instead of the real one")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        pointer: Optional[PointerBackend] = RecordingBackend()
+    elif NativeBackend.is_available():
+        pointer = NativeBackend()
+    else:
+        pointer = None
+
+    for line in sys.stdin:
+        commands = line.split()
+        try:
+            execute(commands, pointer)
+            reply = "ok"
+        except Exception as e:
+            reply = f"error: {e}"
+        sys.stdout.write(reply + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
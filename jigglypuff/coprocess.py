@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# jigglypuff/coprocess.py
+
+import logging
+import os
+import select
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from jigglypuff.children import terminate_group, track
+from jigglypuff.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Command that starts the default helper; see jigglypuff/cliclick_helper.py
+DEFAULT_HELPER = [sys.executable, "-m", "jigglypuff.cliclick_helper"]
+
+_RESTARTS = REGISTRY.counter(
+    "process_restarts_total", "Helper processes started again after dying", process="pointer_helper"
+)
+
+
+class CoprocessError(RuntimeError):
+    """Raised when the pointer helper cannot execute a batch."""
+
+
+class PointerCoprocess:
+    """Long-lived helper process that executes cliclick commands from a pipe.
+
+    Each call to ``send`` writes one line holding every command of a tick and
+    waits for a one-line acknowledgement (``ok`` or ``error: ...``). If the
+    helper has died it is started again and the batch is retried once.
+
+    The helper runs in its own process group, which is torn down with it
+    (so per-batch `cliclick` children cannot be orphaned) and when the server
+    exits. If the server is killed outright, the helper exits on stdin EOF.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, timeout: float = 5.0):
+        self.command = list(command or DEFAULT_HELPER)
+        self.timeout = timeout
+        self.spawns = 0
+        self.restarts = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._buffer = b""
+        self._closed = False
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc else None
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def send(self, commands: List[str]) -> str:
+        """Execute one batch of commands and return the helper's reply."""
+        line = (" ".join(commands) + "\n").encode()
+        try:
+            reply = self._exchange(line)
+        except (BrokenPipeError, EOFError, TimeoutError) as e:
+            logger.warning(f"Pointer helper failed ({e}), restarting it")
+            self._terminate()
+            reply = self._exchange(line)
+
+        if reply.startswith("error"):
+            raise CoprocessError(reply)
+        return reply
+
+    def close(self) -> None:
+        """Stop the helper by closing its stdin."""
+        self._closed = True
+        self._terminate()
+
+    def _spawn(self) -> None:
+        if self.spawns and not self._closed:
+            self.restarts += 1
+            _RESTARTS.inc()
+        self._closed = False
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            env=env,
+            start_new_session=True,
+        )
+        track(self._proc)
+        self._buffer = b""
+        self.spawns += 1
+
+    def _exchange(self, line: bytes) -> str:
+        if not self.alive:
+            self._spawn()
+        self._proc.stdin.write(line)
+        return self._read_line()
+
+    def _read_line(self) -> str:
+        fd = self._proc.stdout.fileno()
+        deadline = time.monotonic() + self.timeout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"no reply from pointer helper within {self.timeout}s")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                raise EOFError("pointer helper exited")
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode().strip()
+
+    def _terminate(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        # Whatever is left of the group (a hung helper, a stray cliclick) goes too
+        terminate_group(proc, timeout=0.5)
+        proc.stdout.close()
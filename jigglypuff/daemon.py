@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# jigglypuff/daemon.py
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon cannot be reached or rejects a request."""
+
+
+def default_socket_path() -> str:
+    """JIGGLYPUFF_SOCKET, else a per-user socket in the runtime or temp dir."""
+    if os.environ.get("JIGGLYPUFF_SOCKET"):
+        return os.environ["JIGGLYPUFF_SOCKET"]
+    directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(directory, f"jigglypuff-{os.getuid()}.sock")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        control = self.server.control
+        with control._lock:
+            control._connections.add(self.connection)
+        try:
+            for line in self.rfile:
+                self.wfile.write((json.dumps(control.dispatch(line)) + "\n").encode())
+                self.wfile.flush()
+        finally:
+            with control._lock:
+                control._connections.discard(self.connection)
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class ControlServer:
+    """Serves a table of operations over a Unix domain socket.
+
+    The protocol is one JSON object per line in each direction: requests
+    look like ``{"op": "start", "args": {...}}`` and replies like
+    ``{"ok": true, "result": ...}`` or ``{"ok": false, "error": "..."}``.
+    Operations run one at a time, in arrival order, except the ones named
+    in ``concurrent``: those only read state (and may block waiting for
+    it, like an event long-poll), so they run outside the lock and never
+    hold up a start or stop.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[..., Any]], path: Optional[str] = None,
+                 concurrent: Iterable[str] = ()):
+        self.handlers = handlers
+        self.concurrent = frozenset(concurrent)
+        self.path = path or default_socket_path()
+        self._lock = threading.Lock()
+        self._ops_lock = threading.Lock()
+        self._connections: Set[socket.socket] = set()
+        self._server: Optional[_UnixServer] = None
+
+    def dispatch(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            handler = self.handlers.get(request.get("op"))
+            if handler is None:
+                return {"ok": False, "error": f"unknown op: {request.get('op')}"}
+            if request["op"] in self.concurrent:
+                return {"ok": True, "result": handler(**request.get("args", {}))}
+            with self._ops_lock:
+                return {"ok": True, "result": handler(**request.get("args", {}))}
+        except Exception as e:
+            logger.error(f"Daemon request failed: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def bind(self) -> None:
+        """Take over the socket path, refusing if another daemon is listening on it."""
+        if os.path.exists(self.path):
+            if _listening(self.path):
+                raise DaemonError(f"a jigglypuff daemon is already listening on {self.path}")
+            os.unlink(self.path)
+        old_umask = os.umask(0o177)  # owner-only socket
+        try:
+            self._server = _UnixServer(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.control = self
+        logger.info(f"jigglypuff daemon listening on {self.path}")
+
+    def serve_forever(self) -> None:
+        if self._server is None:
+            self.bind()
+        self._server.serve_forever()
+
+    def start(self) -> None:
+        """Serve on a background thread."""
+        if self._server is None:
+            self.bind()
+        threading.Thread(target=self._server.serve_forever, name="jigglypuff-daemon", daemon=True).start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            # Drop open client connections too, so clients reconnect to whatever
+            # listens on the path next instead of talking to a closed server
+            with self._lock:
+                connections = list(self._connections)
+            for conn in connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.unlink()
+
+    def unlink(self) -> None:
+        """Remove the socket path. Unlike close(), safe from a signal handler
+        interrupting serve_forever()."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _listening(path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+class DaemonClient:
+    """Client for a ControlServer; reuses its connections and reconnects after errors.
+
+    Every call takes a connection of its own from a small pool, so a call
+    that waits on the daemon (an events long-poll) never holds up another
+    one made meanwhile, such as a stop.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 10.0, pool_size: int = 4):
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle: List[Tuple[socket.socket, Any]] = []
+        self._lock = threading.Lock()
+
+    def call(self, op: str, **args) -> Any:
+        """Run one operation on the daemon and return its result."""
+        line = (json.dumps({"op": op, "args": args}) + "\n").encode()
+        for attempt in (1, 2):
+            connection = None
+            try:
+                connection = self._checkout()
+                sock, reader = connection
+                sock.sendall(line)
+                reply = reader.readline()
+                if not reply:
+                    raise ConnectionError("daemon closed the connection")
+                break
+            except OSError as e:
+                if connection is not None:
+                    _close_connection(connection)
+                # Pooled connections to a daemon that went away are dead too
+                self.close()
+                if attempt == 2:
+                    raise DaemonError(f"jigglypuff daemon at {self.path} unavailable: {e}") from e
+        self._checkin(connection)
+        response = json.loads(reply)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "unknown daemon error"))
+        return response.get("result")
+
+    def close(self) -> None:
+        """Close the idle connections; ones in use are closed when their call returns."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            _close_connection(connection)
+
+    def _checkout(self) -> Tuple[socket.socket, Any]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile("rb")
+
+    def _checkin(self, connection: Tuple[socket.socket, Any]) -> None:
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        _close_connection(connection)
+
+
+def _close_connection(connection: Tuple[socket.socket, Any]) -> None:
+    sock, reader = connection
+    reader.close()
+    sock.close()
+
+
+def spawn_daemon(command: List[str], path: Optional[str] = None, timeout: float = 10.0) -> subprocess.Popen:
+    """Start a daemon detached from this process and wait for its socket.
+
+    The daemon gets its own session and is not tracked as a child, so it
+    outlives the front-end that started it.
+    """
+    path = path or default_socket_path()
+    proc = subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        env=dict(os.environ, JIGGLYPUFF_SOCKET=path),
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _listening(path):
+            logger.info(f"Started jigglypuff daemon with PID {proc.pid} on {path}")
+            return proc
+        if proc.poll() is not None:
+            # Lost a race with another front-end that started one first
+            if _listening(path):
+                return proc
+            raise DaemonError(f"jigglypuff daemon exited with code {proc.returncode}")
+        time.sleep(0.02)
+    raise DaemonError(f"jigglypuff daemon did not listen on {path} within {timeout}s")
+
+
+def connect_or_spawn(command: List[str], path: Optional[str] = None) -> DaemonClient:
+    """Client for the daemon at ``path``, starting one with ``command`` if none is listening."""
+    path = path or default_socket_path()
+    if not _listening(path):
+        spawn_daemon(command, path)
+    return DaemonClient(path)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# jigglypuff/deadline.py
+
+import ctypes
+import logging
+import os
+import re
+import shutil
+import subprocess
+from typing import List, Optional, Tuple
+
+from jigglypuff.backends import _find_library
+
+logger = logging.getLogger(__name__)
+
+# Used when no screensaver or sleep timeout can be discovered
+FALLBACK_IDLE_TIMEOUT = 60.0
+
+
+def safety_margin(idle_timeout: float) -> float:
+    """How long before the idle deadline to jiggle: 10%, between 1s and 30s."""
+    return min(30.0, max(1.0, idle_timeout * 0.1))
+
+
+def plan_interval(idle_timeout: float) -> float:
+    """Longest interval that still lands every jiggle before the deadline."""
+    return max(1.0, idle_timeout - safety_margin(idle_timeout))
+
+
+def _x11_timeout() -> Optional[float]:
+    if not os.environ.get("DISPLAY"):
+        return None
+    path = _find_library("X11")
+    if not path:
+        return None
+    xlib = ctypes.cdll.LoadLibrary(path)
+    xlib.XOpenDisplay.restype = ctypes.c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    xlib.XGetScreenSaver.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_int)] * 4
+
+    display = xlib.XOpenDisplay(None)
+    if not display:
+        return None
+    try:
+        timeout, interval, blanking, exposures = (ctypes.c_int() for _ in range(4))
+        xlib.XGetScreenSaver(display, timeout, interval, blanking, exposures)
+        return float(timeout.value) or None
+    finally:
+        xlib.XCloseDisplay(display)
+
+
+def _gnome_timeout() -> Optional[float]:
+    if not shutil.which("gsettings"):
+        return None
+    output = subprocess.run(
+        ["gsettings", "get", "org.gnome.desktop.session", "idle-delay"],
+        capture_output=True, text=True, timeout=2,
+    ).stdout
+    match = re.search(r"(\d+)\s*$", output.strip())
+    if not match or match.group(1) == "0":
+        return None
+    return float(match.group(1))
+
+
+def _pmset_timeout() -> Optional[float]:
+    if not shutil.which("pmset"):
+        return None
+    output = subprocess.run(["pmset", "-g"], capture_output=True, text=True, timeout=2).stdout
+    minutes = [
+        int(value)
+        for key, value in re.findall(r"^\s*(displaysleep|sleep)\s+(\d+)", output, re.MULTILINE)
+    ]
+    minutes = [m for m in minutes if m > 0]
+    return min(minutes) * 60.0 if minutes else None
+
+
+def discover_idle_timeout() -> Tuple[float, str]:
+    """Find the shortest screensaver/sleep timeout on this host.
+
+    Returns:
+        (timeout in seconds, where it came from). JIGGLYPUFF_IDLE_TIMEOUT wins
+        over discovery; FALLBACK_IDLE_TIMEOUT is used if nothing is found.
+    """
+    if os.environ.get("JIGGLYPUFF_IDLE_TIMEOUT"):
+        return float(os.environ["JIGGLYPUFF_IDLE_TIMEOUT"]), "env"
+
+    found: List[Tuple[float, str]] = []
+    for source, probe in (("x11", _x11_timeout), ("gnome", _gnome_timeout), ("pmset", _pmset_timeout)):
+        try:
+            timeout = probe()
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            logger.debug(f"Idle timeout probe {source} failed: {e}")
+            continue
+        if timeout:
+            found.append((timeout, source))
+
+    if not found:
+        return FALLBACK_IDLE_TIMEOUT, "fallback"
+    return min(found)
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# jigglypuff/engine.py
+
+import itertools
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from jigglypuff import timerfd
+from jigglypuff.backends import PointerBackend
+from jigglypuff.events import EventRing
+from jigglypuff.inhibit import HYBRID_MIN_INTERVAL, STRATEGIES, Inhibitor
+from jigglypuff.logsink import JiggleLog
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+from jigglypuff.power import PowerProfile, SuspendDetector
+
+if TYPE_CHECKING:
+    from jigglypuff.idle import IdleSource
+    from jigglypuff.supervisor import Supervisor
+
+logger = logging.getLogger(__name__)
+
+_session_ids = itertools.count(1)
+
+# Jiggle when the user is within this many seconds of the idle threshold
+# (or 5% of it, for short thresholds)
+IDLE_TOLERANCE = 0.5
+
+SESSION_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800)
+
+# How long after a wait's deadline its boot-clock backstop fires, beyond the
+# timer slack, so that without a suspend the ordinary timeout always wins
+RESUME_BACKSTOP = 0.01
+
+
+class JiggleEngine:
+    """Scheduler thread that jiggles the pointer through a backend.
+
+    Behaves like the old bash loop: log a start line, jiggle immediately,
+    then jiggle once per interval until stopped, and log a stop line. Unlike
+    the loop, ticks are scheduled on absolute monotonic deadlines, so the
+    period stays ``interval`` however long the backend takes; ticks that
+    could not run on time are skipped, and every tick's lateness is recorded.
+
+    With an idle source, a tick is skipped while the user has been active
+    more recently than ``idle_threshold`` seconds (the interval by default),
+    and the next check is scheduled for when the threshold would be reached.
+
+    Given ``idle_timeout`` (the screensaver/sleep deadline), every jiggle
+    records its slack: how many seconds were left before the deadline.
+
+    The ``strategy`` decides how the machine is kept awake: "jiggle" moves
+    the pointer, "inhibit" only holds an OS sleep inhibitor (no thread, no
+    injected events) and "hybrid" holds the inhibitor and jiggles rarely.
+
+    Tick counts, backend latency, tick drift and session length are recorded
+    in ``metrics`` (the process-wide registry by default).
+
+    If the scheduler thread crashes or the inhibitor exits without ``stop``
+    being called, the reason is kept in ``failure`` and passed to
+    ``on_failure``; ``revive`` restarts whatever died (see Supervisor).
+    ``on_change`` is called with "failed" or "revived" once such a change
+    has been handled, so cached status can be refreshed.
+
+    When the machine was suspended, the schedule is re-planned from the
+    resume: one jiggle right away, with no catch-up and no missed ticks
+    counted. On Linux each wait is backed by a CLOCK_BOOTTIME timerfd, so
+    a suspend that outlasted the next deadline wakes the scheduler at the
+    resume; elsewhere the resume is noticed at the next tick. ``power`` applies a PowerProfile
+    to the scheduler thread and aligns its deadlines.
+
+    Given ``events``, what the session does (started, jiggled, skipped,
+    stopped, crashed, inhibitor held and released, ...) is also recorded
+    there as structured events.
+    """
+
+    def __init__(
+        self,
+        backend: PointerBackend,
+        interval: Union[int, float] = 30,
+        offset: int = 1,
+        log: Optional[JiggleLog] = None,
+        idle_source: Optional["IdleSource"] = None,
+        idle_threshold: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        strategy: str = "jiggle",
+        inhibitor: Optional[Inhibitor] = None,
+        metrics: MetricsRegistry = REGISTRY,
+        power: Optional[PowerProfile] = None,
+        suspend_detector: Optional[SuspendDetector] = None,
+        events: Optional[EventRing] = None,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy} (choose from {', '.join(STRATEGIES)})")
+        if strategy == "hybrid":
+            interval = max(interval, HYBRID_MIN_INTERVAL)
+        self.backend = backend
+        self.strategy = strategy
+        self.inhibitor = inhibitor or (Inhibitor() if strategy != "jiggle" else None)
+        if self.inhibitor is not None:
+            self.inhibitor.on_exit = self._inhibitor_exited
+        self.interval = interval
+        self.offset = offset
+        self.log = log
+        self.idle_source = idle_source
+        self._idle_threshold = idle_threshold
+        self.idle_timeout = idle_timeout
+        self.session_id = next(_session_ids)
+        self.power = power or PowerProfile()
+        self.suspend_detector = suspend_detector or SuspendDetector()
+        self.events = events
+
+        self.ticks = 0
+        self.skipped = 0
+        self.deadline_slack_last: Optional[float] = None
+        self.deadline_slack_min: Optional[float] = None
+        self.deadline_misses = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.missed_ticks = 0
+        self.lateness_last: Optional[float] = None
+        self.lateness_max = 0.0
+        self._lateness_count = 0
+        self._lateness_sum = 0.0
+        self._lateness_squares = 0.0
+        self.started_at: Optional[float] = None
+        self.failure: Optional[str] = None
+        self.on_failure: Optional[Callable[[str], None]] = None
+        self.on_change: Optional[Callable[[str], None]] = None
+        self.supervisor: Optional["Supervisor"] = None
+
+        # Looked up once so the tick path only touches plain attributes
+        self._ticks_scheduled = metrics.counter("ticks_scheduled_total", "Ticks the scheduler woke up for")
+        self._ticks_executed = metrics.counter("ticks_executed_total", "Ticks that jiggled the pointer")
+        self._ticks_skipped = metrics.counter("ticks_skipped_total", "Ticks skipped while the user was active")
+        self._tick_errors = metrics.counter("tick_errors_total", "Ticks whose backend call failed")
+        self._backend_latency = metrics.histogram(
+            "backend_call_seconds", "Duration of pointer backend jiggle calls", backend=backend.name
+        )
+        self._tick_drift = metrics.histogram("tick_drift_seconds", "How late ticks fired after their due time")
+        self._ticks_missed = metrics.counter("ticks_missed_total", "Ticks skipped because an earlier one overran")
+        self._session_seconds = metrics.histogram(
+            "session_seconds", "Length of finished jiggle sessions", buckets=SESSION_BUCKETS
+        )
+        self._resumes = metrics.counter("suspend_resumes_total", "Schedules re-planned after a system suspend")
+
+        self._last_jiggle: Optional[float] = None
+        self._stopping = False
+        self._wake = self._wake_event()
+        # Set once the scheduler has written its stop line; backend teardown may still follow
+        self._finished = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Orders stop() against a concurrent revive() from the supervisor
+        self._lifecycle = threading.Lock()
+        self._released = False
+
+    @property
+    def jiggles(self) -> bool:
+        """Whether this session injects pointer movement at all."""
+        return self.strategy != "inhibit"
+
+    @property
+    def running(self) -> bool:
+        if not self.jiggles:
+            return self.inhibitor.alive
+        return self._thread is not None and self._thread.is_alive() and not self._finished.is_set()
+
+    @property
+    def stopping(self) -> bool:
+        """Whether ``stop`` has been called."""
+        return self._stopping
+
+    @property
+    def idle_threshold(self) -> float:
+        return self._idle_threshold if self._idle_threshold is not None else self.interval
+
+    @property
+    def skip_ratio(self) -> Optional[float]:
+        """Skipped ticks per injected tick, or None before the first jiggle."""
+        return self.skipped / self.ticks if self.ticks else None
+
+    @property
+    def lateness_mean(self) -> Optional[float]:
+        """Mean seconds a tick fired after its deadline, or None before the first wait."""
+        return self._lateness_sum / self._lateness_count if self._lateness_count else None
+
+    @property
+    def jitter(self) -> Optional[float]:
+        """Standard deviation of tick lateness in seconds."""
+        if not self._lateness_count:
+            return None
+        mean = self._lateness_sum / self._lateness_count
+        return max(0.0, self._lateness_squares / self._lateness_count - mean * mean) ** 0.5
+
+    def start(self) -> None:
+        """Take the inhibitor, if any, and start the scheduler thread."""
+        if self.running:
+            return
+        self._stopping = False
+        self._released = False
+        self.failure = None
+        self.started_at = time.time()
+        if self.inhibitor is not None:
+            self.inhibitor.start()
+            self._log(f"Sleep inhibitor held with strategy={self.strategy}")
+            self._event("inhibited", strategy=self.strategy)
+        if self.jiggles:
+            self._start_thread()
+
+    def revive(self) -> None:
+        """Restart the parts of a failed session that died, keeping its id and stats.
+
+        Does nothing once ``stop`` has been called.
+        """
+        with self._lifecycle:
+            if self._stopping:
+                return
+            self.failure = None
+            if self.inhibitor is not None and not self.inhibitor.alive:
+                self.inhibitor.start()
+                self._log(f"Sleep inhibitor held with strategy={self.strategy}")
+                self._event("inhibited", strategy=self.strategy)
+            if self.jiggles and self._finished.is_set():
+                self._start_thread()
+        self._event("restarted")
+        self._changed("revived")
+
+    def _start_thread(self) -> None:
+        self._wake.clear()
+        self._finished.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"jigglypuff-{self.session_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """Stop the scheduler thread and release the inhibitor.
+
+        Returns as soon as the scheduler has written its stop line, without
+        waiting for the interval, a jiggle's pause or the backend teardown
+        (closing a helper process), which finishes on the scheduler thread.
+
+        Returns:
+            True if the scheduler stopped within ``timeout`` seconds.
+        """
+        with self._lifecycle:
+            if self.started_at is not None and not self._stopping:
+                self._session_seconds.observe(time.time() - self.started_at)
+            self._stopping = True
+        if self.supervisor is not None:
+            self.supervisor.cancel()
+        self._wake.set()
+        stopped = True
+        if self._thread is not None:
+            self.backend.interrupt()
+            stopped = self._finished.wait(timeout)
+            if stopped and not self._thread.is_alive():
+                # A crashed scheduler left the backend open for a restart
+                self._release()
+        if self.inhibitor is not None:
+            self.inhibitor.stop()
+            self._log("Sleep inhibitor released")
+            self._event("released")
+            if self.log is not None:
+                self.log.flush()
+        return stopped
+
+    def retune(self, interval: Union[int, float], offset: int) -> None:
+        """Change interval and offset without restarting the session.
+
+        The new interval is measured from the last tick's deadline, so
+        shortening it may trigger a jiggle right away.
+        """
+        if self.strategy == "hybrid":
+            interval = max(interval, HYBRID_MIN_INTERVAL)
+        if (interval, offset) == (self.interval, self.offset):
+            return
+        self.interval = interval
+        self.offset = offset
+        self._log(f"Mouse jiggler retuned to interval={interval}s, offset={offset}px")
+        self._event("retuned", interval=interval, offset=offset)
+        self._wake.set()
+
+    def _run(self) -> None:
+        failure = None
+        self._log(f"Mouse jiggler started with interval={self.interval}s, offset={self.offset}px")
+        self._event("started", interval=self.interval, offset=self.offset, backend=self.backend.name)
+        try:
+            applied = self.power.apply()
+            if applied:
+                logger.debug(f"Power profile {self.power.name} applied: {', '.join(applied)}")
+            self.suspend_detector.reset()
+            due = time.monotonic()
+            while not self._stopping:
+                next_due = self._tick(due)
+                due = self._sleep_until_next_tick(due, next_due)
+                if due is None:
+                    break
+        except Exception as e:
+            logger.exception(f"jigglypuff session {self.session_id} scheduler crashed")
+            failure = f"scheduler crashed: {e!r}"
+        finally:
+            self._log("Mouse jiggler stopped")
+            self._event("stopped", ticks=self.ticks)
+            if self.log is not None:
+                self.log.flush()
+            self._finished.set()
+            # After a crash the backend and idle source stay open for revive()
+            if self._stopping:
+                self._release()
+        if failure is not None:
+            self._fail(failure)
+
+    def _release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.backend.close()
+        if self.idle_source is not None:
+            self.idle_source.close()
+
+    def _inhibitor_exited(self, returncode: int) -> None:
+        if not self._stopping:
+            self._event("released", exit_code=returncode)
+            self._fail(f"sleep inhibitor exited with code {returncode}")
+
+    def _fail(self, reason: str) -> None:
+        if self._stopping:
+            return
+        self.failure = reason
+        logger.warning(f"jigglypuff session {self.session_id} failed: {reason}")
+        self._event("crashed", reason=reason)
+        if self.on_failure is not None:
+            self.on_failure(reason)
+        self._changed("failed")
+
+    def _changed(self, reason: str) -> None:
+        if self.on_change is not None:
+            self.on_change(reason)
+
+    def _sleep_until_next_tick(self, last_due: float, next_due: float) -> Optional[float]:
+        """Wait for the next tick; return its deadline, or None if the engine is stopping.
+
+        Deadlines are absolute monotonic times, so the time spent in a tick
+        does not push the schedule back. A retune that shortens the interval
+        pulls the next tick in to ``last_due`` plus the new interval.
+
+        The wait runs on the monotonic clock, which does not count a
+        suspend; the boot-clock backstop of ``_wake`` ends it at the resume
+        instead, without any extra wakeups while the machine is up.
+        """
+        planned_interval = self.interval
+        while True:
+            due = next_due
+            if self.interval < planned_interval:
+                due = min(next_due, last_due + self.interval)
+            if self._resumed():
+                # Start a fresh schedule instead of treating the sleep as lateness
+                return time.monotonic()
+            remaining = due - time.monotonic()
+            if remaining <= 0:
+                self._record_lateness(-remaining)
+                return due
+            self._wake.wait(remaining)
+            self._wake.clear()
+            if self._stopping:
+                return None
+
+    def _wake_event(self):
+        if self.suspend_detector.available and timerfd.available():
+            try:
+                return timerfd.TimerEvent(
+                    timerfd.CLOCK_BOOTTIME, backstop=(self.power.timer_slack or 0.0) + RESUME_BACKSTOP
+                )
+            except OSError as e:
+                logger.debug(f"No boot clock timer, resumes are noticed at the next tick: {e}")
+        return threading.Event()
+
+    def _resumed(self) -> bool:
+        gap = self.suspend_detector.check()
+        if not gap:
+            return False
+        self._resumes.inc()
+        self._log(f"System resumed after {gap:.0f}s asleep, re-planning ticks")
+        self._event("resumed", asleep_seconds=round(gap, 1))
+        return True
+
+    def _next_due(self, due: float) -> float:
+        """The next deadline on the interval grid that is still ahead.
+
+        Ticks missed because a tick overran (or the thread was starved) are
+        skipped rather than fired back to back.
+        """
+        next_due = due + self.interval
+        now = time.monotonic()
+        if next_due <= now:
+            missed = int((now - next_due) // self.interval) + 1
+            self.missed_ticks += missed
+            self._ticks_missed.inc(missed)
+            next_due += missed * self.interval
+        return self.power.align_up(next_due, self.interval)
+
+    def _tick(self, due: float) -> float:
+        """Jiggle unless the user is active; return the deadline of the next tick."""
+        self._ticks_scheduled.inc()
+        idle = self._idle_seconds()
+        tolerance = min(IDLE_TOLERANCE, self.idle_threshold * 0.05)
+        if idle is not None and idle < self.idle_threshold - tolerance:
+            self.skipped += 1
+            self._ticks_skipped.inc()
+            self._event("skipped", idle_seconds=round(idle, 3))
+            # Check again when the threshold would be reached, or after an interval
+            return self.power.align_up(
+                time.monotonic() + min(self.idle_threshold - idle, self.interval), self.interval
+            )
+
+        if self.idle_timeout is not None:
+            self._record_slack(idle)
+
+        began = time.perf_counter()
+        try:
+            self.backend.jiggle(self.offset)
+        except Exception as e:
+            self.errors += 1
+            self._tick_errors.inc()
+            if self.last_error is None:
+                logger.warning(f"{self.backend.name} backend failed to jiggle: {e}")
+            self.last_error = str(e)
+            self._event("error", error=str(e))
+            return self._next_due(due)
+        finally:
+            self._backend_latency.observe(time.perf_counter() - began)
+        self.ticks += 1
+        self._ticks_executed.inc()
+        self._last_jiggle = time.monotonic()
+        self._log("Mouse jiggled")
+        self._event("jiggled", offset=self.offset)
+        return self._next_due(due)
+
+    def _record_lateness(self, lateness: float) -> None:
+        self._tick_drift.observe(lateness)
+        self.lateness_last = lateness
+        self.lateness_max = max(self.lateness_max, lateness)
+        self._lateness_count += 1
+        self._lateness_sum += lateness
+        self._lateness_squares += lateness * lateness
+
+    def _record_slack(self, idle: Optional[float]) -> None:
+        if idle is None:
+            # Without an idle source, assume our own last jiggle was the last input
+            if self._last_jiggle is None:
+                return
+            idle = time.monotonic() - self._last_jiggle
+        slack = self.idle_timeout - idle
+        self.deadline_slack_last = slack
+        if self.deadline_slack_min is None or slack < self.deadline_slack_min:
+            self.deadline_slack_min = slack
+        if slack <= 0:
+            self.deadline_misses += 1
+
+    def _idle_seconds(self) -> Optional[float]:
+        if self.idle_source is None:
+            return None
+        try:
+            return self.idle_source.idle_seconds()
+        except Exception as e:
+            logger.debug(f"{self.idle_source.name} idle source failed: {e}")
+            return None
+
+    def _event(self, kind: str, **detail) -> None:
+        if self.events is not None:
+            self.events.append(kind, self.session_id, **detail)
+
+    def _log(self, message: str) -> None:
+        if self.log is not None:
+            self.log.write(message)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# jigglypuff/events.py
+
+import asyncio
+import collections
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional, Tuple
+
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    """Something a jiggle session did, e.g. started, jiggled, skipped, stopped or crashed."""
+
+    seq: int
+    time: float
+    kind: str
+    session_id: Optional[int] = None
+    detail: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"seq": self.seq, "time": self.time, "kind": self.kind,
+                "session_id": self.session_id, **self.detail}
+
+
+def _wake(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class EventRing:
+    """Bounded ring buffer of events with increasing sequence numbers.
+
+    Only the newest ``capacity`` events are kept, so memory stays fixed
+    however long the jiggler runs. Readers keep the last sequence number
+    they saw as a cursor and ask for what came after it; they can wait for
+    the next event from a thread (``wait``) or from an event loop
+    (``wait_async``) without polling. Listeners added with ``subscribe``
+    see every event, e.g. to keep a history on disk.
+    """
+
+    def __init__(self, capacity: int = 1024, metrics: MetricsRegistry = REGISTRY):
+        self.capacity = capacity
+        self._events: Deque[Event] = collections.deque(maxlen=capacity)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._listeners: List[Callable[[Event], None]] = []
+        self._recorded = metrics.counter("events_total", "Events recorded in the event ring")
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest event, 0 before the first."""
+        return self._seq
+
+    def append(self, kind: str, session_id: Optional[int] = None, **detail) -> Event:
+        """Record an event and wake everyone waiting for one."""
+        with self._cond:
+            self._seq += 1
+            event = Event(self._seq, time.time(), kind, session_id, detail)
+            self._events.append(event)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+            listeners = list(self._listeners)
+        self._recorded.inc()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's event loop has been closed
+                pass
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Event listener failed: {e}")
+        return event
+
+    def subscribe(self, listener: Callable[[Event], None]) -> None:
+        """Call ``listener(event)`` after every event is recorded."""
+        with self._cond:
+            self._listeners.append(listener)
+
+    def since(self, seq: int, limit: int = 100) -> Tuple[List[Event], int]:
+        """Up to ``limit`` events after ``seq``, and how many after it were already overwritten."""
+        with self._cond:
+            if not self._events:
+                return [], 0
+            first = self._events[0].seq
+            start = max(0, seq + 1 - first)
+            missed = max(0, first - seq - 1)
+            return list(itertools.islice(self._events, start, start + limit)), missed
+
+    def wait(self, seq: int, timeout: float) -> bool:
+        """Block until there is an event after ``seq``; return False on timeout.
+
+        A cursor ahead of the newest event (kept from before a restart)
+        returns at once, so the reader can pick up ``last_seq``.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq != seq, timeout)
+
+    async def wait_async(self, seq: int, timeout: float) -> bool:
+        """Like ``wait``, but suspends the calling coroutine instead of a thread."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._seq != seq:
+                return True
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._cond:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+            return False
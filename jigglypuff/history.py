@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# jigglypuff/history.py
+
+import bisect
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from jigglypuff.events import Event
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"JPHIST1\n"
+
+# time (wall clock), interval of the session, session id, kind, flags, writer.
+# Session ids restart at 1 in every process, so a session is (writer, session id);
+# the writer is the low 16 bits of the writing process's pid (0 in older files).
+RECORD = struct.Struct("<dfIBBH")
+_TIME = struct.Struct("<d")
+
+KINDS = ("started", "jiggled", "skipped", "error", "retuned", "restarted", "resumed",
+         "stopped", "crashed", "inhibited", "released")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# The session's sleep inhibitor was held after this record
+HELD = 1
+
+# Kinds after which the machine stays awake for one interval
+_TICKS = frozenset(_KIND_CODES[kind] for kind in ("started", "jiggled", "skipped", "resumed"))
+# Kinds that end the interval of the last tick
+_ENDS = frozenset(_KIND_CODES[kind] for kind in ("stopped", "crashed"))
+
+# How far back a query looks for the tick that was still covering its start
+_LOOKBACK = 64
+
+# Failed appends are logged at most once per this many seconds
+WARN_INTERVAL = 60.0
+
+
+def default_history_path() -> Optional[str]:
+    """History file shared by every server of this user, overridable with JIGGLYPUFF_HISTORY.
+
+    "none" turns the history off.
+    """
+    path = os.environ.get("JIGGLYPUFF_HISTORY")
+    if path:
+        return None if path.lower() == "none" else path
+    state = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(state, "jigglypuff", "history.bin")
+
+
+class _Times:
+    """Record times of a mapped history file, as a sequence ``bisect`` can search."""
+
+    def __init__(self, buffer, count: int):
+        self.buffer = buffer
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> float:
+        return _TIME.unpack_from(self.buffer, len(MAGIC) + i * RECORD.size)[0]
+
+
+class HistoryStore:
+    """Append-only file of fixed-width jiggle records with a sparse time index.
+
+    Every event becomes one 20-byte record, appended under an exclusive
+    ``flock`` so that several servers can share the file. Record times
+    never go backwards, so the file is sorted by time. The index keeps the
+    time of every ``stride``-th record in memory; a query bisects the index,
+    then the records of one block through ``mmap``, and reads only the
+    records inside the requested range.
+
+    Events passed to ``record`` are queued and appended by one writer
+    thread, so the engine's tick never waits for the file lock or the
+    disk. Queries and ``close`` write the queue out first.
+    """
+
+    def __init__(self, path: Optional[str] = None, stride: int = 1024, metrics: MetricsRegistry = REGISTRY):
+        self.path = path or default_history_path()
+        self.stride = stride
+        self._fd: Optional[int] = None
+        self._index: List[float] = []
+        self._lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._queued = threading.Condition(self._queue_lock)
+        self._pending: List[Tuple[float, int, float, int, int]] = []
+        self._writer_thread: Optional[threading.Thread] = None
+        self._failures = 0
+        self._warned_at: Optional[float] = None
+        self._intervals: Dict[Optional[int], float] = {}
+        self._held: Set[Optional[int]] = set()
+        self.writer = os.getpid() & 0xFFFF
+        self._written = metrics.counter("history_records_total", "Records appended to the jiggle history")
+        self._queries = metrics.histogram("history_query_seconds", "Time to answer a jiggle history query")
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _open(self) -> int:
+        if self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    header = os.pread(fd, len(MAGIC), 0)
+                    if not header:
+                        os.write(fd, MAGIC)
+                    elif header != MAGIC:
+                        raise ValueError(f"{self.path} is not a jigglypuff history file")
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        return self._fd
+
+    def _count(self, fd: int) -> int:
+        return max(0, os.fstat(fd).st_size - len(MAGIC)) // RECORD.size
+
+    def record(self, event: Event) -> None:
+        """Queue an event from the event ring; kinds the history does not know are dropped."""
+        code = _KIND_CODES.get(event.kind)
+        if code is None or not self.enabled:
+            return
+        session = event.session_id
+        with self._queue_lock:
+            if "interval" in event.detail:
+                self._intervals[session] = float(event.detail["interval"])
+            if event.kind == "inhibited":
+                self._held.add(session)
+            elif event.kind in ("released", "stopped"):
+                self._held.discard(session)
+            interval = self._intervals.get(session, 0.0)
+            flags = HELD if session in self._held else 0
+            if event.kind in ("stopped", "crashed"):
+                self._intervals.pop(session, None)
+            self._pending.append((event.time, code, interval, session or 0, flags))
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._write_loop, name="jigglypuff-history",
+                                                       daemon=True)
+                self._writer_thread.start()
+            else:
+                self._queued.notify()
+
+    def _write_loop(self) -> None:
+        me = threading.current_thread()
+        while True:
+            with self._queue_lock:
+                while not self._pending and self._writer_thread is me:
+                    self._queued.wait()
+                if self._writer_thread is not me:
+                    return
+            self.flush()
+
+    def flush(self) -> None:
+        """Append every queued record to the file."""
+        # The file lock is taken first so that batches are written in the order they were queued
+        with self._lock:
+            with self._queue_lock:
+                records, self._pending = self._pending, []
+            if not records:
+                return
+            try:
+                self._append_locked(records)
+            except (OSError, ValueError) as e:
+                self._failed(len(records), e)
+
+    def _failed(self, count: int, error: Exception) -> None:
+        self._failures += count
+        now = time.monotonic()
+        if self._warned_at is None or now - self._warned_at >= WARN_INTERVAL:
+            logger.warning(f"Could not append {self._failures} record(s) to {self.path}: {error}")
+            self._warned_at = now
+            self._failures = 0
+
+    def append(self, when: float, kind: int, interval: float = 0.0, session: int = 0, flags: int = 0,
+               writer: Optional[int] = None) -> float:
+        """Write one record now; return its time, moved up to the last record's if the clock went back."""
+        with self._lock:
+            return self._append_locked([(when, kind, interval, session, flags)], writer)
+
+    def _append_locked(self, records: List[Tuple[float, int, float, int, int]],
+                       writer: Optional[int] = None) -> float:
+        if writer is None:
+            writer = self.writer
+        fd = self._open()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            size = os.fstat(fd).st_size
+            whole = len(MAGIC) + (size - len(MAGIC)) // RECORD.size * RECORD.size
+            if size != whole:
+                # A writer died in the middle of a record
+                os.ftruncate(fd, whole)
+            last = _TIME.unpack(os.pread(fd, _TIME.size, whole - RECORD.size))[0] if whole > len(MAGIC) else None
+            data = bytearray()
+            for when, kind, interval, session, flags in records:
+                if last is not None:
+                    when = max(when, last)
+                data += RECORD.pack(when, interval, session, kind, flags, writer)
+                last = when
+            os.write(fd, data)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._written.inc(len(records))
+        return last
+
+    def _refresh_index(self, fd: int, count: int) -> None:
+        for i in range(len(self._index) * self.stride, count, self.stride):
+            self._index.append(_TIME.unpack(os.pread(fd, _TIME.size, len(MAGIC) + i * RECORD.size))[0])
+
+    def _locate(self, times: _Times, when: float) -> int:
+        """Index of the first record at or after ``when``."""
+        block = bisect.bisect_left(self._index, when)
+        lo = max(0, (block - 1) * self.stride)
+        hi = min(len(times), block * self.stride) if block < len(self._index) else len(times)
+        return bisect.bisect_left(times, when, lo, hi)
+
+    def __len__(self) -> int:
+        if not self.enabled:
+            return 0
+        self.flush()
+        if self._fd is None and not os.path.exists(self.path):
+            return 0
+        with self._lock:
+            return self._count(self._open())
+
+    def query(self, start: float, end: float, min_gap: float = 1.0,
+              max_gaps: int = 100, now: Optional[float] = None) -> dict:
+        """Aggregate the records between ``start`` and ``end``.
+
+        The machine counts as kept awake for one interval after a start,
+        jiggle, idle skip or resume, until a stop or crash, and while a
+        sleep inhibitor is held. Each (writer, session) pair is followed on
+        its own, so one server stopping does not end another's coverage.
+        Uncovered stretches shorter than
+        ``min_gap`` seconds (tick lateness) are not gaps. Time after ``now``
+        is neither covered nor a gap.
+        """
+        began = time.perf_counter()
+        if end <= start:
+            raise ValueError("the range must end after it starts")
+        until = min(end, time.time() if now is None else now)
+        counts = {kind: 0 for kind in KINDS}
+        sessions: Set[Tuple[int, int]] = set()
+        segments: List[Tuple[float, float]] = []
+        scanned = 0
+
+        self.flush()
+        if self.enabled and (self._fd is not None or os.path.exists(self.path)):
+            with self._lock:
+                fd = self._open()
+                count = self._count(fd)
+                self._refresh_index(fd, count)
+            if count:
+                with mmap.mmap(fd, len(MAGIC) + count * RECORD.size, access=mmap.ACCESS_READ) as mm:
+                    times = _Times(mm, count)
+                    first = self._locate(times, start)
+                    # Step back to the records whose interval may still cover ``start``:
+                    # the last tick or end of every session seen on the way
+                    begin = first
+                    unresolved: Set[Tuple[int, int]] = set()
+                    resolved: Set[Tuple[int, int]] = set()
+                    while begin > 0 and first - begin < _LOOKBACK:
+                        begin -= 1
+                        _, _, session, kind, _, writer = RECORD.unpack_from(mm, len(MAGIC) + begin * RECORD.size)
+                        key = (writer, session)
+                        if kind in _TICKS or kind in _ENDS:
+                            resolved.add(key)
+                            unresolved.discard(key)
+                            if not unresolved:
+                                break
+                        elif key not in resolved:
+                            unresolved.add(key)
+                    ticks: Dict[Tuple[int, int], List[float]] = {}
+                    held: Dict[Tuple[int, int], float] = {}
+                    if begin > 0:
+                        _, _, session, _, flags, writer = RECORD.unpack_from(
+                            mm, len(MAGIC) + (begin - 1) * RECORD.size)
+                        if flags & HELD:
+                            held[(writer, session)] = start
+                    offset = len(MAGIC) + begin * RECORD.size
+                    for when, interval, session, kind, flags, writer in RECORD.iter_unpack(
+                            memoryview(mm)[offset:len(MAGIC) + self._locate(times, end) * RECORD.size]):
+                        scanned += 1
+                        key = (writer, session)
+                        if when >= start:
+                            counts[KINDS[kind]] += 1
+                            sessions.add(key)
+                        tick = ticks.get(key)
+                        if kind in _TICKS:
+                            if tick is not None and when > tick[1] + min_gap:
+                                segments.append((tick[0], tick[1]))
+                                tick = None
+                            if tick is None:
+                                ticks[key] = [when, when + interval]
+                            else:
+                                tick[1] = max(tick[1], when + interval)
+                        elif kind in _ENDS and tick is not None:
+                            segments.append((tick[0], min(tick[1], when)))
+                            del ticks[key]
+                        if flags & HELD and key not in held:
+                            held[key] = when
+                        elif not flags & HELD and key in held:
+                            segments.append((held.pop(key), when))
+                    segments.extend((tick_start, tick_end) for tick_start, tick_end in ticks.values())
+                    segments.extend((since, until) for since in held.values())
+
+        covered = 0.0
+        gaps: List[Tuple[float, float]] = []
+        edge = start
+        for seg_start, seg_end in sorted(segments):
+            seg_start, seg_end = max(seg_start, start), min(seg_end, until)
+            if seg_end <= edge:
+                continue
+            if seg_start > edge:
+                if seg_start - edge >= min_gap:
+                    gaps.append((edge, seg_start))
+                else:
+                    covered += seg_start - edge
+                edge = seg_start
+            covered += seg_end - edge
+            edge = seg_end
+        if until > edge:
+            if until - edge >= min_gap:
+                gaps.append((edge, until))
+            else:
+                covered += until - edge
+
+        self._queries.observe(time.perf_counter() - began)
+        return {
+            "start": start,
+            "end": end,
+            "seconds": round(until - start, 3) if until > start else 0.0,
+            "covered_seconds": round(covered, 3),
+            "covered_ratio": round(covered / (until - start), 4) if until > start else None,
+            "gap_count": len(gaps),
+            "longest_gap_seconds": round(max((b - a for a, b in gaps), default=0.0), 3),
+            "gaps": [{"start": a, "end": b, "seconds": round(b - a, 3)} for a, b in gaps[:max_gaps]],
+            "counts": {kind: n for kind, n in counts.items() if n},
+            "sessions": len(sessions),
+            "records_scanned": scanned,
+        }
+
+    def close(self) -> None:
+        """Write out the queue, stop the writer thread and close the file."""
+        self.flush()
+        with self._queue_lock:
+            self._writer_thread = None
+            self._queued.notify()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
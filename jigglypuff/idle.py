@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# jigglypuff/idle.py
+
+import ctypes
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from jigglypuff.backends import _find_library
+
+logger = logging.getLogger(__name__)
+
+
+class IdleSource:
+    """Base class for anything that can tell how long the user has been idle."""
+
+    name = "abstract"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Return True if this source can be used on the current host."""
+        return False
+
+    def idle_seconds(self) -> Optional[float]:
+        """Seconds since the last user input, or None if unknown."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the source."""
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("eventMask", ctypes.c_ulong),
+    ]
+
+
+class X11IdleSource(IdleSource):
+    """Idle time from the X11 MIT-SCREEN-SAVER extension."""
+
+    name = "x11"
+
+    def __init__(self, display: Optional[str] = None):
+        xlib_path = _find_library("X11")
+        xss_path = _find_library("Xss")
+        if not xlib_path or not xss_path:
+            raise OSError("libX11 and libXss are required for X11 idle time")
+        xlib = ctypes.cdll.LoadLibrary(xlib_path)
+        xss = ctypes.cdll.LoadLibrary(xss_path)
+
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+        xss.XScreenSaverQueryInfo.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XScreenSaverInfo)
+        ]
+
+        self._display = xlib.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise OSError(f"cannot open X display {display or os.environ.get('DISPLAY')}")
+        self._xlib = xlib
+        self._xss = xss
+        self._root = xlib.XDefaultRootWindow(self._display)
+        self._info = xss.XScreenSaverAllocInfo()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return bool(
+            os.environ.get("DISPLAY")
+            and _find_library("X11")
+            and _find_library("Xss")
+        )
+
+    def idle_seconds(self) -> Optional[float]:
+        if not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info):
+            return None
+        return self._info.contents.idle / 1000
+
+    def close(self) -> None:
+        if self._display:
+            self._xlib.XFree(self._info)
+            self._xlib.XCloseDisplay(self._display)
+            self._display = None
+
+
+class _SdBusError(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_char_p),
+        ("message", ctypes.c_char_p),
+        ("_need_free", ctypes.c_int),
+    ]
+
+
+class LogindIdleSource(IdleSource):
+    """Idle time from the systemd-logind IdleHint of the current session.
+
+    The session's properties are read over the system bus with libsystemd's
+    sd-bus, one round trip per tick and no forked ``loginctl``. logind only
+    sets IdleHint once the desktop's own idle timeout has fired, so while it
+    is unset the idle time is unknown (None) rather than zero: the tick runs
+    as if there were no idle source, and only a session logind already
+    reports idle tells how long it has been idle. It is therefore never
+    picked by "auto" and must be asked for by name.
+    """
+
+    name = "logind"
+
+    def __init__(self, session: Optional[str] = None):
+        self.session = session or os.environ.get("XDG_SESSION_ID") or "auto"
+        path = _find_library("systemd")
+        if not path:
+            raise OSError("libsystemd is required for logind idle time")
+        lib = ctypes.cdll.LoadLibrary(path)
+        lib.sd_bus_open_system.argtypes = [ctypes.POINTER(ctypes.c_void_p)]
+        lib.sd_bus_path_encode.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_void_p)]
+        lib.sd_bus_get_property_trivial.argtypes = [
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+            ctypes.POINTER(_SdBusError), ctypes.c_char, ctypes.c_void_p,
+        ]
+        lib.sd_bus_error_free.argtypes = [ctypes.POINTER(_SdBusError)]
+        lib.sd_bus_flush_close_unref.argtypes = [ctypes.c_void_p]
+        lib.sd_bus_flush_close_unref.restype = ctypes.c_void_p
+        self._lib = lib
+
+        bus = ctypes.c_void_p()
+        result = lib.sd_bus_open_system(ctypes.byref(bus))
+        if result < 0:
+            raise OSError(-result, f"cannot connect to the system bus: {os.strerror(-result)}")
+        encoded = ctypes.c_void_p()
+        result = lib.sd_bus_path_encode(b"/org/freedesktop/login1/session", self.session.encode(),
+                                        ctypes.byref(encoded))
+        if result < 0:
+            lib.sd_bus_flush_close_unref(bus)
+            raise OSError(-result, f"bad logind session id {self.session}")
+        self._path = ctypes.string_at(encoded.value)
+        ctypes.CDLL(None).free(encoded)
+        self._bus = bus
+        # sd-bus connections must not be used by two threads at once
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return bool(os.environ.get("XDG_SESSION_ID")) and bool(_find_library("systemd"))
+
+    def _get(self, member: str, kind: bytes, value: ctypes._SimpleCData):
+        error = _SdBusError()
+        with self._lock:
+            result = self._lib.sd_bus_get_property_trivial(
+                self._bus, b"org.freedesktop.login1", self._path, b"org.freedesktop.login1.Session",
+                member.encode(), ctypes.byref(error), kind, ctypes.byref(value),
+            )
+        try:
+            if result < 0:
+                raise OSError(-result, (error.message or b"").decode() or os.strerror(-result))
+        finally:
+            self._lib.sd_bus_error_free(ctypes.byref(error))
+        return value.value
+
+    def idle_seconds(self) -> Optional[float]:
+        if not self._get("IdleHint", b"b", ctypes.c_int()):
+            return None
+        since = self._get("IdleSinceHintMonotonic", b"t", ctypes.c_uint64())
+        if not since:
+            return None
+        # logind reports CLOCK_MONOTONIC in microseconds
+        return max(0.0, time.clock_gettime(time.CLOCK_MONOTONIC) - since / 1e6)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._bus:
+                self._lib.sd_bus_flush_close_unref(self._bus)
+                self._bus = None
+
+
+class FileIdleSource(IdleSource):
+    """Stand-in idle source for tests: idle seconds are read from a file.
+
+    The file holds a number of seconds. An empty file counts as "last input
+    when the file was modified", so touching it simulates user activity.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    def idle_seconds(self) -> Optional[float]:
+        try:
+            with open(self.path) as f:
+                content = f.read().strip()
+            if content:
+                return float(content)
+            return max(0.0, time.time() - os.path.getmtime(self.path))
+        except (OSError, ValueError):
+            return None
+
+
+def get_idle_source(spec: Optional[str] = None) -> Optional[IdleSource]:
+    """Build an idle source from a spec.
+
+    Args:
+        spec: "x11", "logind", "file:<path>", "none", or "auto" to probe X11.
+            Defaults to JIGGLYPUFF_IDLE_SOURCE, then "auto".
+    """
+    spec = spec or os.environ.get("JIGGLYPUFF_IDLE_SOURCE") or "auto"
+
+    if spec == "none":
+        return None
+    if spec.startswith("file:"):
+        return FileIdleSource(spec[len("file:"):])
+    if spec == "x11":
+        return X11IdleSource()
+    if spec == "logind":
+        return LogindIdleSource()
+    if spec != "auto":
+        raise ValueError(f"Unknown idle source: {spec}")
+
+    # logind is left out: it cannot tell an active session from one not yet idle
+    if X11IdleSource.is_available():
+        try:
+            return X11IdleSource()
+        except OSError as e:
+            logger.warning(f"Idle source {X11IdleSource.name} unavailable: {e}")
+    return None
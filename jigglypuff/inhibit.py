@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# jigglypuff/inhibit.py
+
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Callable, List, Optional
+
+from jigglypuff.children import terminate_group, track
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("jiggle", "inhibit", "hybrid")
+
+# In hybrid mode the inhibitor does the real work; jiggles only keep
+# input-watching apps happy, so they are spaced at least this far apart
+HYBRID_MIN_INTERVAL = 240
+
+
+def default_inhibit_command() -> Optional[List[str]]:
+    """Command that holds a sleep/idle inhibitor until it is terminated.
+
+    JIGGLYPUFF_INHIBITOR overrides the platform default, which is
+    `caffeinate` on macOS and `systemd-inhibit` on Linux.
+    """
+    if os.environ.get("JIGGLYPUFF_INHIBITOR"):
+        return shlex.split(os.environ["JIGGLYPUFF_INHIBITOR"])
+    if sys.platform == "darwin" and shutil.which("caffeinate"):
+        # -w ties the assertion to this server, so it cannot outlive it
+        return ["caffeinate", "-d", "-i", "-w", str(os.getpid())]
+    if shutil.which("systemd-inhibit"):
+        # `cat` holds the lock until our end of its stdin closes, which also
+        # happens if this server is killed without a chance to clean up
+        return [
+            "systemd-inhibit", "--what=idle:sleep", "--who=jigglypuff",
+            "--why=Keeping the machine awake for an AI task", "--mode=block",
+            "cat",
+        ]
+    return None
+
+
+class Inhibitor:
+    """Holds an OS sleep/idle inhibitor for as long as its process lives.
+
+    The command runs in its own process group so helpers it spawns (such as
+    the `cat` under systemd-inhibit) are torn down with it, on ``stop`` and
+    when the server exits. Its stdin is a pipe held by this process.
+
+    ``on_exit`` is called with the exit code as soon as the process dies
+    without ``stop`` having been called.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None,
+                 on_exit: Optional[Callable[[int], None]] = None):
+        self.command = command or default_inhibit_command()
+        self.on_exit = on_exit
+        self._proc: Optional[subprocess.Popen] = None
+        self._releasing = False
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc else None
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self._proc.returncode if self._proc else None
+
+    def start(self) -> None:
+        """Take the inhibitor."""
+        if self.alive:
+            return
+        if not self.command:
+            raise RuntimeError("no sleep inhibitor available on this host (set JIGGLYPUFF_INHIBITOR)")
+        if self._proc is not None and not self._proc.stdin.closed:
+            # A previous inhibitor died; clear out whatever it left in its group
+            self._releasing = True
+            terminate_group(self._proc, timeout=0.5)
+            self._proc.stdin.close()
+        self._releasing = False
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        track(self._proc)
+        threading.Thread(
+            target=self._watch, args=(self._proc,), name=f"jigglypuff-inhibitor-{self._proc.pid}", daemon=True
+        ).start()
+        logger.info(f"Sleep inhibitor started with PID {self._proc.pid}: {shlex.join(self.command)}")
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Release the inhibitor by terminating its process group."""
+        if self._proc is None or self._proc.stdin.closed:
+            return
+        self._releasing = True
+        alive = self._proc.poll() is None
+        # Also reaps anything a crashed inhibitor left in its group
+        terminate_group(self._proc, timeout)
+        self._proc.stdin.close()
+        if alive:
+            logger.info(f"Sleep inhibitor with PID {self._proc.pid} released")
+
+    def _watch(self, proc: subprocess.Popen) -> None:
+        returncode = proc.wait()
+        if proc is self._proc and not self._releasing:
+            logger.warning(f"Sleep inhibitor with PID {proc.pid} exited with code {returncode}")
+            if self.on_exit is not None:
+                self.on_exit(returncode)
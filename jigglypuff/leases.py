@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# jigglypuff/leases.py
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    """One agent's claim on the jiggler."""
+
+    owner: str
+    ttl: float
+    interval: int
+    offset: int
+    expires_at: float
+
+    def remaining(self, now: float) -> float:
+        return max(0.0, self.expires_at - now)
+
+
+class LeaseManager:
+    """Reference-counted jiggle leases with automatic expiry.
+
+    Leases are keyed by owner. A single timer is armed for the earliest
+    expiry; when it fires, expired leases are reaped and ``on_expire`` is
+    called with their owners so the caller can reconcile the jiggler.
+    """
+
+    def __init__(
+        self,
+        on_expire: Optional[Callable[[List[str]], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.on_expire = on_expire
+        self.clock = clock
+        self._leases: Dict[str, Lease] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def acquire(self, owner: str, ttl: float, interval: int, offset: int) -> Lease:
+        """Take or replace the lease held by ``owner``."""
+        with self._lock:
+            lease = Lease(owner, ttl, interval, offset, self.clock() + ttl)
+            self._leases[owner] = lease
+            self._arm_locked()
+            return lease
+
+    def renew(self, owner: str, ttl: Optional[float] = None) -> Optional[Lease]:
+        """Extend a live lease, optionally with a new TTL."""
+        with self._lock:
+            self._reap_locked()
+            lease = self._leases.get(owner)
+            if lease is None:
+                return None
+            if ttl is not None:
+                lease.ttl = ttl
+            lease.expires_at = self.clock() + lease.ttl
+            self._arm_locked()
+            return lease
+
+    def release(self, owner: str) -> bool:
+        """Drop the lease held by ``owner``; return False if there was none."""
+        with self._lock:
+            released = self._leases.pop(owner, None) is not None
+            self._arm_locked()
+            return released
+
+    def clear(self) -> int:
+        """Drop every lease and return how many there were."""
+        with self._lock:
+            count = len(self._leases)
+            self._leases.clear()
+            self._arm_locked()
+            return count
+
+    def active(self) -> List[Lease]:
+        """Live leases, soonest expiry first."""
+        with self._lock:
+            self._reap_locked()
+            return sorted(self._leases.values(), key=lambda lease: lease.expires_at)
+
+    def effective(self) -> Optional[Tuple[int, int]]:
+        """Merged (interval, offset) of the live leases, or None if there are none.
+
+        The shortest interval and the largest offset win, so every holder
+        gets at least what it asked for.
+        """
+        leases = self.active()
+        if not leases:
+            return None
+        return min(lease.interval for lease in leases), max(lease.offset for lease in leases)
+
+    def reap(self) -> List[str]:
+        """Remove expired leases and return their owners."""
+        with self._lock:
+            expired = self._reap_locked()
+            self._arm_locked()
+        return expired
+
+    def _reap_locked(self) -> List[str]:
+        now = self.clock()
+        expired = [owner for owner, lease in self._leases.items() if lease.expires_at <= now]
+        for owner in expired:
+            del self._leases[owner]
+            logger.info(f"jiggle lease for {owner} expired")
+        return expired
+
+    def _arm_locked(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._leases:
+            return
+        delay = min(lease.expires_at for lease in self._leases.values()) - self.clock()
+        self._timer = threading.Timer(max(0.0, delay), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        expired = self.reap()
+        if expired and self.on_expire is not None:
+            self.on_expire(expired)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# jigglypuff/logsink.py
+
+import glob
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Logs of this many exited instances are kept for post-mortems
+KEEP_INSTANCE_LOGS = 5
+
+
+def log_timestamp(now: Optional[float] = None) -> str:
+    """Format a timestamp the way `date` does in jiggly_puff.sh."""
+    t = time.localtime(now)
+    return time.strftime("%a %b ", t) + f"{t.tm_mday:2d}" + time.strftime(" %H:%M:%S %Z %Y", t)
+
+
+def default_log_path() -> str:
+    """Per-instance log path, overridable with JIGGLYPUFF_LOG."""
+    return os.environ.get("JIGGLYPUFF_LOG") or _instance_log_path(os.getpid())
+
+
+def _instance_log_path(pid: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"mouse_jiggler.{pid}.log")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def prune_instance_logs(keep: Optional[int] = None) -> List[str]:
+    """Delete the per-instance logs (and rotated copies) of all but the ``keep`` newest exited servers.
+
+    ``keep`` defaults to ``KEEP_INSTANCE_LOGS``.
+    """
+    if keep is None:
+        keep = KEEP_INSTANCE_LOGS
+    exited: Dict[int, List[str]] = {}
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), "mouse_jiggler.*.log*")):
+        pid = os.path.basename(path).split(".")[1]
+        if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+            continue
+        exited.setdefault(int(pid), []).append(path)
+
+    def newest(paths: List[str]) -> float:
+        return max((os.path.getmtime(path) for path in paths if os.path.exists(path)), default=0.0)
+
+    removed = []
+    for paths in sorted(exited.values(), key=newest, reverse=True)[keep:]:
+        for path in paths:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+    return removed
+
+
+class JiggleLog:
+    """Buffered, size-rotated writer for the jiggler log.
+
+    Lines keep the `<date>: <message>` format of jiggly_puff.sh. They are
+    held in memory until ``flush_bytes`` have accumulated or ``flush_interval``
+    seconds have passed since the first unflushed line, then written with a
+    single call. When the file would exceed ``max_bytes`` it is rotated to
+    ``<path>.1`` ... ``<path>.<backups>`` and the oldest copy is dropped.
+
+    Timed flushes are done by one writer thread per log, which sleeps
+    without a timeout while nothing is queued. Sizes are counted in encoded
+    bytes. Logs are kept after ``close``; a log at the default per-instance
+    path prunes those of exited instances to the newest
+    ``KEEP_INSTANCE_LOGS`` when it is first opened.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        flush_bytes: int = 4096,
+        flush_interval: float = 1.0,
+        max_bytes: int = 1024 * 1024,
+        backups: int = 3,
+    ):
+        self.path = path or default_log_path()
+        self.per_instance = self.path == _instance_log_path(os.getpid())
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._due: Optional[float] = None
+        self._writer: Optional[threading.Thread] = None
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+
+    def write(self, message: str) -> None:
+        """Queue one log line."""
+        line = f"{log_timestamp()}: {message}\n".encode()
+        with self._lock:
+            self._pending.append(line)
+            self._pending_bytes += len(line)
+            if self._pending_bytes >= self.flush_bytes:
+                self._flush_locked()
+            elif self._due is None:
+                self._due = time.monotonic() + self.flush_interval
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="jigglypuff-log", daemon=True)
+                    self._writer.start()
+                else:
+                    self._wake.notify()
+
+    def _write_loop(self) -> None:
+        me = threading.current_thread()
+        with self._lock:
+            while self._writer is me:
+                if self._due is None:
+                    self._wake.wait()
+                    continue
+                remaining = self._due - time.monotonic()
+                if remaining > 0:
+                    self._wake.wait(remaining)
+                else:
+                    self._flush_locked()
+
+    def flush(self) -> None:
+        """Write every queued line to disk."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush and close the log file."""
+        with self._lock:
+            self._flush_locked()
+            self._writer = None
+            self._wake.notify()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _flush_locked(self) -> None:
+        self._due = None
+        if not self._pending:
+            return
+
+        data = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        try:
+            if self._file is None:
+                self._open()
+            if self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+        except OSError as e:
+            logger.warning(f"Could not write to {self.path}: {e}")
+
+    def _open(self) -> None:
+        if self.per_instance and self._size == 0:
+            prune_instance_logs()
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
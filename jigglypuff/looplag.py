@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# jigglypuff/looplag.py
+
+import asyncio
+import contextlib
+import logging
+from typing import Optional
+
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Stalls longer than this are logged as they happen
+STALL_WARNING = 0.25
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a timer while requests are in flight.
+
+    Any handler that blocks the loop delays the timer by as long as it
+    blocked, so the worst lag seen is the worst stall any client suffered.
+    The timer is only armed while at least one request is inside ``track``;
+    an idle server has no timer and no wakeups. When the last request
+    finishes with the timer overdue, the overdue time is counted as lag.
+    """
+
+    def __init__(self, interval: float = 0.1, metrics: MetricsRegistry = REGISTRY):
+        self.interval = interval
+        self.worst = 0.0
+        self.last: Optional[float] = None
+        self.samples = 0
+        self._active = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._expected = 0.0
+        self._lag = metrics.histogram("event_loop_lag_seconds", "How late the event loop ran a timer")
+        metrics.gauge(
+            "event_loop_lag_worst_seconds", lambda: round(self.worst, 6), "Worst event loop stall seen"
+        )
+
+    @property
+    def running(self) -> bool:
+        """True while the timer is armed, i.e. while requests are in flight."""
+        return self._handle is not None
+
+    @contextlib.asynccontextmanager
+    async def track(self):
+        """Sample the loop's lag for as long as the enclosed request runs."""
+        loop = asyncio.get_running_loop()
+        self._active += 1
+        if self._handle is None:
+            self._arm(loop)
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if not self._active and self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+                overdue = loop.time() - self._expected
+                if overdue > 0:
+                    self._observe(overdue)
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._expected = loop.time() + self.interval
+        self._handle = loop.call_later(self.interval, self._sample, loop)
+
+    def _sample(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._observe(max(0.0, loop.time() - self._expected))
+        if self._active:
+            self._arm(loop)
+        else:
+            self._handle = None
+
+    def _observe(self, lag: float) -> None:
+        self.last = lag
+        self.samples += 1
+        self._lag.observe(lag)
+        if lag > self.worst:
+            self.worst = lag
+            if lag > STALL_WARNING:
+                logger.warning(f"Event loop stalled for {lag * 1e3:.0f}ms")
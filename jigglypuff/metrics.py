@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# jigglypuff/metrics.py
+
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Seconds; fine enough for backend calls, wide enough for tick drift
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0
+)
+
+
+class Counter:
+    """Monotonic counter.
+
+    Shared counters are incremented from the engine thread, worker threads
+    of ``asyncio.to_thread`` and the daemon's handler threads, so ``inc``
+    takes the counter's own lock; ``+=`` on an attribute is not atomic.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect and three additions under a lock."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Bucket counts, sum and count, copied together under the lock."""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q: float, state: Optional[Tuple[List[int], float, int]] = None) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile."""
+        counts, _, total = state or self.snapshot()
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def summary(self) -> dict:
+        state = self.snapshot()
+        _, total_sum, count = state
+        return {
+            "count": count,
+            "sum": round(total_sum, 6),
+            "mean": round(total_sum / count, 6) if count else None,
+            "p50": self.quantile(0.5, state),
+            "p90": self.quantile(0.9, state),
+            "p99": self.quantile(0.99, state),
+        }
+
+
+class MetricsRegistry:
+    """Named counters, histograms and gauges.
+
+    Instruments are created once under the registry lock and then updated
+    under their own lock only; hot paths should keep a reference instead of
+    looking them up per call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], Counter] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._gauges: Dict[Tuple[str, Labels], Callable[[], Optional[float]]] = {}
+        self._help: Dict[str, str] = {}
+        self.started_at = time.time()
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._counters:
+                self._counters[key] = Counter()
+                self._help.setdefault(name, help)
+            return self._counters[key]
+
+    def histogram(self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+                self._help.setdefault(name, help)
+            return self._histograms[key]
+
+    def gauge(self, name: str, read: Callable[[], Optional[float]], help: str = "",
+              **labels: str) -> None:
+        """Register a gauge whose value is read when metrics are collected."""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = read
+            self._help.setdefault(name, help)
+
+    def snapshot(self) -> dict:
+        """All metrics as a JSON-friendly dict."""
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+            gauges = list(self._gauges.items())
+
+        data: dict = {"uptime_seconds": round(time.time() - self.started_at, 3)}
+        for (name, labels), counter in counters:
+            _nest(data, name, labels, counter.value)
+        for (name, labels), histogram in histograms:
+            _nest(data, name, labels, histogram.summary())
+        for (name, labels), read in gauges:
+            _nest(data, name, labels, read())
+        return data
+
+    def prometheus(self, prefix: str = "jigglypuff_") -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            gauges = sorted(self._gauges.items(), key=lambda item: item[0])
+
+        lines: List[str] = []
+        declared = set()
+
+        def declare(name: str, kind: str) -> None:
+            if name not in declared:
+                declared.add(name)
+                if self._help.get(name):
+                    lines.append(f"# HELP {prefix}{name} {self._help[name]}")
+                lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        lines.append(f"# TYPE {prefix}uptime_seconds gauge")
+        lines.append(f"{prefix}uptime_seconds {time.time() - self.started_at:.3f}")
+        for (name, labels), counter in counters:
+            declare(name, "counter")
+            lines.append(f"{prefix}{name}{_labels(labels)} {counter.value}")
+        for (name, labels), histogram in histograms:
+            declare(name, "histogram")
+            # One copy, so the +Inf bucket, the count and the sum agree with the buckets
+            counts, total_sum, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket in zip(histogram.buckets, counts):
+                cumulative += bucket
+                lines.append(f"{prefix}{name}_bucket{_labels(labels, le=repr(bound))} {cumulative}")
+            lines.append(f"{prefix}{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{prefix}{name}_sum{_labels(labels)} {total_sum}")
+            lines.append(f"{prefix}{name}_count{_labels(labels)} {count}")
+        for (name, labels), read in gauges:
+            value = read()
+            if value is None:
+                continue
+            declare(name, "gauge")
+            lines.append(f"{prefix}{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _nest(data: dict, name: str, labels: Labels, value) -> None:
+    if not labels:
+        data[name] = value
+        return
+    node = data.setdefault(name, {})
+    for _, label_value in labels[:-1]:
+        node = node.setdefault(label_value, {})
+    node[labels[-1][1]] = value
+
+
+def _labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+# Process-wide registry, like the root logger
+REGISTRY = MetricsRegistry()
+
+
+class PrometheusExporter:
+    """Expose a registry as Prometheus text in a file and/or on a local port.
+
+    The file is rewritten atomically every ``interval`` seconds; the HTTP
+    endpoint binds to 127.0.0.1 and renders on each scrape.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, path: Optional[str] = None,
+                 port: Optional[int] = None, interval: float = 15.0):
+        self.registry = registry
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self._stop = threading.Event()
+        self._server = None
+
+    def start(self) -> None:
+        if self.path:
+            threading.Thread(target=self._write_loop, name="jigglypuff-metrics-file",
+                             daemon=True).start()
+        if self.port is not None:
+            # Only servers that export over HTTP pay for importing http.server
+            import http.server
+
+            registry = self.registry
+
+            class Handler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = registry.prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = http.server.ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="jigglypuff-metrics-http",
+                             daemon=True).start()
+            logger.info(f"Serving Prometheus metrics on http://127.0.0.1:{self.port}/metrics")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.path:
+            self.write()
+
+    def write(self) -> None:
+        """Write the current metrics to ``path`` atomically."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.registry.prometheus())
+        os.replace(temp_path, self.path)
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self.path}: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+
+def exporter_from_env(registry: MetricsRegistry = REGISTRY) -> Optional[PrometheusExporter]:
+    """Build an exporter from JIGGLYPUFF_METRICS_FILE / JIGGLYPUFF_METRICS_PORT, if set."""
+    path = os.environ.get("JIGGLYPUFF_METRICS_FILE")
+    port = os.environ.get("JIGGLYPUFF_METRICS_PORT")
+    if not path and not port:
+        return None
+    return PrometheusExporter(registry, path=path, port=int(port) if port else None)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# jigglypuff/power.py
+
+import ctypes
+import logging
+import math
+import os
+import platform
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PR_SET_TIMERSLACK = 29
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+# ioprio_set has no libc wrapper; its syscall number depends on the architecture
+_SYS_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "armv7l": 314, "i686": 289, "i386": 289}
+
+
+def boottime() -> Optional[float]:
+    """Seconds on a clock that keeps counting while the machine is suspended, if there is one."""
+    if hasattr(time, "CLOCK_BOOTTIME"):
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return None
+
+
+class SuspendDetector:
+    """Notices that the machine was suspended between two checks.
+
+    The monotonic clock stops while the machine is suspended and the boot
+    clock does not, so growth of their difference is time spent asleep.
+    Where there is no boot clock, ``check`` always returns 0.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], Optional[float]] = boottime,
+        monotonic: Callable[[], float] = time.monotonic,
+        tolerance: float = 1.0,
+    ):
+        self.clock = clock
+        self.monotonic = monotonic
+        self.tolerance = tolerance
+        self.suspends = 0
+        self.suspended_seconds = 0.0
+        self._offset: Optional[float] = None
+        self.reset()
+
+    @property
+    def available(self) -> bool:
+        return self._offset is not None
+
+    def reset(self) -> None:
+        """Start measuring from now."""
+        now = self.clock()
+        self._offset = now - self.monotonic() if now is not None else None
+
+    def check(self) -> float:
+        """Seconds spent suspended since the last check, or 0 below ``tolerance``."""
+        if self._offset is None:
+            return 0.0
+        offset = self.clock() - self.monotonic()
+        gap = offset - self._offset
+        if gap < self.tolerance:
+            return 0.0
+        self._offset = offset
+        self.suspends += 1
+        self.suspended_seconds += gap
+        return gap
+
+
+@dataclass(frozen=True)
+class PowerProfile:
+    """How a scheduler thread trades timing precision for fewer CPU wakeups.
+
+    ``timer_slack`` (seconds) lets the kernel fire the thread's timers that
+    much late, so they can share a wakeup with other timers; ``nice`` and
+    ``idle_io`` lower the thread's CPU and I/O priority; ``align`` rounds
+    every deadline up to a multiple of that many seconds on the monotonic
+    clock, which every process on the machine shares, so sessions and other
+    jigglers wake up together.
+    """
+
+    name: str = "default"
+    timer_slack: Optional[float] = None
+    nice: Optional[int] = None
+    idle_io: bool = False
+    align: Optional[float] = None
+
+    def apply(self) -> List[str]:
+        """Apply the profile to the calling thread; return what could be applied."""
+        applied: List[str] = []
+        if not sys.platform.startswith("linux"):
+            # Elsewhere these settings are per process and would slow the whole server
+            return applied
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if self.timer_slack is not None:
+            if libc.prctl(_PR_SET_TIMERSLACK, ctypes.c_ulong(int(self.timer_slack * 1e9)), 0, 0, 0) == 0:
+                applied.append("timer_slack")
+            else:
+                logger.debug(f"Could not set timer slack: {os.strerror(ctypes.get_errno())}")
+        if self.nice is not None:
+            try:
+                # On Linux, the priority of a thread id only affects that thread
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+                applied.append("nice")
+            except OSError as e:
+                logger.debug(f"Could not lower the thread priority: {e}")
+        number = _SYS_IOPRIO_SET.get(platform.machine())
+        if self.idle_io and number is not None:
+            priority = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+            if libc.syscall(number, _IOPRIO_WHO_PROCESS, threading.get_native_id(), priority) == 0:
+                applied.append("idle_io")
+            else:
+                logger.debug(f"Could not set the idle I/O class: {os.strerror(ctypes.get_errno())}")
+        return applied
+
+    def align_up(self, when: float, interval: float) -> float:
+        """Round a monotonic deadline up to the next boundary (never coarser than ``interval``)."""
+        if not self.align:
+            return when
+        step = min(self.align, interval)
+        return math.ceil(when / step) * step
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "timer_slack": self.timer_slack,
+            "nice": self.nice,
+            "idle_io": self.idle_io,
+            "align": self.align,
+        }
+
+
+PROFILES: Dict[str, PowerProfile] = {
+    "default": PowerProfile(),
+    "low": PowerProfile("low", timer_slack=0.05, nice=19, idle_io=True, align=1.0),
+}
+
+
+def get_power_profile(name: Optional[str] = None) -> PowerProfile:
+    """Look up a power profile.
+
+    Args:
+        name: "default" or "low". Defaults to the JIGGLYPUFF_POWER
+            environment variable, then "default".
+    """
+    name = (name or os.environ.get("JIGGLYPUFF_POWER") or "default").lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown power profile: {name} (choose from {', '.join(PROFILES)})")
+    return PROFILES[name]
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# jigglypuff/prompts.py
+
+# Prompt texts, imported the first time a client asks for a prompt
+
+HELP = """# jigglypuff Usage Guide
+
+## What is jigglypuff?
+jigglypuff is an AI-controlled mouse activity manager that prevents screen savers and system sleep during AI processing tasks by making imperceptible cursor movements.
+
+## When to Use jigglypuff
+- **Before starting AI tasks**: Always enable jiggling before beginning long-running AI operations
+- **During code generation**: Keep your system awake while AI agents write code
+- **During file processing**: Prevent sleep during large file operations
+- **During API calls**: Maintain system activity during network operations
+
+## Best Practices
+1. **Enable before tasks**: Use `enable_jiggling_before_tasks()` at the start of AI operations
+2. **Disable after completion**: Use `disable_jiggling_after_tasks()` when tasks finish
+3. **Check status**: Use `check_jiggly_status()` to verify current state
+4. **Custom settings**: Use `wake_up_jiggly(interval, offset)` for specific needs
+
+## Tool Overview
+- `wake_up_jiggly(interval, offset)`: Start jiggling with custom settings
+- `wake_up_jiggly("auto")`: Jiggle just before the screensaver/sleep deadline, with the fewest wakeups
+- `wake_up_jiggly(strategy="inhibit")`: Hold an OS sleep inhibitor instead of moving the cursor
+- `put_jiggly_to_sleep()`: Stop jiggling immediately
+- `check_jiggly_status()`: Check if jiggling is active
+- `enable_jiggling_before_tasks()`: Rule-compliant task start
+- `disable_jiggling_after_tasks()`: Rule-compliant task end
+- `acquire_jiggly_lease(owner, ttl)`: Keep jiggling while you need it, shared with other agents
+- `renew_jiggly_lease(owner)`: Extend your lease before it expires
+- `release_jiggly_lease(owner)`: Give up your lease; jiggling stops after the last one
+
+## Configuration Tips
+- **Interval**: 30 seconds (default) works well for most tasks
+- **Offset**: 1 pixel (default) is imperceptible but effective
+- **Energy saving**: jigglypuff allows system sleep when not actively jiggling
+
+Remember: jigglypuff is designed to work seamlessly with AI agents like Qoder and Claude Desktop!"""
+
+TROUBLESHOOTING = """# jigglypuff Troubleshooting Guide
+
+## Common Issues and Solutions
+
+### "jigglypuff is already jiggling"
+- **Cause**: Another jiggling session is already running
+- **Solution**: Use `check_jiggly_status()` to verify, then `put_jiggly_to_sleep()` if needed
+
+### "Failed to wake up jigglypuff"
+- **Cause**: Missing dependencies or permissions
+- **Solutions**:
+  1. Ensure `cliclick` is installed: `brew install cliclick`
+  2. Check accessibility permissions in System Preferences
+  3. Force a pointer backend with `JIGGLYPUFF_BACKEND=native|cliclick|recording`
+
+### "jigglypuff is sleeping (session ended)"
+- **Cause**: The jiggling session stopped unexpectedly
+- **Solution**: Simply call `wake_up_jiggly()` to restart
+
+
+### High CPU usage
+- **Cause**: Very short interval settings
+- **Solution**: Use longer intervals (30+ seconds) for better efficiency
+
+## System Requirements
+- macOS 10.15+ (Catalina or later)
+- Homebrew package manager
+- Python 3.11+
+- cliclick CLI tool
+- Accessibility permissions for Terminal
+
+## Getting Help
+If issues persist, check the logs in your terminal or contact the maintainer."""
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# jigglypuff/rules.py
+
+import json
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RULES_FILE = "jigglypuff_rules.json"
+
+
+class RulesError(ValueError):
+    """Raised when a rules file cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class RuleAction:
+    """One ``mcp_call`` action: call ``tool`` on this server with ``parameters``."""
+
+    rule: str
+    tool: str
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+
+def default_rules_path() -> str:
+    """JIGGLYPUFF_RULES, else the rules file in the source tree, else the installed copy."""
+    if os.environ.get("JIGGLYPUFF_RULES"):
+        return os.environ["JIGGLYPUFF_RULES"]
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), RULES_FILE)
+    if os.path.exists(source):
+        return source
+    return os.path.join(sys.prefix, "jigglypuff", RULES_FILE)
+
+
+def compile_rules(config: Dict[str, Any], server: str = "jigglypuff") -> Dict[str, Tuple[RuleAction, ...]]:
+    """Index the rules of a parsed rules file by trigger type.
+
+    Actions for other servers are left out; rules keep their file order
+    within a trigger.
+    """
+    if not isinstance(config, dict) or not isinstance(config.get("rules"), list):
+        raise RulesError("rules file must be an object with a 'rules' list")
+
+    index: Dict[str, List[RuleAction]] = {}
+    for position, rule in enumerate(config["rules"]):
+        try:
+            name = rule.get("name", f"rule {position}")
+            trigger = rule["trigger"]["type"]
+            actions = rule.get("actions", [])
+        except (AttributeError, KeyError, TypeError):
+            raise RulesError(f"rule {position} needs a trigger with a type")
+        if rule.get("enabled", True) is False:
+            continue
+        for action in actions:
+            if action.get("type") != "mcp_call" or action.get("server", server) != server:
+                continue
+            if not action.get("tool"):
+                raise RulesError(f"an mcp_call action of rule {name} has no tool")
+            index.setdefault(trigger, []).append(
+                RuleAction(name, action["tool"], dict(action.get("parameters") or {}))
+            )
+    return {trigger: tuple(actions) for trigger, actions in index.items()}
+
+
+class RuleBook:
+    """Compiled rules from a file, reloaded when the file changes.
+
+    The file is parsed once into a trigger -> actions index; each lookup
+    costs one ``stat`` to notice edits (mtime or size) plus a dict lookup.
+    A file that fails to parse is reported in ``last_error`` and the
+    previous rules stay in force.
+    """
+
+    def __init__(self, path: Optional[str] = None, server: str = "jigglypuff"):
+        self.path = path or default_rules_path()
+        self.server = server
+        self.rules: List[Dict[str, Any]] = []
+        self.loads = 0
+        self.last_error: Optional[str] = None
+        self._index: Dict[str, Tuple[RuleAction, ...]] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def actions_for(self, trigger: str) -> Tuple[RuleAction, ...]:
+        """Actions to run for a trigger event, in rule order."""
+        return self.index().get(trigger, ())
+
+    def triggers(self) -> List[str]:
+        return sorted(self.index())
+
+    def index(self) -> Dict[str, Tuple[RuleAction, ...]]:
+        """The compiled index, reloading the file first if it changed."""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._reload(signature)
+        return self._index
+
+    def _reload(self, signature: Optional[Tuple[int, int]]) -> None:
+        self._signature = signature
+        if signature is None:
+            if self._index:
+                logger.warning(f"Rules file {self.path} disappeared; keeping the loaded rules")
+            self.last_error = f"rules file {self.path} not found"
+            return
+        try:
+            with open(self.path) as f:
+                config = json.load(f)
+            index = compile_rules(config, self.server)
+        except (OSError, ValueError) as e:
+            self.last_error = f"{self.path}: {e}"
+            logger.error(f"Failed to load rules, keeping the previous ones: {self.last_error}")
+            return
+        self.rules = config["rules"]
+        self._index = index
+        self.loads += 1
+        self.last_error = None
+        logger.info(f"Loaded {len(self.rules)} rules for {len(index)} triggers from {self.path}")
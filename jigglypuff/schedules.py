@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# jigglypuff/schedules.py
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta, tzinfo
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from jigglypuff import timerfd
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_DAY_ALIASES = {
+    "daily": frozenset(range(7)),
+    "*": frozenset(range(7)),
+    "weekdays": frozenset(range(5)),
+    "weekends": frozenset((5, 6)),
+}
+
+
+def parse_days(spec: str) -> FrozenSet[int]:
+    """Parse a day spec like "mon-fri", "sat,sun", "weekdays" or "daily" into weekday numbers."""
+    spec = spec.strip().lower()
+    if spec in _DAY_ALIASES:
+        return _DAY_ALIASES[spec]
+    days: Set[int] = set()
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            begin = DAY_NAMES.index(first[:3])
+            end = DAY_NAMES.index(last[:3]) if last else begin
+        except ValueError:
+            raise ValueError(f"Unknown day in {spec!r} (use {', '.join(DAY_NAMES)}, weekdays, weekends or daily)")
+        # Ranges may wrap around the week, e.g. fri-mon
+        days.update((begin + step) % 7 for step in range((end - begin) % 7 + 1))
+    return frozenset(days)
+
+
+def _timestamp(day: date, clock: dtime, tz: Optional[tzinfo]) -> float:
+    # Naive datetimes are converted with the system's local zone rules, so both
+    # paths apply the UTC offset in force on that day (DST included)
+    return datetime.combine(day, clock, tzinfo=tz).timestamp()
+
+
+@dataclass
+class Window:
+    """A time window during which the jiggler should run.
+
+    Recurring windows repeat on ``days`` from ``start_time`` to ``end_time``
+    local time (in ``tz``, or the system zone); an end at or before the
+    start runs past midnight. One-off windows run from ``starts_at`` to
+    ``ends_at`` (Unix timestamps).
+    """
+
+    id: int
+    interval: int
+    offset: int
+    name: Optional[str] = None
+    days: Optional[FrozenSet[int]] = None
+    start_time: Optional[dtime] = None
+    end_time: Optional[dtime] = None
+    starts_at: Optional[float] = None
+    ends_at: Optional[float] = None
+    tz: Optional[tzinfo] = None
+
+    @property
+    def recurring(self) -> bool:
+        return self.days is not None
+
+    def occurrences(self, around: float) -> Iterator[Tuple[float, float]]:
+        """(start, end) timestamps of every occurrence that can matter at ``around``."""
+        if not self.recurring:
+            yield self.starts_at, self.ends_at
+            return
+        today = datetime.fromtimestamp(around, self.tz).date()
+        overnight = self.end_time <= self.start_time
+        # Yesterday's window may run past midnight; a week ahead covers every day
+        for delta in range(-1, 8):
+            day = today + timedelta(days=delta)
+            if day.weekday() not in self.days:
+                continue
+            end_day = day + timedelta(days=1) if overnight else day
+            yield _timestamp(day, self.start_time, self.tz), _timestamp(end_day, self.end_time, self.tz)
+
+    def active_at(self, now: float) -> bool:
+        return any(start <= now < end for start, end in self.occurrences(now))
+
+    def next_edge(self, now: float) -> Optional[float]:
+        """The first start or end after ``now``, or None once a one-off window is over."""
+        return min((edge for span in self.occurrences(now) for edge in span if edge > now), default=None)
+
+    def describe(self) -> str:
+        if self.recurring:
+            days = ",".join(DAY_NAMES[day] for day in sorted(self.days))
+            return f"{days} {self.start_time.isoformat('minutes')}-{self.end_time.isoformat('minutes')}"
+        start = datetime.fromtimestamp(self.starts_at, self.tz).isoformat(timespec="minutes")
+        end = datetime.fromtimestamp(self.ends_at, self.tz).isoformat(timespec="minutes")
+        return f"{start} to {end}"
+
+
+class ScheduleManager:
+    """Time windows whose edges start and stop the jiggler.
+
+    Every window has exactly one entry in a heap keyed by its next edge,
+    and a single timer is armed for the earliest one, so thousands of
+    windows cost O(log n) per edge and nothing runs between edges. Edges
+    are wall-clock times computed from each window's zone, so DST changes
+    move them correctly.
+
+    On Linux the timer is a CLOCK_REALTIME timerfd armed for the edge
+    itself, with TFD_TIMER_CANCEL_ON_SET: it fires on time across a
+    suspend, and a change of the wall clock wakes it at once, after which
+    every edge is recomputed. Elsewhere, or with a custom ``clock``, it is
+    a monotonic timer for the edge; ``max_sleep``, if given, bounds it so
+    that clock changes are noticed that often.
+
+    ``on_change`` is called with the active windows whenever that set changes.
+    """
+
+    def __init__(
+        self,
+        on_change: Optional[Callable[[List[Window]], None]] = None,
+        clock: Callable[[], float] = time.time,
+        monotonic: Callable[[], float] = time.monotonic,
+        max_sleep: Optional[float] = None,
+        jump_tolerance: float = 1.0,
+    ):
+        self.on_change = on_change
+        self.clock = clock
+        self.monotonic = monotonic
+        self.max_sleep = max_sleep
+        self.jump_tolerance = jump_tolerance
+        self.clock_changes = 0
+        self._windows: Dict[int, Window] = {}
+        self._next: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._active: Set[int] = set()
+        self._ids = itertools.count(1)
+        self._offset = clock() - monotonic()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        # The timerfd and the thread waiting on it, used with the real wall clock on Linux
+        self._alarm: Optional[timerfd.TimerEvent] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._deadline: Optional[float] = None
+        if clock is time.time and timerfd.available():
+            try:
+                self._alarm = timerfd.TimerEvent(timerfd.CLOCK_REALTIME, cancel_on_set=True)
+            except OSError as e:
+                logger.debug(f"No wall clock timerfd, using a monotonic timer: {e}")
+
+    def add_recurring(self, days: str, start: str, end: str, interval: int, offset: int,
+                      name: Optional[str] = None, tz: Optional[tzinfo] = None) -> Window:
+        """Add a window repeating on ``days`` between two "HH:MM" local times."""
+        window = Window(0, interval, offset, name, days=parse_days(days),
+                        start_time=dtime.fromisoformat(start), end_time=dtime.fromisoformat(end), tz=tz)
+        return self._add(window)
+
+    def add_once(self, starts_at: float, ends_at: float, interval: int, offset: int,
+                 name: Optional[str] = None, tz: Optional[tzinfo] = None) -> Window:
+        """Add a single window between two timestamps."""
+        if ends_at <= starts_at:
+            raise ValueError("a window must end after it starts")
+        if ends_at <= self.clock():
+            raise ValueError("the window is already over")
+        return self._add(Window(0, interval, offset, name, starts_at=starts_at, ends_at=ends_at, tz=tz))
+
+    def remove(self, window_id: int) -> bool:
+        """Drop a window; return False if there was none with that id."""
+        with self._lock:
+            window = self._windows.pop(window_id, None)
+            self._next.pop(window_id, None)
+            changed = window_id in self._active
+            self._active.discard(window_id)
+            self._arm_locked()
+        if changed:
+            self._notify()
+        return window is not None
+
+    def clear(self) -> int:
+        """Drop every window and return how many there were."""
+        with self._lock:
+            count = len(self._windows)
+            changed = bool(self._active)
+            self._windows.clear()
+            self._next.clear()
+            self._heap.clear()
+            self._active.clear()
+            self._arm_locked()
+        if changed:
+            self._notify()
+        return count
+
+    def windows(self) -> List[Window]:
+        with self._lock:
+            return sorted(self._windows.values(), key=lambda window: window.id)
+
+    def active(self) -> List[Window]:
+        """Windows that are open right now."""
+        with self._lock:
+            return [self._windows[window_id] for window_id in sorted(self._active)]
+
+    def effective(self) -> Optional[Tuple[int, int]]:
+        """Merged (interval, offset) of the open windows, or None if none is open."""
+        windows = self.active()
+        if not windows:
+            return None
+        return min(window.interval for window in windows), max(window.offset for window in windows)
+
+    def upcoming(self, limit: int = 10) -> List[Tuple[float, Window, str]]:
+        """The next ``limit`` transitions as (timestamp, window, "start" or "end")."""
+        with self._lock:
+            entries = heapq.nsmallest(
+                limit, ((edge, window_id) for window_id, edge in self._next.items())
+            )
+            return [
+                (edge, self._windows[window_id],
+                 "start" if self._windows[window_id].active_at(edge) else "end")
+                for edge, window_id in entries
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._watcher = None
+            self._deadline = None
+        if self._alarm is not None:
+            self._alarm.set()
+
+    def _add(self, window: Window) -> Window:
+        with self._lock:
+            window.id = next(self._ids)
+            now = self.clock()
+            self._windows[window.id] = window
+            self._push_locked(window, now)
+            changed = window.active_at(now)
+            if changed:
+                self._active.add(window.id)
+            self._arm_locked()
+        logger.info(f"Jiggle schedule {window.id} added: {window.describe()}")
+        if changed:
+            self._notify()
+        return window
+
+    def _push_locked(self, window: Window, now: float) -> None:
+        edge = window.next_edge(now)
+        if edge is None:
+            # A one-off window that is over
+            del self._windows[window.id]
+            self._next.pop(window.id, None)
+            return
+        self._next[window.id] = edge
+        heapq.heappush(self._heap, (edge, window.id))
+
+    def _rebuild_locked(self, now: float) -> None:
+        self._heap.clear()
+        self._next.clear()
+        for window in list(self._windows.values()):
+            self._push_locked(window, now)
+        self._active = {window_id for window_id, window in self._windows.items() if window.active_at(now)}
+
+    def _arm_locked(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Entries of removed windows and superseded edges are dropped lazily
+        while self._heap and self._next.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if self._alarm is not None:
+            self._deadline = self._heap[0][0] if self._heap else None
+            if self._watcher is None and self._deadline is not None:
+                self._watcher = threading.Thread(target=self._watch, name="jigglypuff-schedules", daemon=True)
+                self._watcher.start()
+            elif threading.current_thread() is not self._watcher:
+                self._alarm.set()
+            return
+        if not self._heap:
+            return
+        delay = self._heap[0][0] - self.clock()
+        if self.max_sleep is not None:
+            delay = min(delay, self.max_sleep)
+        self._timer = threading.Timer(max(0.0, delay), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _watch(self) -> None:
+        alarm = self._alarm
+        while True:
+            with self._lock:
+                if self._watcher is not threading.current_thread():
+                    return
+                deadline = self._deadline
+            # With no windows left the thread blocks until one is added
+            alarm.wait(alarm=deadline)
+            alarm.clear()
+            if deadline is not None and (alarm.clock_was_set or self.clock() >= deadline):
+                self._on_timer()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            before = set(self._active)
+            now = self.clock()
+            offset = now - self.monotonic()
+            if abs(offset - self._offset) > self.jump_tolerance:
+                self.clock_changes += 1
+                logger.info(f"Wall clock moved by {offset - self._offset:+.1f}s, recomputing schedule edges")
+                self._rebuild_locked(now)
+            else:
+                while self._heap and self._heap[0][0] <= now:
+                    edge, window_id = heapq.heappop(self._heap)
+                    if self._next.get(window_id) != edge:
+                        continue
+                    window = self._windows[window_id]
+                    if window.active_at(now):
+                        self._active.add(window_id)
+                    else:
+                        self._active.discard(window_id)
+                    self._push_locked(window, now)
+            self._offset = offset
+            changed = self._active != before
+            self._arm_locked()
+        if changed:
+            self._notify()
+
+    def _notify(self) -> None:
+        if self.on_change is not None:
+            self.on_change(self.active())
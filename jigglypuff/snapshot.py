@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# jigglypuff/snapshot.py
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class StatusSnapshot:
+    """Versioned, cached renderings of the server's state.
+
+    ``invalidate`` is called on every state change (start, stop, crash,
+    restart, retune, leases, schedules, targets); it bumps ``version`` and
+    calls the listeners, e.g. to notify subscribed clients. A read renders
+    a view at most once per version and otherwise returns the cached
+    string. Counters that move on every tick (ticks, lateness) are kept
+    fresh by also re-rendering a view once it is ``max_age`` seconds old.
+    """
+
+    def __init__(
+        self,
+        views: Dict[str, Callable[[], str]],
+        max_age: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        metrics: MetricsRegistry = REGISTRY,
+    ):
+        self.views = views
+        self.max_age = max_age
+        self.clock = clock
+        self.version = 1
+        self.changed_at = time.time()
+        self.last_change: Optional[str] = None
+        self._cache: Dict[str, Tuple[int, float, str]] = {}
+        self._listeners: List[Callable[[int, str], None]] = []
+        self._lock = threading.Lock()
+        self._renders = {name: metrics.counter("status_renders_total", "Status views rendered", view=name)
+                         for name in views}
+        self._hits = {name: metrics.counter("status_cache_hits_total", "Status reads served from the cache",
+                                            view=name)
+                      for name in views}
+
+    def get(self, name: str) -> str:
+        """The cached rendering of a view, rendered again if the state changed or it is too old."""
+        with self._lock:
+            version = self.version
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == version and self.clock() - cached[1] < self.max_age:
+                self._hits[name].inc()
+                return cached[2]
+        rendered_at = self.clock()
+        text = self.views[name]()
+        self._renders[name].inc()
+        with self._lock:
+            # A change during the render would make this copy stale for the new version
+            if self.version == version:
+                self._cache[name] = (version, rendered_at, text)
+        return text
+
+    def invalidate(self, reason: str) -> int:
+        """Record a state change and tell the listeners; return the new version."""
+        with self._lock:
+            self.version += 1
+            self.changed_at = time.time()
+            self.last_change = reason
+            self._cache.clear()
+            version = self.version
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(version, reason)
+            except Exception as e:
+                logger.warning(f"Status listener failed: {e}")
+        return version
+
+    def subscribe(self, listener: Callable[[int, str], None]) -> None:
+        """Call ``listener(version, reason)`` after every state change."""
+        with self._lock:
+            self._listeners.append(listener)
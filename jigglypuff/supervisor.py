@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# jigglypuff/supervisor.py
+
+import collections
+import logging
+import threading
+import time
+from typing import Callable, Deque, Optional
+
+from jigglypuff.engine import JiggleEngine
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class Supervisor:
+    """Restarts a jiggle session that died without being asked to stop.
+
+    The engine reports a crashed scheduler or an exited inhibitor the moment
+    it happens; the session is then revived after an exponential backoff
+    (``initial_backoff``, doubling up to ``max_backoff``). More than
+    ``max_failures`` failures within ``window`` seconds trip the crash-loop
+    breaker and the session is left down, with the last failure reported.
+    """
+
+    def __init__(
+        self,
+        engine: JiggleEngine,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        max_failures: int = 5,
+        window: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        metrics: MetricsRegistry = REGISTRY,
+    ):
+        self.engine = engine
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_failures = max_failures
+        self.window = window
+        self.clock = clock
+
+        self.restarts = 0
+        self.failures = 0
+        self.last_failure: Optional[str] = None
+        self.last_failure_at: Optional[float] = None
+        self.gave_up = False
+        self._recent: Deque[float] = collections.deque()
+        self._next_restart: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._restarts_total = metrics.counter(
+            "process_restarts_total", "Helper processes started again after dying", process="jiggler"
+        )
+
+        engine.on_failure = self._on_failure
+        engine.supervisor = self
+
+    @property
+    def pending(self) -> bool:
+        """Whether a restart is scheduled."""
+        return self._next_restart is not None
+
+    @property
+    def next_restart_in(self) -> Optional[float]:
+        """Seconds until the scheduled restart, or None if none is scheduled."""
+        next_restart = self._next_restart
+        return max(0.0, next_restart - self.clock()) if next_restart is not None else None
+
+    @property
+    def state(self) -> str:
+        if self.gave_up:
+            return "gave_up"
+        return "restarting" if self.pending else "watching"
+
+    def cancel(self) -> None:
+        """Drop any scheduled restart; the engine is being stopped on purpose."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._next_restart = None
+
+    def _on_failure(self, reason: str) -> None:
+        with self._lock:
+            now = self.clock()
+            self.failures += 1
+            self.last_failure = reason
+            self.last_failure_at = time.time()
+            self._recent.append(now)
+            while self._recent and self._recent[0] <= now - self.window:
+                self._recent.popleft()
+
+            if len(self._recent) > self.max_failures:
+                self.gave_up = True
+                self._next_restart = None
+                logger.error(f"jigglypuff session {self.engine.session_id} failed {len(self._recent)} times "
+                             f"in {self.window:g}s, not restarting it again: {reason}")
+                return
+
+            delay = min(self.max_backoff, self.initial_backoff * 2 ** (len(self._recent) - 1))
+            self._next_restart = now + delay
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._restart)
+            self._timer.daemon = True
+            self._timer.start()
+            logger.info(f"jigglypuff session {self.engine.session_id} will be restarted in {delay:g}s")
+
+    def _restart(self) -> None:
+        with self._lock:
+            if self._next_restart is None or self.engine.stopping:
+                return
+            self._next_restart = None
+            self._timer = None
+            self.restarts += 1
+        self._restarts_total.inc()
+        logger.info(f"Restarting jigglypuff session {self.engine.session_id} (restart {self.restarts})")
+        try:
+            self.engine.revive()
+        except Exception as e:
+            self._on_failure(f"restart failed: {e}")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# jigglypuff/targets.py
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from jigglypuff.backends import PointerBackend
+from jigglypuff.logsink import JiggleLog
+from jigglypuff.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Heap entry phases: move out by the offset, then back after the backend's pause
+_OUT, _BACK = 0, 1
+
+
+class Target:
+    """One named thing to keep awake (a display, a VDI session) and its stats."""
+
+    def __init__(self, name: str, backend: PointerBackend, interval: Union[int, float], offset: int):
+        self.name = name
+        self.backend = backend
+        self.interval = interval
+        self.offset = offset
+        self.started_at = time.time()
+        self.ticks = 0
+        self.errors = 0
+        self.missed_ticks = 0
+        self.last_error: Optional[str] = None
+        self.lateness_max = 0.0
+        self._lateness_sum = 0.0
+        self._lateness_count = 0
+        # Bumped on retune and removal, so heap entries scheduled before go stale
+        self.generation = 0
+        # Deadline of the current tick, and the offset of an outward move not yet taken back
+        self.due = 0.0
+        self.out: Optional[int] = None
+        # Set while the scheduler thread is moving this target's pointer
+        self.busy = False
+
+    @property
+    def lateness_mean(self) -> Optional[float]:
+        return self._lateness_sum / self._lateness_count if self._lateness_count else None
+
+    def to_dict(self) -> dict:
+        mean = self.lateness_mean
+        return {
+            "name": self.name,
+            "backend": self.backend.name,
+            "interval": self.interval,
+            "offset": self.offset,
+            "ticks": self.ticks,
+            "errors": self.errors,
+            "missed_ticks": self.missed_ticks,
+            "last_error": self.last_error,
+            "lateness_mean_ms": round(mean * 1e3, 3) if mean is not None else None,
+            "lateness_max_ms": round(self.lateness_max * 1e3, 3),
+        }
+
+
+class TargetScheduler:
+    """Jiggles many targets from one thread and one timer heap.
+
+    Each target has one entry in the heap for its next move; the thread
+    sleeps until the earliest one, so the cost per target is a heap push
+    and a backend call per tick, whatever the number of targets. The
+    outward and return moves of a jiggle are separate entries, so one
+    target's pause never holds up another. Ticks are on absolute monotonic
+    deadlines, and ticks that could not run on time are skipped, as in
+    JiggleEngine.
+    """
+
+    def __init__(self, log: Optional[JiggleLog] = None, metrics: MetricsRegistry = REGISTRY):
+        self.log = log
+        self._targets: Dict[str, Target] = {}
+        self._heap: List[Tuple[float, int, str, int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._ticks = metrics.counter("target_ticks_total", "Ticks that jiggled a named target")
+        self._errors = metrics.counter("target_tick_errors_total", "Target ticks whose backend call failed")
+        self._drift = metrics.histogram("target_tick_drift_seconds", "How late target ticks fired")
+
+    def add(self, name: str, backend: PointerBackend, interval: Union[int, float], offset: int) -> Target:
+        """Start jiggling a target right away, replacing any target of the same name."""
+        self.remove(name)
+        target = Target(name, backend, interval, offset)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("target scheduler is closed")
+            self._targets[name] = target
+            target.due = time.monotonic()
+            self._push_locked(target.due, target, _OUT)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jigglypuff-targets", daemon=True)
+                self._thread.start()
+        self._log(f"Target {name} started with interval={interval}s, offset={offset}px")
+        return target
+
+    def remove(self, name: str) -> bool:
+        """Stop jiggling a target and close its backend; return False if there was none."""
+        with self._cond:
+            target = self._targets.pop(name, None)
+            if target is None:
+                return False
+            target.generation += 1
+            # A target in the middle of a move is finished by the scheduler thread
+            busy = target.busy
+        if not busy:
+            self._finish(target)
+        self._log(f"Target {name} stopped")
+        return True
+
+    def retune(self, name: str, interval: Union[int, float], offset: int) -> Optional[Target]:
+        """Change a target's settings; the next jiggle is one new interval after the last."""
+        with self._cond:
+            target = self._targets.get(name)
+            if target is None:
+                return None
+            target.interval = interval
+            target.offset = offset
+            # Otherwise the scheduler thread schedules the next tick with the new values
+            if not target.busy and target.out is None:
+                target.generation += 1
+                self._push_locked(max(time.monotonic(), target.due + interval), target, _OUT)
+            return target
+
+    def targets(self) -> List[Target]:
+        with self._cond:
+            return sorted(self._targets.values(), key=lambda target: target.name)
+
+    def get(self, name: str) -> Optional[Target]:
+        return self._targets.get(name)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def close(self) -> None:
+        """Stop every target and the scheduler thread."""
+        with self._cond:
+            self._closed = True
+            targets = list(self._targets.values())
+            self._targets.clear()
+            self._heap.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        for target in targets:
+            self._finish(target)
+
+    def _push_locked(self, when: float, target: Target, phase: int) -> None:
+        heapq.heappush(self._heap, (when, next(self._seq), target.name, target.generation, phase))
+        self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    when, _, name, generation, phase = self._heap[0]
+                    target = self._targets.get(name)
+                    if target is None or target.generation != generation:
+                        heapq.heappop(self._heap)
+                        continue
+                    remaining = when - time.monotonic()
+                    if remaining <= 0:
+                        heapq.heappop(self._heap)
+                        target.busy = True
+                        break
+                    self._cond.wait(remaining)
+
+            # The backend call happens outside the lock
+            if phase == _OUT:
+                when, phase = self._move_out(target, when)
+            else:
+                when, phase = self._move_back(target)
+
+            with self._cond:
+                target.busy = False
+                removed = self._targets.get(target.name) is not target
+                if not removed:
+                    self._push_locked(when, target, phase)
+            if removed:
+                self._finish(target)
+
+    def _move_out(self, target: Target, due: float) -> Tuple[float, int]:
+        lateness = time.monotonic() - due
+        self._drift.observe(lateness)
+        target.lateness_max = max(target.lateness_max, lateness)
+        target._lateness_sum += lateness
+        target._lateness_count += 1
+        target.due = due
+
+        pause = target.backend.jiggle_pause
+        try:
+            if pause:
+                target.backend.move(target.offset, 0)
+                target.out = target.offset
+                return time.monotonic() + pause, _BACK
+            target.backend.jiggle(target.offset)
+        except Exception as e:
+            self._failed(target, e)
+        else:
+            self._jiggled(target)
+        return self._next_due(target), _OUT
+
+    def _move_back(self, target: Target) -> Tuple[float, int]:
+        try:
+            target.backend.move(-target.out, 0)
+        except Exception as e:
+            self._failed(target, e)
+        else:
+            self._jiggled(target)
+        target.out = None
+        return self._next_due(target), _OUT
+
+    def _next_due(self, target: Target) -> float:
+        next_due = target.due + target.interval
+        now = time.monotonic()
+        if next_due <= now:
+            missed = int((now - next_due) // target.interval) + 1
+            target.missed_ticks += missed
+            next_due += missed * target.interval
+        return next_due
+
+    def _jiggled(self, target: Target) -> None:
+        target.ticks += 1
+        self._ticks.inc()
+
+    def _failed(self, target: Target, error: Exception) -> None:
+        target.errors += 1
+        self._errors.inc()
+        if target.last_error is None:
+            logger.warning(f"Target {target.name}: {target.backend.name} backend failed to jiggle: {error}")
+        target.last_error = str(error)
+        target.out = None
+
+    def _finish(self, target: Target) -> None:
+        # Bring the pointer home if the target was stopped between its two moves
+        if target.out is not None:
+            try:
+                target.backend.move(-target.out, 0)
+            except Exception as e:
+                logger.debug(f"Target {target.name}: return move failed: {e}")
+            target.out = None
+        target.backend.close()
+
+    def _log(self, message: str) -> None:
+        if self.log is not None:
+            self.log.write(message)
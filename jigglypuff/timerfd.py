@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# jigglypuff/timerfd.py
+
+import ctypes
+import errno
+import math
+import os
+import select
+import sys
+import threading
+from typing import List, Optional
+
+CLOCK_REALTIME = 0
+CLOCK_BOOTTIME = 7
+
+_TFD_CLOEXEC = 0o2000000
+_TFD_NONBLOCK = 0o4000
+_TFD_TIMER_ABSTIME = 1
+_TFD_TIMER_CANCEL_ON_SET = 2
+_FD_SETSIZE = 1024
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _Timespec), ("it_value", _Timespec)]
+
+
+_libc = None
+_libc_lock = threading.Lock()
+
+
+def _load_libc():
+    global _libc
+    with _libc_lock:
+        if _libc is None:
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.timerfd_create.restype = ctypes.c_int
+            libc.timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+            libc.timerfd_settime.restype = ctypes.c_int
+            libc.timerfd_settime.argtypes = [
+                ctypes.c_int, ctypes.c_int, ctypes.POINTER(_Itimerspec), ctypes.POINTER(_Itimerspec)
+            ]
+            _libc = libc
+        return _libc
+
+
+def available() -> bool:
+    """Return True if timerfds can be created on this host (Linux)."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_load_libc(), "timerfd_create")
+    except OSError:
+        return False
+
+
+class TimerEvent:
+    """A ``threading.Event`` whose waits can also end on a kernel clock's timer.
+
+    ``wait(timeout)`` sleeps like ``threading.Event.wait``, on the monotonic
+    clock and with the thread's timer slack (select() allows the kernel at
+    least 0.1% of the timeout on top). In addition a timerfd on
+    ``clock`` can be armed for the same wait:
+
+    - with ``backstop``, every timed wait arms it ``backstop`` seconds after
+      the timeout. On CLOCK_BOOTTIME, which keeps counting while the machine
+      is suspended, it only fires when a suspend outlasted the deadline, so
+      the waiter wakes at the resume instead of a whole timeout later.
+    - ``wait(alarm=...)`` arms it for an absolute time on ``clock``. With
+      ``cancel_on_set`` (CLOCK_REALTIME only) the wait also ends when the
+      clock is set, and ``clock_was_set`` tells the caller so.
+
+    Linux only; the constructor raises OSError elsewhere.
+    """
+
+    def __init__(self, clock: int = CLOCK_BOOTTIME, backstop: Optional[float] = None,
+                 cancel_on_set: bool = False):
+        if not available():
+            raise OSError("timerfd is not available on this host")
+        libc = _load_libc()
+        fd = libc.timerfd_create(clock, _TFD_CLOEXEC | _TFD_NONBLOCK)
+        if fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"timerfd_create: {os.strerror(code)}")
+        self.clock = clock
+        self.backstop = backstop
+        self.cancel_on_set = cancel_on_set
+        self.clock_was_set = False
+        self._libc = libc
+        self._timer: Optional[int] = fd
+        self._read, self._write = os.pipe2(os.O_CLOEXEC | os.O_NONBLOCK)
+        self._lock = threading.Lock()
+        self._flag = False
+
+    def is_set(self) -> bool:
+        return self._flag
+
+    def set(self) -> None:
+        with self._lock:
+            if self._flag or self._timer is None:
+                return
+            self._flag = True
+            os.write(self._write, b"\0")
+
+    def clear(self) -> None:
+        with self._lock:
+            if not self._flag or self._timer is None:
+                return
+            self._flag = False
+            try:
+                os.read(self._read, 64)
+            except BlockingIOError:
+                pass
+
+    def wait(self, timeout: Optional[float] = None, alarm: Optional[float] = None) -> bool:
+        """Wait until set, ``timeout`` passes or the timer fires; return whether the event is set.
+
+        Args:
+            timeout: Seconds on the monotonic clock, or None for no limit
+            alarm: Absolute time on ``clock`` at which the timer fires
+        """
+        if self._flag:
+            return True
+        self.clock_was_set = False
+        armed = True
+        if alarm is not None:
+            self._arm(alarm, absolute=True)
+        elif timeout is not None and self.backstop is not None:
+            self._arm(max(timeout, 0.0) + self.backstop)
+        else:
+            armed = False
+        try:
+            if self._timer in self._ready(None if timeout is None else max(timeout, 0.0)):
+                # Read before disarming, which would clear a cancellation
+                try:
+                    os.read(self._timer, 8)
+                except OSError as e:
+                    if e.errno == errno.ECANCELED:
+                        self.clock_was_set = True
+                    elif e.errno != errno.EAGAIN:
+                        raise
+        finally:
+            if armed:
+                self._arm(None)
+        return self._flag
+
+    def _ready(self, timeout: Optional[float]) -> List[int]:
+        fds = [self._read, self._timer]
+        if max(fds) < _FD_SETSIZE:
+            # select() keeps microseconds of the timeout, poll() only milliseconds
+            return select.select(fds, [], [], timeout)[0]
+        poller = select.poll()
+        for fd in fds:
+            poller.register(fd, select.POLLIN)
+        return [fd for fd, _ in poller.poll(None if timeout is None else math.ceil(timeout * 1000))]
+
+    def _arm(self, when: Optional[float], absolute: bool = False) -> None:
+        spec = _Itimerspec()
+        flags = 0
+        if when is not None:
+            if absolute:
+                flags = _TFD_TIMER_ABSTIME
+                if self.cancel_on_set:
+                    flags |= _TFD_TIMER_CANCEL_ON_SET
+            # A zero it_value disarms the timer, so a due time is never exactly zero
+            nanoseconds = max(1, int(when * 1e9))
+            spec.it_value.tv_sec, spec.it_value.tv_nsec = divmod(nanoseconds, 1_000_000_000)
+        if self._libc.timerfd_settime(self._timer, flags, ctypes.byref(spec), None) < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"timerfd_settime: {os.strerror(code)}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is None:
+                return
+            for fd in (self._timer, self._read, self._write):
+                os.close(fd)
+            self._timer = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -1,255 +1,1178 @@
 #!/usr/bin/env python3
 # mcp_server.py
 
+import sys
 import os
-import subprocess
+import asyncio
+import atexit
+import json
 import logging
-from typing import Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from mcp.server.fastmcp import FastMCP
+from mcp.server.stdio import stdio_server
+
+from jigglypuff import JiggleEngine, JiggleLog, available_backends, get_backend
+from jigglypuff.children import install_signal_handlers
+from jigglypuff.daemon import ControlServer, DaemonClient, connect_or_spawn
+from jigglypuff.events import EventRing
+from jigglypuff.history import HistoryStore
+from jigglypuff.leases import LeaseManager
+from jigglypuff.looplag import LoopLagMonitor
+from jigglypuff.metrics import REGISTRY, exporter_from_env
+from jigglypuff.rules import RuleBook
+from jigglypuff.schedules import ScheduleManager, Window
+from jigglypuff.snapshot import StatusSnapshot
+from jigglypuff.supervisor import Supervisor
+from jigglypuff.targets import TargetScheduler
+
+# jigglypuff.deadline, jigglypuff.idle and the prompt texts are imported where
+# they are first used, to keep cold start short for editors that launch a
+# fresh server per session
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP server with deferred registration and call metrics.
+    
+    ``tool``, ``prompt`` and ``resource`` only record the decorated function;
+    the FastMCP objects (and their pydantic argument models) are built the
+    first time a client lists or uses them, so nothing delays the response
+    to ``initialize``. Every tool call and resource read is counted and timed,
+    and ``loop_lag`` records the worst event loop stall while one is running.
+    
+    Clients may subscribe to resources; ``notify_resource_updated`` sends
+    them a resources/updated notification from any thread, coalescing
+    changes that arrive before the previous notification went out.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending: List[tuple] = []
+        # uri -> registered resource name, the label of resource metrics
+        self._resource_names: Dict[str, str] = {}
+        self.loop_lag = LoopLagMonitor()
+        # uri -> {id(session): (session, loop)}
+        self._subscribers: Dict[str, Dict[int, tuple]] = {}
+        self._unsent: Set[Tuple[int, str]] = set()
+        self._subscribers_lock = threading.Lock()
+        self._mcp_server.subscribe_resource()(self.subscribe_resource)
+        self._mcp_server.unsubscribe_resource()(self.unsubscribe_resource)
+    
+    async def run_stdio_async(self) -> None:
+        async with stdio_server() as (read_stream, write_stream):
+            options = self._mcp_server.create_initialization_options()
+            # The low-level server never advertises subscriptions on its own
+            if options.capabilities.resources is not None:
+                options.capabilities.resources.subscribe = True
+            await self._mcp_server.run(read_stream, write_stream, options)
+    
+    async def subscribe_resource(self, uri) -> None:
+        session = self._mcp_server.request_context.session
+        with self._subscribers_lock:
+            self._subscribers.setdefault(str(uri), {})[id(session)] = (session, asyncio.get_running_loop())
+    
+    async def unsubscribe_resource(self, uri) -> None:
+        session = self._mcp_server.request_context.session
+        with self._subscribers_lock:
+            self._subscribers.get(str(uri), {}).pop(id(session), None)
+    
+    def notify_resource_updated(self, uri: str) -> None:
+        """Tell every client subscribed to ``uri`` that it changed."""
+        with self._subscribers_lock:
+            due = []
+            for key, (session, loop) in self._subscribers.get(uri, {}).items():
+                if (key, uri) not in self._unsent:
+                    self._unsent.add((key, uri))
+                    due.append((key, session, loop))
+        for key, session, loop in due:
+            try:
+                asyncio.run_coroutine_threadsafe(self._send_updated(key, session, uri), loop)
+            except RuntimeError:
+                # The session's event loop is gone
+                self._drop_subscriber(key, uri)
+    
+    async def _send_updated(self, key: int, session, uri: str) -> None:
+        with self._subscribers_lock:
+            self._unsent.discard((key, uri))
+        try:
+            await session.send_resource_updated(uri)
+        except Exception as e:
+            logger.debug(f"Dropping subscriber to {uri}: {e}")
+            self._drop_subscriber(key, uri)
+    
+    def _drop_subscriber(self, key: int, uri: str) -> None:
+        with self._subscribers_lock:
+            self._subscribers.get(uri, {}).pop(key, None)
+            self._unsent.discard((key, uri))
+    
+    def tool(self, *args, **kwargs):
+        return self._defer(super().tool, args, kwargs)
+    
+    def prompt(self, *args, **kwargs):
+        return self._defer(super().prompt, args, kwargs)
+    
+    def resource(self, uri: str, *args, **kwargs):
+        defer = self._defer(super().resource, (uri,) + args, kwargs)
+
+        def decorator(fn):
+            self._resource_names[uri] = kwargs.get("name") or fn.__name__
+            return defer(fn)
+        return decorator
+    
+    def _defer(self, register, args, kwargs):
+        def decorator(fn):
+            self._pending.append((register, args, kwargs, fn))
+            return fn
+        return decorator
+    
+    def register_pending(self) -> None:
+        """Build every tool, prompt and resource recorded so far."""
+        pending, self._pending = self._pending, []
+        for register, args, kwargs, fn in pending:
+            register(*args, **kwargs)(fn)
+    
+    async def list_tools(self):
+        self.register_pending()
+        return await super().list_tools()
+    
+    async def list_prompts(self):
+        self.register_pending()
+        return await super().list_prompts()
+    
+    async def get_prompt(self, name, arguments=None):
+        self.register_pending()
+        return await super().get_prompt(name, arguments)
+    
+    async def list_resources(self):
+        self.register_pending()
+        return await super().list_resources()
+    
+    async def list_resource_templates(self):
+        self.register_pending()
+        return await super().list_resource_templates()
+    
+    async def call_tool(self, name: str, arguments: dict[str, Any]):
+        self.register_pending()
+        began = time.perf_counter()
+        try:
+            async with self.loop_lag.track():
+                return await super().call_tool(name, arguments)
+        finally:
+            REGISTRY.counter("tool_calls_total", "MCP tool calls", tool=name).inc()
+            REGISTRY.histogram("tool_call_seconds", "MCP tool call latency", tool=name).observe(
+                time.perf_counter() - began
+            )
+    
+    async def read_resource(self, uri):
+        self.register_pending()
+        began = time.perf_counter()
+        try:
+            async with self.loop_lag.track():
+                return await super().read_resource(uri)
+        finally:
+            # Client-supplied URIs would make unbounded label sets; unknown ones share one
+            name = self._resource_names.get(str(uri), "unknown")
+            REGISTRY.counter("resource_reads_total", "MCP resource reads", resource=name).inc()
+            REGISTRY.histogram("resource_read_seconds", "MCP resource read latency", resource=name).observe(
+                time.perf_counter() - began
+            )
+
+
 # Initialize MCP server
-mcp = FastMCP("jigglypuff")
+mcp = InstrumentedFastMCP("jigglypuff")
 
 # Log the tools that are being registered
 logger.info("Registering tools...")
 
-# Global process reference
-jiggler_process: Optional[subprocess.Popen] = None
+# Global engine reference
+jiggler: Optional[JiggleEngine] = None
+
+# Per-instance jiggler log, flushed on exit
+jiggle_log = JiggleLog()
+atexit.register(jiggle_log.close)
+
+
+# What the jiggle sessions did, newest 1024 events, read by cursor with get_jiggly_events
+events = EventRing()
+
+# Every event is also kept on disk for query_jiggly_history
+history = HistoryStore()
+atexit.register(history.close)
+
+
+def _record_history(event) -> None:
+    history.record(event)
+
+
+events.subscribe(_record_history)
+
+# Serializes changes to the jiggler between tool calls and the lease reaper
+_control_lock = threading.RLock()
+
+# Session started on behalf of leases or schedule windows, stopped when the
+# last lease goes away and no window is open
+lease_session: Optional[int] = None
+
+# Set by put_jiggly_to_sleep during an open window; the next window edge clears it
+schedule_suppressed = False
+
+# (session id, interval, offset) of a manually started session before leases
+# or schedule windows retuned it, restored when the last of them goes away
+manual_settings: Optional[Tuple[int, float, int]] = None
+
+
+def _on_leases_expired(owners: List[str]) -> None:
+    logger.info(f"Reaped expired jiggle leases: {', '.join(owners)}")
+    _reconcile_leases()
+    snapshot.invalidate("leases expired")
+
+
+leases = LeaseManager(on_expire=_on_leases_expired)
+
+
+def _on_schedule_change(active: List[Window]) -> None:
+    global schedule_suppressed
+    
+    schedule_suppressed = False
+    logger.info(f"Open jiggle schedule windows: {', '.join(str(w.id) for w in active) or 'none'}")
+    _reconcile_leases()
+    snapshot.invalidate("schedule window edge")
+
+
+schedules = ScheduleManager(on_change=_on_schedule_change)
+
+
+def _session_uptime() -> Optional[float]:
+    engine = jiggler
+    if engine is None or not engine.running or engine.started_at is None:
+        return None
+    return round(time.time() - engine.started_at, 3)
+
+
+REGISTRY.gauge("session_uptime_seconds", _session_uptime, "Uptime of the running jiggle session")
+
+
+def _new_engine(interval: float, offset: int, idle_timeout: Optional[float] = None,
+                strategy: str = "jiggle") -> JiggleEngine:
+    """Build a supervised jiggle engine with the configured backend, idle source and log.
+    
+    With ``idle_timeout`` the engine runs in deadline mode: it only jiggles
+    once the user has been idle for ``interval`` seconds and tracks slack.
+    """
+    from jigglypuff.idle import get_idle_source
+    from jigglypuff.power import get_power_profile
+    
+    engine = JiggleEngine(
+        get_backend(), interval, offset, log=jiggle_log, idle_source=get_idle_source(),
+        idle_threshold=interval if idle_timeout else None, idle_timeout=idle_timeout,
+        strategy=strategy, power=get_power_profile(), events=events
+    )
+    Supervisor(engine)
+    # Crashes and restarts change the status without any tool call
+    engine.on_change = lambda reason: snapshot.invalidate(f"session {engine.session_id} {reason}")
+    return engine
+
+
+def _active(engine: Optional[JiggleEngine]) -> bool:
+    """Whether a session is jiggling, or down and about to be restarted."""
+    return engine is not None and (
+        engine.running or (engine.supervisor is not None and engine.supervisor.pending)
+    )
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1e3, 3) if seconds is not None else None
+
+
+def _describe(engine: JiggleEngine) -> str:
+    """Short description of how a session keeps the machine awake."""
+    parts = []
+    if engine.strategy != "jiggle":
+        parts.append(f"{engine.strategy} strategy")
+    if engine.jiggles:
+        parts.append(f"{engine.backend.name} backend")
+    if engine.inhibitor is not None and engine.inhibitor.pid:
+        parts.append(f"inhibitor PID {engine.inhibitor.pid}")
+    return ", ".join(parts)
+
+
+# With JIGGLYPUFF_DAEMON set, every editor's server forwards to one shared
+# daemon (started on first use) instead of running its own jiggler
+daemon_mode = os.environ.get("JIGGLYPUFF_DAEMON", "").lower() in ("1", "true", "yes", "on")
+
+# The daemon's control socket server, when this process is the daemon
+control_server: Optional[ControlServer] = None
+
+_daemon_client_instance: Optional[DaemonClient] = None
+
+
+def _daemon_client() -> DaemonClient:
+    global _daemon_client_instance
+    if _daemon_client_instance is None:
+        _daemon_client_instance = connect_or_spawn(
+            [sys.executable, os.path.abspath(__file__), "--daemon"]
+        )
+    return _daemon_client_instance
+
+
+class OpFailure(str):
+    """Result text of an operation that did not do what was asked.
+    
+    Tools return it like any other message; apply_jiggly_ops uses the type,
+    not the wording, to decide that a batch failed.
+    """
+
+
+# Operations that only read state; every other one may change it
+_READ_OPS = frozenset({"status", "config", "metrics", "events", "history"})
+
+
+async def _dispatch(op: str, local, **args):
+    """Run an operation in the shared daemon, or locally on a worker thread.
+    
+    The local implementations take the control lock and may block on
+    process spawns and joins, so they never run on the event loop.
+    Operations that may change state invalidate the status snapshot.
+    """
+    if daemon_mode:
+        try:
+            result = await asyncio.to_thread(lambda: _daemon_client().call(op, **args))
+        except Exception as e:
+            logger.error(f"jigglypuff daemon request {op} failed: {e}")
+            return OpFailure(f"Error reaching the jigglypuff daemon: {e}")
+        if op not in _READ_OPS:
+            # Only changes made through this front-end reach its subscribers
+            snapshot.invalidate(op)
+        return result
+    try:
+        return await asyncio.to_thread(local, **args)
+    finally:
+        if op not in _READ_OPS:
+            snapshot.invalidate(op)
 
 
 @mcp.tool()
-def wake_up_jiggly(interval: int = 30, offset: int = 1) -> str:
+async def wake_up_jiggly(interval: Union[int, str] = 30, offset: int = 1, idle_timeout: Optional[int] = None,
+                         strategy: str = "jiggle") -> str:
     """Wake up jigglypuff to start jiggling the cursor.
     
     Args:
-        interval: Time between jiggles in seconds (default: 30, min: 5, max: 300)
+        interval: Time between jiggles in seconds (default: 30, min: 5, max: 300),
+            or "auto" to jiggle just before the screensaver/sleep deadline
         offset: Mouse movement offset in pixels (default: 1, min: 1, max: 10)
+        idle_timeout: Screensaver/sleep timeout in seconds for "auto" mode
+            (default: discovered from the system, min: 10, max: 7200)
+        strategy: How to keep the machine awake: "jiggle" (move the cursor),
+            "inhibit" (hold an OS sleep inhibitor, no cursor movement) or
+            "hybrid" (inhibitor plus a jiggle at most every 4 minutes)
     """
-    global jiggler_process
-    
-    # Validate parameters
-    interval = max(5, min(300, interval))  # Clamp between 5-300
-    offset = max(1, min(10, offset))        # Clamp between 1-10
-    
-    # Check if already running
-    if jiggler_process and jiggler_process.poll() is None:
-        result = f"jigglypuff is already jiggling with PID {jiggler_process.pid}"
-        return result
+    return await _dispatch("start", _wake_up, interval=interval, offset=offset,
+                           idle_timeout=idle_timeout, strategy=strategy)
+
+
+def _wake_up(interval: Union[int, str] = 30, offset: int = 1, idle_timeout: Optional[int] = None,
+             strategy: str = "jiggle") -> str:
+    global jiggler
     
-    try:
-        # Get the directory of this script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        script_path = os.path.join(script_dir, "jiggly_puff.sh")
+    with _control_lock:
+        # Validate parameters
+        auto = str(interval).lower() == "auto"
+        if not auto:
+            interval = max(5, min(300, int(interval)))  # Clamp between 5-300
+        offset = max(1, min(10, offset))        # Clamp between 1-10
         
-        # Start the jiggler process
-        jiggler_process = subprocess.Popen(["bash", script_path, str(interval), str(offset)])
-        logger.info(f"jigglypuff started jiggling with PID {jiggler_process.pid}")
+        # Check if already running
+        if _active(jiggler):
+            result = f"jigglypuff is already jiggling in session {jiggler.session_id}"
+            return result
         
-        result = f"jigglypuff started jiggling successfully with PID {jiggler_process.pid}, interval={interval}s, offset={offset}px"
-        return result
+        try:
+            if auto:
+                from jigglypuff.deadline import discover_idle_timeout, plan_interval
+                
+                # Plan the interval from the deadline the machine would sleep at
+                if idle_timeout:
+                    timeout, source = float(max(10, min(7200, idle_timeout))), "argument"
+                else:
+                    timeout, source = discover_idle_timeout()
+                planned = plan_interval(timeout)
+                jiggler = _new_engine(planned, offset, idle_timeout=timeout, strategy=strategy)
+                interval_text = f"auto ({planned:g}s before a {timeout:g}s {source} deadline)"
+            else:
+                jiggler = _new_engine(interval, offset, strategy=strategy)
+                interval_text = f"{jiggler.interval}s"
+            
+            # Start the in-process jiggle engine
+            jiggler.start()
+            logger.info(f"jigglypuff started jiggling in session {jiggler.session_id} "
+                        f"({_describe(jiggler)})")
         
-    except Exception as e:
-        logger.error(f"Failed to wake up jigglypuff: {e}")
-        error_msg = f"Error waking up jigglypuff: {e}"
-        return error_msg
+            result = (f"jigglypuff started jiggling successfully in session {jiggler.session_id} "
+                      f"({_describe(jiggler)}), interval={interval_text}, offset={offset}px")
+            return result
+        
+        except Exception as e:
+            logger.error(f"Failed to wake up jigglypuff: {e}")
+            return OpFailure(f"Error waking up jigglypuff: {e}")
 
 @mcp.tool()
-def put_jiggly_to_sleep() -> str:
+async def put_jiggly_to_sleep() -> str:
     """Put jigglypuff to sleep to stop jiggling the cursor."""
-    global jiggler_process
-    
-    # Check if running
-    if not jiggler_process or jiggler_process.poll() is not None:
-        result = "jigglypuff is already sleeping"
-        return result
+    return await _dispatch("stop", _put_to_sleep)
+
+
+def _put_to_sleep() -> str:
+    global jiggler, lease_session, schedule_suppressed
     
-    try:
-        # Terminate the process
-        jiggler_process.terminate()
-        jiggler_process.wait(timeout=5)  # Wait up to 5 seconds
-        pid = jiggler_process.pid
-        jiggler_process = None
+    with _control_lock:
+        # Sleeping is an explicit override, so outstanding leases are dropped too
+        dropped = leases.clear()
+        lease_session = None
+        if dropped:
+            logger.info(f"Dropped {dropped} jiggle leases on put_jiggly_to_sleep")
+        # Schedules are kept, but the window that is open now stays asleep
+        if schedules.active():
+            schedule_suppressed = True
         
-        logger.info(f"jigglypuff with PID {pid} put to sleep")
-        result = f"jigglypuff with PID {pid} put to sleep successfully"
-        return result
+        # Check if running
+        if not _active(jiggler):
+            result = "jigglypuff is already sleeping"
+            return result
         
-    except subprocess.TimeoutExpired:
-        # Force kill if not responding
-        jiggler_process.kill()
-        jiggler_process.wait()
-        pid = jiggler_process.pid
-        jiggler_process = None
+        try:
+            session_id = jiggler.session_id
+            stopped = jiggler.stop(timeout=5)  # Wait up to 5 seconds
+            jiggler = None
         
-        logger.warning(f"jigglypuff with PID {pid} force put to sleep")
-        result = f"jigglypuff with PID {pid} force put to sleep"
-        return result
-    
-    except Exception as e:
-        logger.error(f"Error putting jigglypuff to sleep: {e}")
-        error_msg = f"Error putting jigglypuff to sleep: {e}"
-        return error_msg
+            if not stopped:
+                logger.warning(f"jigglypuff session {session_id} did not stop within 5s")
+                result = f"jigglypuff session {session_id} force put to sleep"
+                return result
+        
+            logger.info(f"jigglypuff session {session_id} put to sleep")
+            result = f"jigglypuff session {session_id} put to sleep successfully"
+            return result
+        
+        except Exception as e:
+            logger.error(f"Error putting jigglypuff to sleep: {e}")
+            return OpFailure(f"Error putting jigglypuff to sleep: {e}")
 
 @mcp.tool()
-def check_jiggly_status() -> str:
+async def check_jiggly_status() -> str:
     """Check the current status of jigglypuff."""
-    global jiggler_process
+    return await _dispatch("status", _cached_status)
+
+
+@mcp.tool()
+async def get_jiggly_events(since_seq: int = 0, limit: int = 100, wait_ms: int = 0) -> str:
+    """Get what jigglypuff did since a cursor: started, jiggled, skipped, stopped, crashed, ...
     
-    if not jiggler_process:
-        result = "jigglypuff is sleeping (no process)"
+    Pass the returned next_seq as since_seq on the next call to get only
+    new events. Only the newest 1024 events are kept; "missed" counts
+    events after since_seq that were already dropped.
+    
+    Args:
+        since_seq: Sequence number of the last event already seen (default: 0, from the oldest kept)
+        limit: Maximum number of events to return (default: 100, min: 1, max: 1000)
+        wait_ms: If there is nothing new, wait up to this long for an event (default: 0, max: 30000)
+    """
+    limit = max(1, min(1000, limit))
+    wait_ms = max(0, min(30000, wait_ms))
+    if daemon_mode:
+        # Stay within the control socket's timeout
+        return await _dispatch("events", _events, since_seq=since_seq, limit=limit,
+                               wait_ms=min(wait_ms, 8000))
+    if wait_ms:
+        await events.wait_async(since_seq, wait_ms / 1000)
+    return _events(since_seq, limit)
+
+
+def _events(since_seq: int = 0, limit: int = 100, wait_ms: int = 0) -> str:
+    if wait_ms:
+        events.wait(since_seq, wait_ms / 1000)
+    found, missed = events.since(since_seq, limit)
+    if found:
+        next_seq = found[-1].seq
+    else:
+        # A cursor from before a server restart can be ahead of the newest event
+        next_seq = min(since_seq, events.last_seq)
+    return json.dumps({
+        "events": [event.to_dict() for event in found],
+        "next_seq": next_seq,
+        "missed": missed,
+    })
+
+
+@mcp.tool()
+async def query_jiggly_history(start: str, end: Optional[str] = None, min_gap: float = 1.0,
+                               timezone: Optional[str] = None) -> str:
+    """Report whether the machine was kept awake between two times, e.g. for a compliance check.
+    
+    Returns JSON with the covered seconds, the gaps (uncovered stretches),
+    and how many jiggles, idle skips, starts, stops and crashes there were.
+    
+    Args:
+        start: ISO date-time, e.g. "2025-03-04T02:00"
+        end: ISO date-time (default: now)
+        min_gap: Uncovered stretches shorter than this many seconds are not gaps (default: 1)
+        timezone: IANA zone for start and end without an offset (default: system zone)
+    """
+    return await _dispatch("history", _history, start=start, end=end, min_gap=min_gap, timezone=timezone)
+
+
+def _history(start: str, end: Optional[str] = None, min_gap: float = 1.0,
+             timezone: Optional[str] = None) -> str:
+    from datetime import datetime
+    
+    def timestamp(text: str) -> float:
+        moment = datetime.fromisoformat(text)
+        if moment.tzinfo is None and zone is not None:
+            moment = moment.replace(tzinfo=zone)
+        return moment.timestamp()
+    
+    def isoformat(when: float) -> str:
+        return datetime.fromtimestamp(when).astimezone(zone).isoformat(timespec="seconds")
+    
+    try:
+        zone = None
+        if timezone:
+            from zoneinfo import ZoneInfo
+            zone = ZoneInfo(timezone)
+        report = history.query(timestamp(start), timestamp(end) if end else time.time(), max(0.0, min_gap))
+    except Exception as e:
+        logger.error(f"Failed to query jiggle history: {e}")
+        return OpFailure(f"Error querying jiggle history: {e}")
+    
+    report["start"], report["end"] = isoformat(report["start"]), isoformat(report["end"])
+    for gap in report["gaps"]:
+        gap["start"], gap["end"] = isoformat(gap["start"]), isoformat(gap["end"])
+    return json.dumps(report)
+
+
+def _status() -> str:
+    result = _session_status()
+    if len(targets):
+        result += f"; {len(targets)} named targets jiggling"
+    return result
+
+
+def _session_status() -> str:
+    global jiggler
+    
+    if not jiggler:
+        result = "jigglypuff is sleeping (no session)"
         return result
     
-    if jiggler_process.poll() is None:
-        result = f"jigglypuff is jiggling with PID {jiggler_process.pid}"
+    supervisor = jiggler.supervisor
+    if jiggler.running:
+        result = f"jigglypuff is jiggling in session {jiggler.session_id} ({_describe(jiggler)})"
+        if jiggler.jitter is not None:
+            result += (f", ticks late by {jiggler.lateness_mean * 1e3:.1f}ms on average "
+                       f"(jitter {jiggler.jitter * 1e3:.1f}ms, max {jiggler.lateness_max * 1e3:.1f}ms)")
+        if supervisor is not None and supervisor.restarts:
+            result += f", restarted {supervisor.restarts} times"
+        return result
+    elif supervisor is not None and supervisor.pending:
+        result = (f"jigglypuff session {jiggler.session_id} failed ({supervisor.last_failure}), "
+                  f"restarting in {supervisor.next_restart_in:.1f}s")
+        return result
+    elif supervisor is not None and supervisor.gave_up:
+        result = (f"jigglypuff is sleeping (session {jiggler.session_id} failed {supervisor.failures} times "
+                  f"and was not restarted again: {supervisor.last_failure})")
         return result
     else:
-        result = f"jigglypuff is sleeping (process exited with code {jiggler_process.returncode})"
+        result = f"jigglypuff is sleeping (session {jiggler.session_id} ended after {jiggler.ticks} jiggles)"
         return result
 
 # New tools for rule compliance
 @mcp.tool()
-def enable_jiggling_before_tasks() -> str:
+async def enable_jiggling_before_tasks() -> str:
     """ALWAYS use jigglypuff MCP to enable jiggling before beginning tasks.
     
     This tool implements the rule: ALWAYS use jigglypuff MCP enable jiggling before beginning tasks.
     """
     logger.info("Enabling jiggling before tasks as per rules")
-    result = wake_up_jiggly()
+    result = await wake_up_jiggly()
     return result
 
 @mcp.tool()
-def disable_jiggling_after_tasks() -> str:
+async def disable_jiggling_after_tasks(owner: Optional[str] = None) -> str:
     """ALWAYS disable jiggling when task complete.
     
     This tool implements the rule: ALWAYS disable jiggling when task complete.
+    Only the caller's lease is released; jigglypuff keeps jiggling while
+    other agents still hold leases.
+    
+    Args:
+        owner: Id of the caller's lease, if it acquired one
     """
     logger.info("Disabling jiggling after tasks as per rules")
-    result = put_jiggly_to_sleep()
-    return result
+    if owner is not None:
+        return await release_jiggly_lease(owner)
+    return await _dispatch("finish_tasks", _finish_tasks)
 
-# Add prompts for user interaction
-@mcp.prompt()
-def jigglypuff_help() -> str:
-    """Get help and guidance for using jigglypuff effectively.
+
+def _finish_tasks() -> str:
+    with _control_lock:
+        holders = [lease.owner for lease in leases.active()]
+        if holders:
+            return f"jigglypuff keeps jiggling for {len(holders)} active leases ({', '.join(holders)})"
+        return _put_to_sleep()
+
+# Lease tools for agents sharing one jiggler
+def _clamp_ttl(ttl: int) -> int:
+    return max(5, min(3600, ttl))
+
+
+def _reconcile_leases() -> str:
+    """Start, retune or stop the jiggler to match the live leases and open schedule windows."""
+    global jiggler, lease_session, manual_settings
     
-    This prompt provides comprehensive guidance on how to use jigglypuff
-    for different scenarios and best practices.
+    with _control_lock:
+        active = leases.active()
+        windows = [] if schedule_suppressed else schedules.active()
+        # Like leases, windows merge to the shortest interval and largest offset
+        wanted = [(window.interval, window.offset) for window in windows]
+        merged = leases.effective()
+        if merged is not None:
+            wanted.append(merged)
+        manual = _active(jiggler) and jiggler.session_id != lease_session
+        if manual_settings is not None and not (manual and manual_settings[0] == jiggler.session_id):
+            manual_settings = None
+        
+        if not wanted:
+            if lease_session is not None and jiggler and jiggler.session_id == lease_session:
+                jiggler.stop(timeout=5)
+                logger.info(f"jigglypuff session {lease_session} put to sleep, no active leases or windows")
+                jiggler = None
+            lease_session = None
+            if manual_settings is not None:
+                _, interval, offset = manual_settings
+                manual_settings = None
+                jiggler.retune(interval, offset)
+                return (f"no active leases or open schedule windows, jigglypuff session {jiggler.session_id} "
+                        f"back to interval={jiggler.interval}s, offset={jiggler.offset}px")
+            return "no active leases or open schedule windows, jigglypuff is sleeping"
+        
+        if manual:
+            # The manually started session keeps getting at least what it asked for
+            if manual_settings is None:
+                manual_settings = (jiggler.session_id, jiggler.interval, jiggler.offset)
+            wanted.append(manual_settings[1:])
+        interval = min(interval for interval, _ in wanted)
+        offset = max(offset for _, offset in wanted)
+        if _active(jiggler):
+            jiggler.retune(interval, offset)
+        else:
+            jiggler = _new_engine(interval, offset)
+            jiggler.start()
+            lease_session = jiggler.session_id
+            logger.info(f"jigglypuff started jiggling in session {jiggler.session_id} for leases and schedules")
+        
+        result = (f"jigglypuff jiggling in session {jiggler.session_id}, "
+                  f"interval={jiggler.interval}s, offset={jiggler.offset}px ({len(active)} active leases")
+        if windows:
+            result += f", {len(windows)} open schedule windows"
+        return result + ")"
+
+@mcp.tool()
+async def acquire_jiggly_lease(owner: str, ttl: int = 300, interval: int = 30, offset: int = 1) -> str:
+    """Acquire a jiggle lease so jigglypuff keeps jiggling while any agent needs it.
+    
+    Several agents can hold leases at once; the jiggler runs until the last
+    lease is released or expires. Acquiring again replaces the owner's lease.
+    
+    Args:
+        owner: Unique id of the agent holding the lease
+        ttl: Seconds until the lease expires unless renewed (default: 300, min: 5, max: 3600)
+        interval: Requested time between jiggles in seconds (default: 30, min: 5, max: 300)
+        offset: Requested mouse movement offset in pixels (default: 1, min: 1, max: 10)
     """
-    return """# jigglypuff Usage Guide
+    return await _dispatch("acquire_lease", _acquire_lease, owner=owner, ttl=ttl,
+                           interval=interval, offset=offset)
 
-## What is jigglypuff?
-jigglypuff is an AI-controlled mouse activity manager that prevents screen savers and system sleep during AI processing tasks by making imperceptible cursor movements.
 
-## When to Use jigglypuff
-- **Before starting AI tasks**: Always enable jiggling before beginning long-running AI operations
-- **During code generation**: Keep your system awake while AI agents write code
-- **During file processing**: Prevent sleep during large file operations
-- **During API calls**: Maintain system activity during network operations
+def _acquire_lease(owner: str, ttl: int = 300, interval: int = 30, offset: int = 1) -> str:
+    ttl = _clamp_ttl(ttl)
+    interval = max(5, min(300, interval))
+    offset = max(1, min(10, offset))
+    
+    try:
+        leases.acquire(owner, ttl, interval, offset)
+        logger.info(f"Jiggle lease acquired by {owner} for {ttl}s")
+        return f"Lease for {owner} held for {ttl}s; " + _reconcile_leases()
+    except Exception as e:
+        logger.error(f"Failed to acquire jiggle lease for {owner}: {e}")
+        return OpFailure(f"Error acquiring jiggle lease: {e}")
 
-## Best Practices
-1. **Enable before tasks**: Use `enable_jiggling_before_tasks()` at the start of AI operations
-2. **Disable after completion**: Use `disable_jiggling_after_tasks()` when tasks finish
-3. **Check status**: Use `check_jiggly_status()` to verify current state
-4. **Custom settings**: Use `wake_up_jiggly(interval, offset)` for specific needs
+@mcp.tool()
+async def renew_jiggly_lease(owner: str, ttl: Optional[int] = None) -> str:
+    """Renew a jiggle lease before it expires.
+    
+    Args:
+        owner: Id the lease was acquired with
+        ttl: New time to live in seconds (default: keep the lease's current TTL)
+    """
+    return await _dispatch("renew_lease", _renew_lease, owner=owner, ttl=ttl)
 
-## Tool Overview
-- `wake_up_jiggly(interval, offset)`: Start jiggling with custom settings
-- `put_jiggly_to_sleep()`: Stop jiggling immediately
-- `check_jiggly_status()`: Check if jiggling is active
-- `enable_jiggling_before_tasks()`: Rule-compliant task start
-- `disable_jiggling_after_tasks()`: Rule-compliant task end
 
-## Configuration Tips
-- **Interval**: 30 seconds (default) works well for most tasks
-- **Offset**: 1 pixel (default) is imperceptible but effective
-- **Energy saving**: jigglypuff allows system sleep when not actively jiggling
+def _renew_lease(owner: str, ttl: Optional[int] = None) -> str:
+    lease = leases.renew(owner, _clamp_ttl(ttl) if ttl is not None else None)
+    if lease is None:
+        return OpFailure(f"No active lease for {owner}; acquire a new one")
+    return f"Lease for {owner} renewed for {lease.ttl:g}s; " + _reconcile_leases()
 
-Remember: jigglypuff is designed to work seamlessly with AI agents like Qoder and Claude Desktop!"""
+@mcp.tool()
+async def release_jiggly_lease(owner: str) -> str:
+    """Release a jiggle lease. jigglypuff goes to sleep once no leases remain.
+    
+    Args:
+        owner: Id the lease was acquired with
+    """
+    return await _dispatch("release_lease", _release_lease, owner=owner)
 
-@mcp.prompt()
-def jigglypuff_troubleshooting() -> str:
-    """Get troubleshooting help for common jigglypuff issues.
+
+def _release_lease(owner: str) -> str:
+    if not leases.release(owner):
+        return OpFailure(f"No active lease for {owner}; " + _reconcile_leases())
+    logger.info(f"Jiggle lease released by {owner}")
+    return f"Lease for {owner} released; " + _reconcile_leases()
+
+# Named targets (displays, VDI sessions), all driven by one scheduler thread
+targets = TargetScheduler(log=jiggle_log)
+
+@mcp.tool()
+async def add_jiggly_target(name: str, backend: Optional[str] = None, interval: int = 30, offset: int = 1,
+                            display: Optional[str] = None) -> str:
+    """Keep another named target awake, alongside the main session.
     
-    This prompt provides solutions for common problems users might encounter.
+    Every target has its own pointer backend, interval and offset; all of
+    them are jiggled from one scheduler. Adding a name that exists replaces it.
+    
+    Args:
+        name: Unique name of the target, e.g. a display or VDI session
+        backend: Pointer backend for this target (default: JIGGLYPUFF_BACKEND, then the best available)
+        interval: Time between jiggles in seconds (default: 30, min: 5, max: 300)
+        offset: Mouse movement offset in pixels (default: 1, min: 1, max: 10)
+        display: X display to inject into, e.g. ":1" for an Xvfb session (implies the xtest backend)
+    """
+    return await _dispatch("add_target", _add_target, name=name, backend=backend,
+                           interval=interval, offset=offset, display=display)
+
+
+def _add_target(name: str, backend: Optional[str] = None, interval: int = 30, offset: int = 1,
+                display: Optional[str] = None) -> str:
+    interval = max(5, min(300, interval))
+    offset = max(1, min(10, offset))
+    try:
+        if display:
+            pointer = get_backend(backend or "xtest", display=display)
+        else:
+            pointer = get_backend(backend)
+        target = targets.add(name, pointer, interval, offset)
+    except Exception as e:
+        logger.error(f"Failed to add jiggle target {name}: {e}")
+        return OpFailure(f"Error adding jiggle target {name}: {e}")
+    logger.info(f"Jiggle target {name} added ({target.backend.name} backend)")
+    return (f"Target {name} jiggling with the {target.backend.name} backend, interval={interval}s, "
+            f"offset={offset}px ({len(targets)} targets)")
+
+@mcp.tool()
+async def remove_jiggly_target(name: str) -> str:
+    """Stop jiggling a named target.
+    
+    Args:
+        name: Name the target was added with
     """
-    return """# jigglypuff Troubleshooting Guide
+    return await _dispatch("remove_target", _remove_target, name=name)
 
-## Common Issues and Solutions
 
-### "jigglypuff is already jiggling"
-- **Cause**: Another jiggling process is already running
-- **Solution**: Use `check_jiggly_status()` to verify, then `put_jiggly_to_sleep()` if needed
+def _remove_target(name: str) -> str:
+    if not targets.remove(name):
+        return OpFailure(f"No target {name}")
+    logger.info(f"Jiggle target {name} removed")
+    return f"Target {name} stopped ({len(targets)} targets)"
 
-### "Failed to wake up jigglypuff"
-- **Cause**: Missing dependencies or permissions
-- **Solutions**:
-  1. Ensure `cliclick` is installed: `brew install cliclick`
-  2. Check accessibility permissions in System Preferences
-  3. Verify the `jiggly_puff.sh` script exists and is executable
+# Time-window schedules
+@mcp.tool()
+async def add_jiggly_schedule(start: str, end: str, days: Optional[str] = None, interval: int = 30,
+                              offset: int = 1, name: Optional[str] = None,
+                              timezone: Optional[str] = None) -> str:
+    """Jiggle automatically during a time window, without starting or stopping by hand.
+    
+    Args:
+        start: "HH:MM" for a recurring window, or an ISO date-time for a one-off window
+        end: "HH:MM" (an end before the start runs past midnight) or an ISO date-time
+        days: Days a recurring window repeats on, e.g. "mon-fri", "sat,sun",
+            "weekdays" or "daily"; omit for a one-off window
+        interval: Time between jiggles in seconds (default: 30, min: 5, max: 300)
+        offset: Mouse movement offset in pixels (default: 1, min: 1, max: 10)
+        name: Optional label shown in the config resource
+        timezone: IANA zone such as "Europe/Berlin" (default: the system zone)
+    """
+    return await _dispatch("add_schedule", _add_schedule, start=start, end=end, days=days,
+                           interval=interval, offset=offset, name=name, timezone=timezone)
+
+
+def _add_schedule(start: str, end: str, days: Optional[str] = None, interval: int = 30, offset: int = 1,
+                  name: Optional[str] = None, timezone: Optional[str] = None) -> str:
+    from datetime import datetime
+    
+    def timestamp(text: str) -> float:
+        moment = datetime.fromisoformat(text)
+        if moment.tzinfo is None and zone is not None:
+            moment = moment.replace(tzinfo=zone)
+        return moment.timestamp()
+    
+    interval = max(5, min(300, interval))
+    offset = max(1, min(10, offset))
+    try:
+        zone = None
+        if timezone:
+            from zoneinfo import ZoneInfo
+            zone = ZoneInfo(timezone)
+        if days:
+            window = schedules.add_recurring(days, start, end, interval, offset, name, zone)
+        else:
+            window = schedules.add_once(timestamp(start), timestamp(end), interval, offset, name, zone)
+    except Exception as e:
+        logger.error(f"Failed to add jiggle schedule: {e}")
+        return OpFailure(f"Error adding jiggle schedule: {e}")
+    
+    now = time.time()
+    if window.active_at(now):
+        return f"Schedule {window.id} added ({window.describe()}), window is open now"
+    next_start = datetime.fromtimestamp(window.next_edge(now), zone).isoformat(timespec="minutes")
+    return f"Schedule {window.id} added ({window.describe()}), next start at {next_start}"
+
+@mcp.tool()
+async def remove_jiggly_schedule(schedule_id: int) -> str:
+    """Remove a time-window schedule.
+    
+    Args:
+        schedule_id: Id returned by add_jiggly_schedule
+    """
+    return await _dispatch("remove_schedule", _remove_schedule, schedule_id=schedule_id)
 
-### "jigglypuff is sleeping (process exited)"
-- **Cause**: The jiggling process stopped unexpectedly
-- **Solution**: Simply call `wake_up_jiggly()` to restart
 
+def _remove_schedule(schedule_id: int) -> str:
+    if not schedules.remove(schedule_id):
+        return OpFailure(f"No schedule {schedule_id}")
+    return f"Schedule {schedule_id} removed"
+
+# Batched operations, so an agent turn is one round trip instead of several
+def _retune(interval: Optional[int] = None, offset: Optional[int] = None) -> str:
+    global manual_settings
+    
+    with _control_lock:
+        if not _active(jiggler):
+            return OpFailure("jigglypuff is sleeping; start it before retuning")
+        if manual_settings is not None and manual_settings[0] == jiggler.session_id:
+            # Change what the session asked for; leases and windows still merge on top
+            _, saved_interval, saved_offset = manual_settings
+            interval = saved_interval if interval is None else max(5, min(300, int(interval)))
+            offset = saved_offset if offset is None else max(1, min(10, offset))
+            manual_settings = (jiggler.session_id, interval, offset)
+            _reconcile_leases()
+        else:
+            interval = jiggler.interval if interval is None else max(5, min(300, int(interval)))
+            offset = jiggler.offset if offset is None else max(1, min(10, offset))
+            jiggler.retune(interval, offset)
+        return f"jigglypuff session {jiggler.session_id} retuned to interval={jiggler.interval}s, offset={jiggler.offset}px"
+
+
+_OPS = {
+    "status": _status,
+    "start": _wake_up,
+    "retune": _retune,
+    "stop": _put_to_sleep,
+    "acquire_lease": _acquire_lease,
+    "renew_lease": _renew_lease,
+    "release_lease": _release_lease,
+    "add_schedule": _add_schedule,
+    "remove_schedule": _remove_schedule,
+    "add_target": _add_target,
+    "remove_target": _remove_target,
+}
 
-### High CPU usage
-- **Cause**: Very short interval settings
-- **Solution**: Use longer intervals (30+ seconds) for better efficiency
 
-## System Requirements
-- macOS 10.15+ (Catalina or later)
-- Homebrew package manager
-- Python 3.11+
-- cliclick CLI tool
-- Accessibility permissions for Terminal
+def _apply_ops(ops: List[Dict[str, Any]]) -> str:
+    """Run operations in order under the control lock; stop at the first failure."""
+    
+    results = []
+    with _control_lock:
+        for position, op in enumerate(ops):
+            args = dict(op) if isinstance(op, dict) else {}
+            name = args.pop("op", None)
+            if results and not results[-1]["ok"]:
+                results.append({"op": name, "ok": False, "error": "skipped after an earlier failure"})
+                continue
+            handler = _OPS.get(name)
+            if handler is None:
+                results.append({"op": name, "ok": False,
+                                "error": f"unknown op at position {position} (choose from {', '.join(_OPS)})"})
+                continue
+            try:
+                result = handler(**args)
+                if isinstance(result, OpFailure):
+                    results.append({"op": name, "ok": False, "error": str(result)})
+                else:
+                    results.append({"op": name, "ok": True, "result": result})
+            except Exception as e:
+                logger.error(f"jigglypuff op {name} failed: {e}")
+                results.append({"op": name, "ok": False, "error": str(e)})
+    return json.dumps(results, indent=2)
+
+@mcp.tool()
+async def apply_jiggly_ops(ops: List[Dict[str, Any]]) -> str:
+    """Run several jigglypuff operations in one call, in order and without interleaving.
+    
+    Each operation is an object with an "op" key and that operation's
+    parameters, e.g. [{"op": "status"}, {"op": "start", "interval": 60},
+    {"op": "status"}]. Ops: status, start (interval, offset, idle_timeout,
+    strategy), retune (interval, offset), stop, acquire_lease (owner, ttl,
+    interval, offset), renew_lease (owner, ttl), release_lease (owner),
+    add_schedule / remove_schedule and add_target / remove_target (the
+    parameters of the matching tools).
+    No other call runs in between; after a failed operation the rest are
+    skipped. Returns a JSON list with one {"op", "ok", "result"|"error"}
+    entry per operation.
+    
+    Args:
+        ops: Ordered list of operations to run
+    """
+    return await _dispatch("apply_ops", _apply_ops, ops=ops)
+
+# Rules from jigglypuff_rules.json, parsed on first use and reloaded when the file changes
+rulebook = RuleBook()
+
+@mcp.tool()
+async def post_jiggly_event(trigger: str) -> str:
+    """Post a trigger event and run the matching rules from jigglypuff_rules.json.
+    
+    Args:
+        trigger: Event type, e.g. "task_start" or "task_complete"
+    """
+    actions = await asyncio.to_thread(rulebook.actions_for, trigger)
+    if not actions:
+        if rulebook.last_error:
+            return f"No rules for {trigger} ({rulebook.last_error})"
+        return f"No rules for {trigger}"
+    
+    lines = []
+    for action in actions:
+        tool = _RULE_TOOLS.get(action.tool)
+        if tool is None:
+            lines.append(f"{action.rule}: unknown tool {action.tool}")
+            continue
+        try:
+            result = await tool(**action.parameters)
+        except Exception as e:
+            logger.error(f"Rule {action.rule} failed calling {action.tool}: {e}")
+            result = f"Error: {e}"
+        lines.append(f"{action.rule}: {action.tool} -> {result}")
+    logger.info(f"Ran {len(actions)} rule actions for {trigger}")
+    return "\n".join(lines)
 
-## Getting Help
-If issues persist, check the logs in your terminal or contact the maintainer."""
+# Tools rules may call; post_jiggly_event is left out so rules cannot recurse
+_RULE_TOOLS = {
+    tool.__name__: tool
+    for tool in (
+        wake_up_jiggly, put_jiggly_to_sleep, check_jiggly_status,
+        enable_jiggling_before_tasks, disable_jiggling_after_tasks,
+        acquire_jiggly_lease, renew_jiggly_lease, release_jiggly_lease,
+        add_jiggly_schedule, remove_jiggly_schedule, apply_jiggly_ops,
+        add_jiggly_target, remove_jiggly_target,
+    )
+}
+
+# Add prompts for user interaction
+@mcp.prompt()
+def jigglypuff_help() -> str:
+    """Get help and guidance for using jigglypuff effectively.
+    
+    This prompt provides comprehensive guidance on how to use jigglypuff
+    for different scenarios and best practices.
+    """
+    from jigglypuff.prompts import HELP
+    return HELP
+
+@mcp.prompt()
+def jigglypuff_troubleshooting() -> str:
+    """Get troubleshooting help for common jigglypuff issues.
+    
+    This prompt provides solutions for common problems users might encounter.
+    """
+    from jigglypuff.prompts import TROUBLESHOOTING
+    return TROUBLESHOOTING
 
 # Add resources for context data management
-@mcp.resource("jigglypuff-config")
-def get_jigglypuff_config() -> str:
+@mcp.resource("jigglypuff://config", name="jigglypuff-config")
+async def get_jigglypuff_config() -> str:
     """Get the current jigglypuff configuration and status.
     
     This resource provides access to the current configuration state
     and system information for jigglypuff.
     """
-    global jiggler_process
+    return await _dispatch("config", _cached_config)
+
+
+def _config() -> str:
+    global jiggler
     
     config = {
         "server_name": "jigglypuff",
         "version": "1.0.0",
         "status": "unknown",
-        "process_id": None,
+        "session_id": None,
         "default_interval": 30,
         "default_offset": 1,
         "max_interval": 300,
         "min_interval": 5,
         "max_offset": 10,
         "min_offset": 1,
-        "platform": "macOS",
-        "dependencies": ["cliclick", "bash", "osascript"]
+        "platform": sys.platform,
+        "log_file": jiggle_log.path,
+        "history_file": history.path,
+        "available_backends": available_backends(),
+        "state_version": snapshot.version,
+        "state_changed_at": snapshot.changed_at,
+        "last_change": snapshot.last_change
     }
     
-    if jiggler_process:
-        if jiggler_process.poll() is None:
+    if jiggler:
+        config["session_id"] = jiggler.session_id
+        config["backend"] = jiggler.backend.name
+        config["strategy"] = jiggler.strategy
+        if jiggler.inhibitor is not None:
+            config["inhibitor"] = {
+                "command": jiggler.inhibitor.command,
+                "pid": jiggler.inhibitor.pid,
+                "alive": jiggler.inhibitor.alive,
+                "exit_code": jiggler.inhibitor.returncode
+            }
+        config["ticks"] = jiggler.ticks
+        config["ticks_skipped"] = jiggler.skipped
+        config["skip_ratio"] = jiggler.skip_ratio
+        config["idle_source"] = jiggler.idle_source.name if jiggler.idle_source else None
+        config["timing"] = {
+            "lateness_last_ms": _ms(jiggler.lateness_last),
+            "lateness_mean_ms": _ms(jiggler.lateness_mean),
+            "lateness_max_ms": _ms(jiggler.lateness_max),
+            "jitter_ms": _ms(jiggler.jitter),
+            "missed_ticks": jiggler.missed_ticks
+        }
+        config["power"] = {
+            "profile": jiggler.power.to_dict(),
+            "suspend_detection": jiggler.suspend_detector.available,
+            "suspends": jiggler.suspend_detector.suspends,
+            "suspended_seconds": round(jiggler.suspend_detector.suspended_seconds, 1)
+        }
+        if jiggler.idle_timeout is not None:
+            config["deadline"] = {
+                "idle_timeout": jiggler.idle_timeout,
+                "planned_interval": jiggler.interval,
+                "slack_last": jiggler.deadline_slack_last,
+                "slack_min": jiggler.deadline_slack_min,
+                "misses": jiggler.deadline_misses
+            }
+        if jiggler.supervisor is not None:
+            config["supervisor"] = {
+                "state": jiggler.supervisor.state,
+                "restarts": jiggler.supervisor.restarts,
+                "failures": jiggler.supervisor.failures,
+                "last_failure": jiggler.supervisor.last_failure,
+                "last_failure_at": jiggler.supervisor.last_failure_at,
+                "next_restart_in": jiggler.supervisor.next_restart_in
+            }
+        if jiggler.running:
             config["status"] = "jiggling"
-            config["process_id"] = jiggler_process.pid
+        elif _active(jiggler):
+            config["status"] = "restarting"
         else:
             config["status"] = "stopped"
-            config["exit_code"] = jiggler_process.returncode
+        if jiggler.last_error:
+            config["last_error"] = jiggler.last_error
     else:
         config["status"] = "sleeping"
     
-    import json
+    config["event_loop"] = {
+        "worst_stall_ms": _ms(mcp.loop_lag.worst),
+        "last_lag_ms": _ms(mcp.loop_lag.last)
+    }
+    
+    config["targets"] = [target.to_dict() for target in targets.targets()]
+    
+    from datetime import datetime
+    
+    config["schedules"] = {
+        "windows": len(schedules.windows()),
+        "open": [window.id for window in schedules.active()],
+        "suppressed_until_next_edge": schedule_suppressed,
+        "clock_changes": schedules.clock_changes,
+        "upcoming": [
+            {
+                "at": datetime.fromtimestamp(edge).astimezone(window.tz).isoformat(timespec="seconds"),
+                "in_seconds": round(edge - time.time(), 1),
+                "schedule_id": window.id,
+                "name": window.name,
+                "transition": transition
+            }
+            for edge, window, transition in schedules.upcoming()
+        ]
+    }
+    
+    config["leases"] = [
+        {
+            "owner": lease.owner,
+            "interval": lease.interval,
+            "offset": lease.offset,
+            "expires_in": round(lease.remaining(leases.clock()), 1)
+        }
+        for lease in leases.active()
+    ]
+    
+    if control_server is not None:
+        config["daemon"] = {"socket": control_server.path, "pid": os.getpid()}
+    
     return json.dumps(config, indent=2)
 
-@mcp.resource("jigglypuff-rules")
-def get_jigglypuff_rules() -> str:
+@mcp.resource("jigglypuff://status", name="jigglypuff-status")
+async def get_jigglypuff_status() -> str:
+    """Get the current jigglypuff status line.
+    
+    Subscribe to this resource (or jigglypuff-config) to be notified of
+    every start, stop, crash or retune instead of polling.
+    """
+    return await _dispatch("status", _cached_status)
+
+# Status and config are rendered once per state change and served from cache
+snapshot = StatusSnapshot({"status": _status, "config": _config})
+
+STATUS_RESOURCES = ("jigglypuff://status", "jigglypuff://config")
+
+
+def _on_state_change(version: int, reason: str) -> None:
+    for uri in STATUS_RESOURCES:
+        mcp.notify_resource_updated(uri)
+
+
+snapshot.subscribe(_on_state_change)
+
+
+def _cached_status() -> str:
+    return snapshot.get("status")
+
+
+def _cached_config() -> str:
+    return snapshot.get("config")
+
+@mcp.resource("jigglypuff://rules", name="jigglypuff-rules")
+async def get_jigglypuff_rules() -> str:
     """Get the jigglypuff usage rules and best practices.
     
     This resource provides the official rules and guidelines
@@ -273,14 +1196,164 @@ def get_jigglypuff_rules() -> str:
         "compliance_tools": [
             "enable_jiggling_before_tasks()",
             "disable_jiggling_after_tasks()"
-        ]
+        ],
+        "event_tool": "post_jiggly_event(trigger)"
+    }
+    
+    # The executable rules, as currently loaded from the rules file; checking
+    # for (and parsing) an edited file is file I/O, so it runs off the loop
+    index = await asyncio.to_thread(rulebook.index)
+    rules["rules_file"] = rulebook.path
+    rules["rules_error"] = rulebook.last_error
+    rules["triggers"] = {
+        trigger: [{"rule": action.rule, "tool": action.tool, "parameters": action.parameters}
+                  for action in actions]
+        for trigger, actions in sorted(index.items())
     }
     
-    import json
     return json.dumps(rules, indent=2)
 
+@mcp.resource("jigglypuff://metrics", name="jigglypuff-metrics")
+async def get_jigglypuff_metrics() -> str:
+    """Get live jigglypuff metrics.
+    
+    Tick counters, backend call and tick drift histograms, helper process
+    restarts, tool call counts and latencies, and the current session uptime.
+    """
+    return await _dispatch("metrics", _metrics)
+
+
+def _metrics() -> str:
+    global jiggler
+    
+    metrics = REGISTRY.snapshot()
+    if jiggler and jiggler.running:
+        metrics["session"] = {
+            "session_id": jiggler.session_id,
+            "uptime_seconds": round(time.time() - jiggler.started_at, 3),
+            "ticks": jiggler.ticks,
+            "ticks_skipped": jiggler.skipped,
+            "errors": jiggler.errors
+        }
+    else:
+        metrics["session"] = None
+    
+    return json.dumps(metrics, indent=2)
+
 # Log the tools, prompts, and resources that were registered
-logger.info("Tools, prompts, and resources registered successfully")
+logger.info("Tools, prompts, and resources declared; they are built on first use")
+
+def _shutdown() -> None:
+    """Stop the jiggler when the server exits, so its stop line is logged.
+    
+    Child process groups are torn down afterwards by jigglypuff.children.
+    """
+    global jiggler
+    
+    leases.clear()
+    schedules.close()
+    targets.close()
+    if _active(jiggler):
+        jiggler.stop(timeout=1)
+        logger.info(f"jigglypuff session {jiggler.session_id} put to sleep on exit")
+    jiggler = None
+
+# Registered after jiggle_log.close, so it runs first
+atexit.register(_shutdown)
+
+def _cleanup_on_signal() -> None:
+    _shutdown()
+    jiggle_log.close()
+
+def _invalidating(op: str, handler):
+    def run(**args):
+        try:
+            return handler(**args)
+        finally:
+            snapshot.invalidate(op)
+    return run
+
+
+def _start_metrics_exporter():
+    """Start the Prometheus export of JIGGLYPUFF_METRICS_FILE / JIGGLYPUFF_METRICS_PORT, if set."""
+    exporter = exporter_from_env()
+    if exporter is not None:
+        exporter.start()
+        atexit.register(exporter.stop)
+    return exporter
+
+def _serve_daemon() -> None:
+    """Own the jiggler and serve it to front-ends over the control socket."""
+    global control_server
+    
+    handlers = {
+        "start": _wake_up,
+        "stop": _put_to_sleep,
+        "status": _cached_status,
+        "config": _cached_config,
+        "metrics": _metrics,
+        "events": _events,
+        "history": _history,
+        "acquire_lease": _acquire_lease,
+        "renew_lease": _renew_lease,
+        "release_lease": _release_lease,
+        "finish_tasks": _finish_tasks,
+        "apply_ops": _apply_ops,
+        "add_schedule": _add_schedule,
+        "remove_schedule": _remove_schedule,
+        "add_target": _add_target,
+        "remove_target": _remove_target,
+    }
+    # Reads, including the events long-poll, run beside the serialized changes
+    control_server = ControlServer({
+        op: handler if op in _READ_OPS else _invalidating(op, handler)
+        for op, handler in handlers.items()
+    }, concurrent=_READ_OPS)
+    control_server.bind()
+    
+    # The daemon owns the engine, so its metrics are the ones worth exporting
+    metrics_exporter = _start_metrics_exporter()
+    
+    def cleanup() -> None:
+        _cleanup_on_signal()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+        control_server.unlink()
+    
+    install_signal_handlers(cleanup)
+    atexit.register(control_server.unlink)
+    control_server.serve_forever()
+
+def main() -> None:
+    """Console entry point: serve jigglypuff over stdio, or run the shared daemon."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="jigglypuff MCP server")
+    parser.add_argument("--daemon", action="store_true",
+                        help="run the shared jiggler daemon on JIGGLYPUFF_SOCKET instead of stdio")
+    args = parser.parse_args()
+    
+    # No pointer backend is probed here: front-ends of a daemon never jiggle, and
+    # probing uinput would create and destroy a device. The first wake-up picks
+    # one and later wake-ups reuse the choice.
+    
+    if args.daemon:
+        _serve_daemon()
+        return
+    
+    # Optional Prometheus export; a daemon's front-ends leave it to the daemon they
+    # spawn, which inherits the settings and would otherwise find the port taken
+    metrics_exporter = None if daemon_mode else _start_metrics_exporter()
+    
+    def cleanup() -> None:
+        _cleanup_on_signal()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+    
+    # SIGTERM/SIGHUP stop the jiggler and tear down its children before exiting
+    install_signal_handlers(cleanup)
+    
+    mcp.run(transport='stdio')
 
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    main()
\ No newline at end of file
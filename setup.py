@@ -28,6 +28,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/trose/jigglypuff",
     packages=find_packages(),
+    py_modules=["mcp_server"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
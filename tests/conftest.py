@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures: keep every test's jiggle history out of the user's
+~/.local/state, including daemons and servers the tests spawn.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff.history import HistoryStore
+
+
+_session_dir = None
+
+
+def pytest_configure(config):
+    # Some test modules drive the server as soon as they are imported, before any fixture
+    global _session_dir
+    _session_dir = tempfile.mkdtemp(prefix="jigglypuff-tests-")
+    os.environ["JIGGLYPUFF_HISTORY"] = os.path.join(_session_dir, "history.bin")
+
+
+def pytest_unconfigure(config):
+    if _session_dir is not None:
+        shutil.rmtree(_session_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def private_history(tmp_path, monkeypatch):
+    """Point JIGGLYPUFF_HISTORY, and the server's store if loaded, at a temporary file."""
+    path = str(tmp_path / "history.bin")
+    monkeypatch.setenv("JIGGLYPUFF_HISTORY", path)
+    server = sys.modules.get("mcp_server")
+    if server is None:
+        # Imported during the test, the server reads the variable itself
+        yield path
+        return
+    store = HistoryStore(path)
+    monkeypatch.setattr(server, "history", store)
+    yield path
+    store.close()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for apply_jiggly_ops: several control operations in one call, in
+order, with one result per operation.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mcp_server
+
+
+def _apply(*ops):
+    return json.loads(asyncio.run(mcp_server.apply_jiggly_ops(list(ops))))
+
+
+def test_status_start_status_in_one_call():
+    """The usual three-call agent turn becomes one call with three results."""
+    try:
+        results = _apply({"op": "status"}, {"op": "start", "interval": 60, "offset": 2}, {"op": "status"})
+
+        assert [r["op"] for r in results] == ["status", "start", "status"]
+        assert all(r["ok"] for r in results)
+        assert "sleeping" in results[0]["result"]
+        assert "interval=60s, offset=2px" in results[1]["result"]
+        assert "is jiggling in session" in results[2]["result"]
+    finally:
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+
+
+def test_retune_and_lease_ops():
+    """Retune changes the running session; lease ops go through the lease manager."""
+    try:
+        results = _apply(
+            {"op": "start"},
+            {"op": "retune", "interval": 120},
+            {"op": "acquire_lease", "owner": "batch-agent", "ttl": 60, "interval": 45},
+            {"op": "release_lease", "owner": "batch-agent"},
+            {"op": "stop"},
+        )
+        assert all(r["ok"] for r in results), results
+        assert "interval=120s" in results[1]["result"]
+        assert "Lease for batch-agent held for 60s" in results[2]["result"]
+        assert "put to sleep successfully" in results[4]["result"]
+        assert mcp_server.jiggler is None
+    finally:
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+
+
+def test_failure_skips_the_remaining_ops():
+    """An unknown op or bad arguments fail that entry and skip the rest."""
+    results = _apply({"op": "status"}, {"op": "explode"}, {"op": "start"})
+    assert [r["ok"] for r in results] == [True, False, False]
+    assert "unknown op" in results[1]["error"]
+    assert "skipped" in results[2]["error"]
+    assert mcp_server.jiggler is None
+
+    results = _apply({"op": "stop", "force": True})
+    assert not results[0]["ok"] and "force" in results[0]["error"]
+
+
+def test_refused_ops_fail_whatever_their_wording():
+    """Retuning while asleep, or releasing an unknown lease or target, fails the batch."""
+    for op in ({"op": "retune", "interval": 60},
+               {"op": "release_lease", "owner": "nobody"},
+               {"op": "renew_lease", "owner": "nobody"},
+               {"op": "remove_target", "name": "nowhere"},
+               {"op": "remove_schedule", "schedule_id": 10**6}):
+        results = _apply(op, {"op": "start"})
+        assert [r["ok"] for r in results] == [False, False], op
+        assert not results[0]["error"].startswith("Error")
+    assert mcp_server.jiggler is None
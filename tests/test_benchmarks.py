@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for the benchmark suite, so it keeps working as the server changes.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.append(BENCHMARKS)
+import bench_history
+import bench_power
+import bench_targets
+import run_benchmarks
+
+
+def test_server_benchmark_reports_every_tool():
+    """Every tool and resource is measured over stdio JSON-RPC."""
+    results = run_benchmarks.bench_server(rounds=1, steady_seconds=1.0)
+
+    assert set(results["tools"]) == {
+        "wake_up_jiggly", "check_jiggly_status", "jigglypuff-config",
+        "jigglypuff-rules", "put_jiggly_to_sleep",
+    }
+    steady = results["steady_state"]
+    for key in ("cpu_s_per_hour", "wakeups_per_hour", "forks_per_hour", "rss_kb"):
+        assert steady[key] >= 0
+    assert steady["rss_kb"] > 0
+    # The recording backend starts no processes
+    assert steady["forks_per_hour"] == 0
+
+
+def test_forks_are_the_servers_own_children():
+    """Grandchildren count, processes elsewhere on the host do not."""
+    server = subprocess.Popen(["sh", "-c", "sleep 0.1; (sleep 0.3 & sleep 0.3; wait) & wait"])
+    unrelated = subprocess.Popen(["sleep", "0.3"])
+    time.sleep(0.05)
+    try:
+        assert run_benchmarks._count_children(server.pid, 0.3) == 3
+    finally:
+        server.wait()
+        unrelated.wait()
+
+
+def test_jitter_benchmark():
+    """Tick jitter is measured from the recording backend's timestamps."""
+    results = run_benchmarks.bench_jitter(ticks=5, interval=0.02)
+    assert results["ticks"] >= 5
+    assert results["max_abs_jitter_ms"] >= results["mean_abs_jitter_ms"] >= 0
+
+
+def test_compare_reports_relative_change():
+    """Numeric metrics present in both runs are compared."""
+    old = {"results": {"server": {"initialize_ms": 100.0, "tools": {"x": {"n": 5}}}}}
+    new = {"results": {"server": {"initialize_ms": 50.0, "tools": {"x": {"n": 5}}}}}
+    lines = run_benchmarks.compare(old, new)
+    assert "server.initialize_ms: 100.0 -> 50.0 (-50.0%)" in lines
+    assert "server.tools.x.n: 5 -> 5 (+0.0%)" in lines
+
+
+def test_targets_benchmark():
+    """CPU and wakeups per tick are reported for each target count."""
+    results = bench_targets.run(counts=(1, 20), duration=0.5, interval=0.1)
+    assert [r["targets"] for r in results["by_count"]] == [1, 20]
+    for row in results["by_count"]:
+        assert row["ticks"] >= row["targets"]
+        assert row["cpu_per_tick_us"] > 0
+
+
+def test_power_benchmark_reports_wakeups_saved():
+    """Aligned, slack-widened ticks of many sessions share modeled wakeups; thread wakeups are measured."""
+    assert bench_power.modeled_wakeups([0.0, 0.01, 0.5, 0.52], 0.05) == 2
+    results = bench_power.run(sessions=4, duration=1.0, interval=0.25, idle_duration=1.0)
+    assert results["low"]["modeled_cpu_wakeups"] < results["default"]["modeled_cpu_wakeups"]
+    assert results["modeled_wakeups_saved_per_hour"] > 0
+    if sys.platform.startswith("linux"):
+        # Measured: one sleep per tick and no more, with either profile
+        for profile in ("default", "low"):
+            assert results[profile]["ticks"] <= results[profile]["thread_wakeups"]
+            assert results[profile]["thread_wakeups_per_tick"] < 1.5
+        assert results["low"]["thread_wakeups_per_tick"] <= results["default"]["thread_wakeups_per_tick"] + 0.25
+        # Sessions waiting out a long interval do not wake at all
+        assert results["idle"]["thread_wakeups"] == {"default": 0, "low": 0}
+
+
+def test_history_benchmark():
+    """Short windows of a synthetic history are answered without reading the whole file."""
+    results = bench_history.run(days=3, queries=3)
+    assert results["records"] > 3 * 17000
+    assert results["windows"]["2h"]["records_scanned"] < 2000
+    assert results["full_range"]["gap_count"] == 3
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Leak tests: repeated start/stop cycles and server exit must not leave any
+descendant processes behind.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from jigglypuff.children import descendant_pids
+
+# Stand-ins that each leave a grandchild which ignores stdin EOF, so only a
+# process group kill cleans them up
+HELPER = f"sh -c 'sleep 600 & exec {sys.executable} -m jigglypuff.cliclick_helper --dry-run'"
+INHIBITOR = "sh -c 'sleep 600 & wait'"
+
+
+def _leftovers(baseline, pid=None, timeout=3.0):
+    """Descendants not in ``baseline``, after giving teardown ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        extra = set(descendant_pids(pid)) - set(baseline)
+        if not extra or time.monotonic() > deadline:
+            return extra
+        time.sleep(0.05)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+
+
+def test_start_stop_cycles_leave_no_descendants():
+    """Helper and inhibitor groups, grandchildren included, go away on every stop."""
+    import mcp_server
+
+    env = {
+        "JIGGLYPUFF_BACKEND": "cliclick",
+        "JIGGLYPUFF_CLICLICK_HELPER": HELPER,
+        "JIGGLYPUFF_INHIBITOR": INHIBITOR,
+    }
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    baseline = descendant_pids()
+    try:
+        for _ in range(5):
+            result = asyncio.run(mcp_server.wake_up_jiggly(strategy="hybrid"))
+            assert "started jiggling successfully" in result
+            deadline = time.monotonic() + 10
+            while mcp_server.jiggler.ticks < 1 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            # helper + its sleep, inhibitor + its sleep
+            assert len(set(descendant_pids()) - set(baseline)) >= 4
+            asyncio.run(mcp_server.put_jiggly_to_sleep())
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    assert _leftovers(baseline) == set()
+
+
+def test_server_exit_tears_down_children():
+    """SIGTERM to the server logs the stop line and kills every child group."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "jiggler.log")
+        env = dict(
+            os.environ,
+            JIGGLYPUFF_BACKEND="cliclick",
+            JIGGLYPUFF_CLICLICK_HELPER=HELPER,
+            JIGGLYPUFF_INHIBITOR=INHIBITOR,
+            JIGGLYPUFF_IDLE_SOURCE="none",
+            JIGGLYPUFF_LOG=log_path,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-c", "import mcp_server; mcp_server.main()"],
+            cwd=ROOT, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        try:
+            for message in (
+                {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+                    "protocolVersion": "2024-11-05", "capabilities": {},
+                    "clientInfo": {"name": "leak-test", "version": "1.0.0"}}},
+                {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {
+                    "name": "wake_up_jiggly", "arguments": {"strategy": "hybrid"}}},
+            ):
+                server.stdin.write(json.dumps(message) + "\n")
+                server.stdin.flush()
+                if "id" in message:
+                    server.stdout.readline()
+
+            deadline = time.monotonic() + 10
+            children = []
+            while len(children) < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+                children = descendant_pids(server.pid)
+            assert len(children) >= 4
+
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=10) == 128 + signal.SIGTERM
+        finally:
+            if server.poll() is None:
+                server.kill()
+                server.wait()
+
+        time.sleep(0.2)
+        assert [pid for pid in children if _pid_alive(pid)] == []
+        with open(log_path) as f:
+            lines = f.read().splitlines()
+        assert any(line.endswith(": Mouse jiggler stopped") for line in lines)
+        assert lines[-1].endswith(": Sleep inhibitor released")
@@ -5,6 +5,8 @@ This test suite follows the rule of never skipping tests and never using mock/fa
 All tests use real system interactions.
 """
 
+import asyncio
+import json
 import sys
 import os
 import time
@@ -13,42 +15,43 @@ import signal
 
 # Add parent directory to path to import mcp_server
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from mcp_server import wake_up_jiggly, put_jiggly_to_sleep, check_jiggly_status
+from mcp_server import wake_up_jiggly, put_jiggly_to_sleep, check_jiggly_status, jiggle_log
+from mcp_server import get_jiggly_events, events
 
 def test_wake_up_jiggly_with_various_parameters():
     """Test wake_up_jiggly with various parameters using real parameter values."""
     print("Testing wake_up_jiggly with various parameters...")
     
     # Test with default parameters
-    result = wake_up_jiggly()
+    result = asyncio.run(wake_up_jiggly())
     print(f"Default parameters result: {result}")
     assert "started jiggling successfully" in result
     assert "interval=30s" in result
     assert "offset=1px" in result
     
     # Check that it's actually running
-    status = check_jiggly_status()
+    status = asyncio.run(check_jiggly_status())
     print(f"Status after wake up: {status}")
-    assert "is jiggling with PID" in status
+    assert "is jiggling in session" in status
     
     # Put it to sleep before next test
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)  # Give it a moment to fully stop
     
     # Test with custom parameters
-    result = wake_up_jiggly(10, 2)
+    result = asyncio.run(wake_up_jiggly(10, 2))
     print(f"Custom parameters result: {result}")
     assert "started jiggling successfully" in result
     assert "interval=10s" in result
     assert "offset=2px" in result
     
     # Check that it's actually running
-    status = check_jiggly_status()
+    status = asyncio.run(check_jiggly_status())
     print(f"Status after custom wake up: {status}")
-    assert "is jiggling with PID" in status
+    assert "is jiggling in session" in status
     
     # Put it to sleep
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)  # Give it a moment to fully stop
 
 def test_mouse_movement_occurs():
@@ -56,36 +59,24 @@ def test_mouse_movement_occurs():
     print("Testing mouse movement timing...")
     
     # Start jigglypuff with a short interval
-    result = wake_up_jiggly(5, 1)  # 5 second interval
+    result = asyncio.run(wake_up_jiggly(5, 1))  # 5 second interval
     print(f"Wake up result: {result}")
     
-    # Record the initial log content
-    log_file = "/tmp/mouse_jiggler.log"
-    if os.path.exists(log_file):
-        with open(log_file, 'r') as f:
-            initial_content = f.read()
-    else:
-        initial_content = ""
+    # Remember where the event stream stood
+    cursor = json.loads(asyncio.run(get_jiggly_events(since_seq=events.last_seq)))["next_seq"]
     
     # Wait for at least one jiggle to occur
     time.sleep(7)  # Wait 7 seconds to ensure at least one jiggle
     
-    # Check the log file for evidence of jiggling
-    if os.path.exists(log_file):
-        with open(log_file, 'r') as f:
-            current_content = f.read()
-        
-        # Check if new content was added (indicating jiggling occurred)
-        new_content = current_content[len(initial_content):]
-        print(f"New log content: {new_content}")
-        assert "Mouse jiggled" in new_content, "Mouse jiggling was not detected in log"
-        print("✓ Mouse movement occurred as expected")
-    else:
-        print("✗ Log file not found")
-        assert False, "Log file was not created"
+    # Check the events after the cursor for evidence of jiggling
+    result = json.loads(asyncio.run(get_jiggly_events(since_seq=cursor, limit=1000)))
+    kinds = [event["kind"] for event in result["events"]]
+    print(f"New events: {kinds}")
+    assert "jiggled" in kinds, "Mouse jiggling was not detected in the event stream"
+    print("✓ Mouse movement occurred as expected")
     
     # Put jigglypuff to sleep
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
 
 def test_check_jiggly_status():
@@ -93,81 +84,75 @@ def test_check_jiggly_status():
     print("Testing check_jiggly_status...")
     
     # Should be sleeping initially
-    status = check_jiggly_status()
+    status = asyncio.run(check_jiggly_status())
     print(f"Initial status: {status}")
     assert "is sleeping" in status
     
     # Wake up jigglypuff
-    wake_up_jiggly(30, 1)
+    asyncio.run(wake_up_jiggly(30, 1))
     
     # Should be jiggling now
-    status = check_jiggly_status()
+    status = asyncio.run(check_jiggly_status())
     print(f"Status while jiggling: {status}")
-    assert "is jiggling with PID" in status
+    assert "is jiggling in session" in status
     
     # Put to sleep
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
     
     # Should be sleeping again
-    status = check_jiggly_status()
+    status = asyncio.run(check_jiggly_status())
     print(f"Status after sleep: {status}")
     assert "is sleeping" in status
 
 def test_put_jiggly_to_sleep_terminates_process():
-    """Test put_jiggly_to_sleep terminates the process with actual process termination."""
-    print("Testing put_jiggly_to_sleep terminates process...")
+    """Test put_jiggly_to_sleep stops the jiggle engine thread."""
+    print("Testing put_jiggly_to_sleep terminates the jiggle session...")
+    import mcp_server
     
     # Wake up jigglypuff
-    result = wake_up_jiggly(30, 1)
+    result = asyncio.run(wake_up_jiggly(30, 1))
     print(f"Wake up result: {result}")
     
-    # Extract PID from result
+    # Extract session from result
     import re
-    pid_match = re.search(r'PID (\d+)', result)
-    assert pid_match, "Could not extract PID from wake up result"
-    pid = int(pid_match.group(1))
+    session_match = re.search(r'session (\d+)', result)
+    assert session_match, "Could not extract session from wake up result"
+    session_id = int(session_match.group(1))
     
-    # Verify process is running
-    try:
-        os.kill(pid, 0)  # This doesn't actually kill the process, just checks if it exists
-        print(f"✓ Process {pid} is running")
-    except OSError:
-        assert False, f"Process {pid} is not running after wake up"
+    # Verify the engine thread is running
+    engine = mcp_server.jiggler
+    assert engine is not None and engine.session_id == session_id
+    assert engine.running, f"Session {session_id} is not running after wake up"
+    print(f"✓ Session {session_id} is running")
     
     # Put jigglypuff to sleep
-    result = put_jiggly_to_sleep()
+    result = asyncio.run(put_jiggly_to_sleep())
     print(f"Put to sleep result: {result}")
     # Accept either successful termination or force termination
     assert ("put to sleep successfully" in result or "force put to sleep" in result)
     
-    # Give it a moment to terminate
-    time.sleep(2)
-    
-    # Verify process is no longer running
-    try:
-        os.kill(pid, 0)  # This should fail now
-        assert False, f"Process {pid} is still running after put to sleep"
-    except OSError:
-        print(f"✓ Process {pid} was successfully terminated")
+    # Verify the engine thread is no longer running
+    assert not engine.running, f"Session {session_id} is still running after put to sleep"
+    print(f"✓ Session {session_id} was successfully terminated")
 
 def test_only_one_instance_can_run():
     """Verify only one instance can run at a time with real concurrent execution attempts."""
     print("Testing single instance enforcement...")
     
     # Wake up jigglypuff
-    result1 = wake_up_jiggly(30, 1)
+    result1 = asyncio.run(wake_up_jiggly(30, 1))
     print(f"First wake up result: {result1}")
     
     # Try to wake up again while already running
-    result2 = wake_up_jiggly(30, 1)
+    result2 = asyncio.run(wake_up_jiggly(30, 1))
     print(f"Second wake up result: {result2}")
     
     # Should indicate it's already running
     assert "already jiggling" in result2
     
     # Put to sleep
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
 
 def test_parameter_validation():
@@ -175,33 +160,33 @@ def test_parameter_validation():
     print("Testing parameter validation...")
     
     # Test interval clamping
-    result = wake_up_jiggly(1, 1)  # Below minimum
+    result = asyncio.run(wake_up_jiggly(1, 1))  # Below minimum
     print(f"Below minimum interval result: {result}")
     assert "interval=5s" in result  # Should be clamped to minimum
     
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
     
-    result = wake_up_jiggly(500, 1)  # Above maximum
+    result = asyncio.run(wake_up_jiggly(500, 1))  # Above maximum
     print(f"Above maximum interval result: {result}")
     assert "interval=300s" in result  # Should be clamped to maximum
     
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
     
     # Test offset clamping
-    result = wake_up_jiggly(30, 0)  # Below minimum
+    result = asyncio.run(wake_up_jiggly(30, 0))  # Below minimum
     print(f"Below minimum offset result: {result}")
     assert "offset=1px" in result  # Should be clamped to minimum
     
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
     
-    result = wake_up_jiggly(30, 15)  # Above maximum
+    result = asyncio.run(wake_up_jiggly(30, 15))  # Above maximum
     print(f"Above maximum offset result: {result}")
     assert "offset=10px" in result  # Should be clamped to maximum
     
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
 
 def test_ai_agent_workflow():
@@ -210,7 +195,7 @@ def test_ai_agent_workflow():
     
     # Simulate AI agent starting work
     print("AI agent: Starting processing task...")
-    result = wake_up_jiggly(10, 1)
+    result = asyncio.run(wake_up_jiggly(10, 1))
     print(f"Wake up result: {result}")
     assert "started jiggling successfully" in result
     
@@ -220,20 +205,20 @@ def test_ai_agent_workflow():
     
     # Simulate AI agent waiting for user input
     print("AI agent: Waiting for user input...")
-    result = put_jiggly_to_sleep()
+    result = asyncio.run(put_jiggly_to_sleep())
     print(f"Put to sleep result: {result}")
     # Accept either successful termination or force termination
     assert ("put to sleep successfully" in result or "force put to sleep" in result)
     
     # Simulate user responding
     print("AI agent: User responded, continuing work...")
-    result = wake_up_jiggly(10, 1)
+    result = asyncio.run(wake_up_jiggly(10, 1))
     print(f"Wake up result: {result}")
     assert "started jiggling successfully" in result
     
     # Simulate finishing work
     print("AI agent: Finishing task...")
-    result = put_jiggly_to_sleep()
+    result = asyncio.run(put_jiggly_to_sleep())
     print(f"Put to sleep result: {result}")
     # Accept either successful termination or force termination
     assert ("put to sleep successfully" in result or "force put to sleep" in result)
@@ -247,18 +232,18 @@ def test_screen_saver_prevention():
     # that the jiggler is running and performing movements
     
     # Wake up jigglypuff
-    result = wake_up_jiggly(5, 2)  # Short interval, larger movement
+    result = asyncio.run(wake_up_jiggly(5, 2))  # Short interval, larger movement
     print(f"Wake up result: {result}")
     
     # Check that it's running
-    status = check_jiggly_status()
+    status = asyncio.run(check_jiggly_status())
     print(f"Status: {status}")
-    assert "is jiggling with PID" in status
+    assert "is jiggling in session" in status
     
     # Wait and check log for evidence of movement
     time.sleep(7)  # Wait for at least one jiggle
     
-    log_file = "/tmp/mouse_jiggler.log"
+    log_file = jiggle_log.path
     if os.path.exists(log_file):
         with open(log_file, 'r') as f:
             content = f.read()
@@ -268,7 +253,7 @@ def test_screen_saver_prevention():
         assert False, "Log file not found"
     
     # Clean up
-    put_jiggly_to_sleep()
+    asyncio.run(put_jiggly_to_sleep())
     time.sleep(1)
 
 def run_all_tests():
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent cliclick co-process, using the dry-run helper as a
+stand-in for the real pointer on Linux.
+"""
+
+import os
+import signal
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import CliclickBackend
+from jigglypuff.coprocess import CoprocessError, PointerCoprocess
+
+STAND_IN_HELPER = [sys.executable, "-m", "jigglypuff.cliclick_helper", "--dry-run"]
+
+
+def test_one_helper_serves_every_tick():
+    """Many ticks are served by a single long-lived helper process."""
+    backend = CliclickBackend(helper=STAND_IN_HELPER, pause_ms=0)
+    try:
+        backend.jiggle(1)
+        pid = backend.coprocess.pid
+        for _ in range(50):
+            backend.jiggle(2)
+
+        assert backend.coprocess.pid == pid
+        assert backend.coprocess.spawns == 1
+        assert backend.coprocess.restarts == 0
+    finally:
+        backend.close()
+
+    assert not backend.coprocess.alive
+
+
+def test_helper_is_restarted_after_it_dies():
+    """A dead helper is replaced and the batch is retried."""
+    backend = CliclickBackend(helper=STAND_IN_HELPER, pause_ms=0)
+    try:
+        backend.jiggle(1)
+        old_pid = backend.coprocess.pid
+        os.kill(old_pid, signal.SIGKILL)
+
+        backend.jiggle(1)
+        assert backend.coprocess.alive
+        assert backend.coprocess.pid != old_pid
+        assert backend.coprocess.restarts == 1
+    finally:
+        backend.close()
+
+
+def test_helper_errors_are_raised():
+    """Commands the helper rejects surface as CoprocessError."""
+    coprocess = PointerCoprocess(STAND_IN_HELPER)
+    try:
+        assert coprocess.send(["m:+1,+0", "w:1", "m:-1,-0"]) == "ok"
+        try:
+            coprocess.send(["m:10,10"])
+            assert False, "Absolute moves should be rejected"
+        except CoprocessError as e:
+            assert "relative" in str(e)
+        # The helper keeps serving after an error
+        assert coprocess.send(["m:+1,+0"]) == "ok"
+        assert coprocess.restarts == 0
+    finally:
+        coprocess.close()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Shared daemon: the control socket protocol, and several front-ends driving
+one jiggler through a daemon spawned on first use.
+"""
+
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from jigglypuff.daemon import ControlServer, DaemonClient, DaemonError, connect_or_spawn
+
+
+def test_control_server_roundtrip():
+    """Requests reach their handler and errors come back as DaemonError."""
+    def boom():
+        raise ValueError("boom")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "control.sock")
+        server = ControlServer({"add": lambda a, b: a + b, "boom": boom}, path)
+        server.start()
+        client = DaemonClient(path)
+        try:
+            assert client.call("add", a=2, b=3) == 5
+            assert client.call("add", a="x", b="y") == "xy"
+            with pytest.raises(DaemonError, match="boom"):
+                client.call("boom")
+            with pytest.raises(DaemonError, match="unknown op"):
+                client.call("missing")
+            # A second server on the same path is refused while the first listens
+            with pytest.raises(DaemonError, match="already listening"):
+                ControlServer({}, path).bind()
+        finally:
+            client.close()
+            server.close()
+        assert not os.path.exists(path)
+
+
+def test_a_long_poll_does_not_block_other_ops():
+    """A long-poll holds no lock and no shared connection, so the same client's other calls go through."""
+    released = threading.Event()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "control.sock")
+        server = ControlServer({
+            "poll": lambda: released.wait(5),
+            "status": lambda: "idle",
+            "start": lambda: "started",
+        }, path, concurrent={"poll", "status"})
+        server.start()
+        client = DaemonClient(path)
+        polled = []
+        thread = threading.Thread(target=lambda: polled.append(client.call("poll")))
+        try:
+            thread.start()
+            time.sleep(0.1)
+            began = time.monotonic()
+            assert client.call("start") == "started"
+            assert client.call("status") == "idle"
+            assert time.monotonic() - began < 1 and not polled
+        finally:
+            released.set()
+            thread.join(5)
+            client.close()
+            server.close()
+        assert polled == [True]
+
+
+def test_client_reconnects_after_daemon_restart():
+    """A persistent connection broken by a restart is retried once."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "control.sock")
+        server = ControlServer({"ping": lambda: "pong"}, path)
+        server.start()
+        client = DaemonClient(path)
+        try:
+            assert client.call("ping") == "pong"
+            server.close()
+            server = ControlServer({"ping": lambda: "pong again"}, path)
+            server.start()
+            assert client.call("ping") == "pong again"
+        finally:
+            client.close()
+            server.close()
+
+
+def test_front_ends_share_one_daemon():
+    """Two front-ends spawn and reuse one daemon and see the same session; the daemon exports its metrics."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jigglypuff.sock")
+        metrics_file = os.path.join(tmp, "metrics.prom")
+        saved = {key: os.environ.get(key) for key in ("JIGGLYPUFF_BACKEND", "JIGGLYPUFF_IDLE_SOURCE", "JIGGLYPUFF_LOG",
+                                                      "JIGGLYPUFF_METRICS_FILE")}
+        os.environ.update(
+            JIGGLYPUFF_BACKEND="recording",
+            JIGGLYPUFF_IDLE_SOURCE="none",
+            JIGGLYPUFF_LOG=os.path.join(tmp, "jiggler.log"),
+            JIGGLYPUFF_METRICS_FILE=metrics_file,
+        )
+        command = [sys.executable, os.path.join(ROOT, "mcp_server.py"), "--daemon"]
+        first = second = None
+        try:
+            first = connect_or_spawn(command, path)
+            second = connect_or_spawn(command, path)
+            assert "started jiggling successfully" in first.call(
+                "start", interval=30, offset=1, idle_timeout=None, strategy="jiggle")
+            status = second.call("status")
+            assert "is jiggling in session" in status
+            assert "already jiggling" in second.call(
+                "start", interval=30, offset=1, idle_timeout=None, strategy="jiggle")
+            assert '"socket"' in first.call("config")
+            assert "put to sleep successfully" in second.call("stop")
+            assert "sleeping" in first.call("status")
+        finally:
+            pid = None
+            if first is not None:
+                import json
+                pid = json.loads(first.call("config"))["daemon"]["pid"]
+                first.close()
+            if second is not None:
+                second.close()
+            if pid is not None:
+                os.kill(pid, signal.SIGTERM)
+                deadline = time.monotonic() + 5
+                while os.path.exists(path) and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        assert not os.path.exists(path)
+        # Written once more when SIGTERM stopped the exporter
+        with open(metrics_file) as f:
+            exported = f.read()
+        assert any(line.startswith("jigglypuff_ticks_executed_total ") and float(line.split()[1]) >= 1
+                   for line in exported.splitlines())
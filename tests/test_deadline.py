@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for deadline-based "auto" interval planning.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.deadline import discover_idle_timeout, plan_interval, safety_margin
+from jigglypuff.idle import FileIdleSource
+
+
+def test_plan_lands_before_deadline():
+    """The planned interval leaves a safety margin before the deadline."""
+    assert safety_margin(300) == 30
+    assert plan_interval(300) == 270
+    assert plan_interval(60) == 54
+    assert plan_interval(5) == 4
+    assert plan_interval(1) == 1
+
+
+def test_x11_lookup_uses_the_cached_library_search(monkeypatch):
+    """Discovering the X11 screensaver timeout does not rerun find_library every time."""
+    from jigglypuff import deadline
+
+    lookups = []
+    monkeypatch.setenv("DISPLAY", ":99")
+    monkeypatch.setattr(deadline, "_find_library", lambda name: lookups.append(name))
+    assert deadline._x11_timeout() is None
+    assert lookups == ["X11"]
+
+
+def test_idle_timeout_override():
+    """JIGGLYPUFF_IDLE_TIMEOUT takes precedence over discovery."""
+    os.environ["JIGGLYPUFF_IDLE_TIMEOUT"] = "90"
+    try:
+        assert discover_idle_timeout() == (90.0, "env")
+    finally:
+        del os.environ["JIGGLYPUFF_IDLE_TIMEOUT"]
+
+    timeout, source = discover_idle_timeout()
+    assert timeout > 0 and source
+
+
+def test_user_input_replans_without_missing_the_deadline():
+    """Input pushes the next jiggle back; every jiggle lands before the deadline."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "idle")
+        with open(path, "w"):
+            pass
+
+        timeout = 2.0
+        planned = plan_interval(timeout)
+        backend = RecordingBackend()
+        engine = JiggleEngine(backend, planned, 1, idle_source=FileIdleSource(path),
+                              idle_threshold=planned, idle_timeout=timeout)
+        engine.start()
+
+        # The user keeps working for a while, touching the idle file
+        for _ in range(3):
+            time.sleep(0.5)
+            os.utime(path)
+        time.sleep(1.5)
+        engine.stop()
+
+        assert backend.jiggles == 1
+        assert engine.deadline_misses == 0
+        assert 0 < engine.deadline_slack_min <= timeout
+        # At most one re-plan per input, no periodic polling
+        assert engine.skipped <= 4
+
+
+def test_slack_without_idle_source():
+    """Without an idle source the previous jiggle counts as the last input."""
+    engine = JiggleEngine(RecordingBackend(), 0.2, 1, idle_timeout=0.5)
+    engine.start()
+    time.sleep(0.5)
+    engine.stop()
+
+    assert engine.ticks >= 2
+    assert engine.deadline_misses == 0
+    assert 0.2 < engine.deadline_slack_last < 0.31
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process jiggle engine and its pointer backends.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, JiggleLog, RecordingBackend, available_backends, get_backend
+
+
+def test_recording_backend_returns_pointer_home():
+    """A jiggle moves out by the offset and back to the starting point."""
+    backend = RecordingBackend()
+    backend.jiggle(3)
+
+    assert backend.jiggles == 1
+    assert (backend.x, backend.y) == (0, 0)
+    assert [(dx, dy) for _, dx, dy in backend.moves] == [(3, 0), (-3, 0)]
+
+
+def test_recording_backend_history_is_bounded():
+    """The move history never grows past its limit."""
+    backend = RecordingBackend(history=10)
+    for _ in range(100):
+        backend.jiggle(1)
+
+    assert backend.jiggles == 100
+    assert len(backend.moves) == 10
+
+
+def test_backend_selection():
+    """Recording is always available and unknown names are rejected."""
+    assert "recording" in available_backends()
+    assert get_backend("recording").name == "recording"
+
+    try:
+        get_backend("no-such-backend")
+        assert False, "Unknown backend should raise ValueError"
+    except ValueError as e:
+        assert "no-such-backend" in str(e)
+
+
+def test_engine_jiggles_on_start_and_every_interval():
+    """The engine jiggles immediately and then once per interval."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "jiggler.log")
+        backend = RecordingBackend()
+        engine = JiggleEngine(backend, interval=0.05, offset=2, log=JiggleLog(log_path))
+
+        engine.start()
+        time.sleep(0.3)
+        assert engine.running
+        assert engine.stop(timeout=1)
+
+        assert backend.jiggles >= 3
+        assert engine.ticks == backend.jiggles
+
+        with open(log_path) as f:
+            lines = f.read().splitlines()
+        assert "Mouse jiggler started with interval=0.05s, offset=2px" in lines[0]
+        assert "Mouse jiggled" in lines[1]
+        assert lines[-1].endswith(": Mouse jiggler stopped")
+
+
+def test_engine_survives_backend_errors():
+    """A failing backend is counted but does not kill the scheduler."""
+
+    class FlakyBackend(RecordingBackend):
+        def jiggle(self, offset):
+            raise OSError("pointer unavailable")
+
+    engine = JiggleEngine(FlakyBackend(), interval=0.02, offset=1)
+    engine.start()
+    time.sleep(0.1)
+    assert engine.running
+    engine.stop(timeout=1)
+
+    assert engine.ticks == 0
+    assert engine.errors >= 2
+    assert engine.last_error == "pointer unavailable"
+
+
+def test_engine_stops_promptly_with_long_interval():
+    """Stopping does not wait for the current interval to elapse."""
+    engine = JiggleEngine(RecordingBackend(), interval=300, offset=1)
+    engine.start()
+    time.sleep(0.05)
+
+    began = time.monotonic()
+    assert engine.stop(timeout=5)
+    assert time.monotonic() - began < 1.0
+
+
+def test_engine_schedule_does_not_drift_with_slow_backend():
+    """Ticks stay on the interval grid even when each jiggle takes a while."""
+    backend = RecordingBackend(history=64)
+    backend.jiggle_pause = 0.02
+    engine = JiggleEngine(backend, interval=0.05, offset=1)
+    engine.start()
+    time.sleep(0.52)
+    engine.stop(timeout=1)
+
+    starts = [t for t, dx, _ in backend.moves if dx > 0]
+    assert len(starts) >= 8
+    # The old loop slipped by the 20ms pause on every tick
+    drift = starts[-1] - starts[0] - 0.05 * (len(starts) - 1)
+    assert abs(drift) < 0.02
+    assert engine.jitter is not None
+    assert engine.lateness_max < 0.05
+
+
+def test_engine_skips_missed_ticks_instead_of_bunching():
+    """A tick that overruns several intervals is followed by one on the grid, not a burst."""
+
+    class StallingBackend(RecordingBackend):
+        def jiggle(self, offset):
+            super().jiggle(offset)
+            if self.jiggles == 2:
+                time.sleep(0.17)
+
+    backend = StallingBackend()
+    engine = JiggleEngine(backend, interval=0.05, offset=1)
+    engine.start()
+    time.sleep(0.4)
+    engine.stop(timeout=1)
+
+    assert engine.missed_ticks >= 3
+    starts = [t for t, dx, _ in backend.moves if dx > 0]
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert min(gaps[2:]) > 0.03
+    # Everything after the stall is still phase-aligned with the first tick
+    for start in starts[2:]:
+        phase = (start - starts[0]) % 0.05
+        assert min(phase, 0.05 - phase) < 0.015
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the jiggle event ring buffer and the get_jiggly_events cursor tool.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.events import EventRing
+from jigglypuff.metrics import MetricsRegistry
+
+
+def test_ring_is_bounded_and_read_by_cursor():
+    """Only the newest events are kept; readers see what came after their cursor."""
+    ring = EventRing(capacity=5, metrics=MetricsRegistry())
+    for i in range(12):
+        ring.append("jiggled", 1, tick=i)
+
+    events, missed = ring.since(0)
+    assert [event.seq for event in events] == [8, 9, 10, 11, 12]
+    assert missed == 7
+    assert events[0].to_dict()["tick"] == 7
+
+    events, missed = ring.since(10)
+    assert [event.seq for event in events] == [11, 12] and missed == 0
+    assert ring.since(12) == ([], 0)
+    assert [event.seq for event in ring.since(7, limit=2)[0]] == [8, 9]
+
+
+def test_waiting_for_the_next_event():
+    """Waiters wake on the next event, time out otherwise, and never wait on a stale cursor."""
+    ring = EventRing(metrics=MetricsRegistry())
+    assert not ring.wait(0, 0.05)
+    assert ring.wait(99, 5)
+
+    threading.Timer(0.05, ring.append, ("started",)).start()
+    began = time.monotonic()
+    assert ring.wait(0, 5)
+    assert time.monotonic() - began < 1
+
+    async def poll():
+        threading.Timer(0.05, ring.append, ("stopped",)).start()
+        woke = await ring.wait_async(1, 5)
+        timed_out = not await ring.wait_async(2, 0.05)
+        return woke, timed_out
+
+    assert asyncio.run(poll()) == (True, True)
+    assert not ring._waiters
+
+
+def test_engine_records_session_events():
+    """A session's start, jiggles and stop show up in order."""
+    ring = EventRing(metrics=MetricsRegistry())
+    engine = JiggleEngine(RecordingBackend(), interval=0.05, offset=2, events=ring,
+                          metrics=MetricsRegistry())
+    engine.start()
+    time.sleep(0.2)
+    engine.stop(timeout=1)
+
+    kinds = [event.kind for event in ring.since(0, limit=1000)[0]]
+    assert kinds[0] == "started" and kinds[-1] == "stopped"
+    assert kinds.count("jiggled") == engine.ticks >= 2
+    assert all(event.session_id == engine.session_id for event in ring.since(0)[0])
+
+
+def test_get_jiggly_events_long_polls():
+    """The tool returns only new events and waits for one when asked."""
+    import mcp_server
+
+    cursor = mcp_server.events.last_seq
+    nothing = json.loads(asyncio.run(mcp_server.get_jiggly_events(since_seq=cursor)))
+    assert nothing == {"events": [], "next_seq": cursor, "missed": 0}
+
+    os.environ["JIGGLYPUFF_BACKEND"] = "recording"
+    try:
+        def wake_soon():
+            time.sleep(0.1)
+            asyncio.run(mcp_server.wake_up_jiggly(interval=60))
+
+        threading.Thread(target=wake_soon).start()
+        began = time.monotonic()
+        result = json.loads(asyncio.run(mcp_server.get_jiggly_events(since_seq=cursor, wait_ms=5000)))
+        assert time.monotonic() - began < 4
+        assert result["events"][0]["kind"] == "started"
+        assert result["events"][0]["seq"] == cursor + 1
+    finally:
+        del os.environ["JIGGLYPUFF_BACKEND"]
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+
+    result = json.loads(asyncio.run(mcp_server.get_jiggly_events(since_seq=cursor, limit=1000)))
+    kinds = [event["kind"] for event in result["events"]]
+    assert kinds[0] == "started" and "jiggled" in kinds and kinds[-1] == "stopped"
+    assert result["next_seq"] == mcp_server.events.last_seq
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk jiggle history: record layout, indexed range queries,
+coverage and gap aggregates, and the query_jiggly_history tool.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff.events import Event, EventRing
+from jigglypuff.history import _KIND_CODES, MAGIC, RECORD, HistoryStore
+from jigglypuff.metrics import MetricsRegistry
+
+
+def _store(tmp_path, name="history.bin", stride=4):
+    return HistoryStore(str(tmp_path / name), stride=stride, metrics=MetricsRegistry())
+
+
+def test_range_queries_match_a_full_scan(tmp_path):
+    """Bisecting the sparse index and the records finds exactly the records in range."""
+    store = _store(tmp_path)
+    times = [1000.0 + i * 5 for i in range(203)]
+    for when in times:
+        store.append(when, _KIND_CODES["jiggled"], 5.0, 1)
+    assert len(store) == 203
+
+    for start, end in ((0, 10**6), (1000.0, 1005.0), (1002.5, 1500.0), (1020.0, 1020.5), (1700.0, 2200.0)):
+        report = store.query(start, end, now=10**6)
+        expected = sum(start <= when < end for when in times)
+        assert report["counts"].get("jiggled", 0) == expected
+        assert report["records_scanned"] <= expected + 1
+    store.close()
+
+
+def test_coverage_and_gaps(tmp_path):
+    """Ticks cover one interval, stops end coverage early, short lateness is not a gap."""
+    store = _store(tmp_path)
+    store.append(0.0, _KIND_CODES["started"], 10.0, 1)
+    for i in range(1, 6):
+        # Each tick is 0.2s late
+        store.append(i * 10.2, _KIND_CODES["jiggled"], 10.0, 1)
+    store.append(55.0, _KIND_CODES["stopped"], 10.0, 1)
+    store.append(100.0, _KIND_CODES["inhibited"], 0.0, 2, flags=1)
+    store.append(130.0, _KIND_CODES["released"], 0.0, 2)
+
+    report = store.query(0.0, 200.0, now=1000.0)
+    assert report["covered_seconds"] == pytest.approx(85.0)
+    assert [(gap["start"], gap["end"]) for gap in report["gaps"]] == [(55.0, 100.0), (130.0, 200.0)]
+    assert report["longest_gap_seconds"] == pytest.approx(70.0)
+    assert report["counts"] == {"started": 1, "jiggled": 5, "stopped": 1, "inhibited": 1, "released": 1}
+    assert report["sessions"] == 2
+
+    # A tick and a held inhibitor from before the range still cover its start
+    assert store.query(45.0, 50.0, now=1000.0)["covered_seconds"] == pytest.approx(5.0)
+    assert store.query(110.0, 120.0, now=1000.0)["covered_seconds"] == pytest.approx(10.0)
+    assert store.query(60.0, 70.0, now=1000.0)["gap_count"] == 1
+    # Nothing after now is counted
+    assert store.query(120.0, 2000.0, now=125.0)["seconds"] == pytest.approx(5.0)
+    with pytest.raises(ValueError):
+        store.query(10.0, 10.0)
+    store.close()
+
+
+def test_events_become_records(tmp_path):
+    """The session's interval and inhibitor state are carried into every record."""
+    store = _store(tmp_path)
+    ring = EventRing(metrics=MetricsRegistry())
+    ring.subscribe(store.record)
+    ring.append("started", 7, interval=30, offset=1, backend="recording")
+    ring.append("jiggled", 7, offset=1)
+    ring.append("inhibited", 7, strategy="hybrid")
+    ring.append("retuned", 7, interval=60, offset=1)
+    ring.append("stopped", 7, ticks=1)
+    store.record(Event(99, time.time(), "unknown-kind", 7))
+
+    store.flush()
+    with open(store.path, "rb") as f:
+        data = f.read()
+    assert data.startswith(MAGIC)
+    records = list(RECORD.iter_unpack(data[len(MAGIC):]))
+    assert [record[3] for record in records] == [_KIND_CODES[kind] for kind in
+                                                 ("started", "jiggled", "inhibited", "retuned", "stopped")]
+    assert [record[1] for record in records] == [30.0, 30.0, 30.0, 60.0, 60.0]
+    assert [record[4] for record in records] == [0, 0, 1, 1, 0]
+    assert all(record[2] == 7 and record[5] == os.getpid() & 0xFFFF for record in records)
+    store.close()
+
+
+def test_records_are_written_off_the_tick_thread(tmp_path, monkeypatch, caplog):
+    """record() only queues; the writer thread appends, and failures are logged once per interval."""
+    store = _store(tmp_path)
+    threads = []
+    append = store._append_locked
+    monkeypatch.setattr(store, "_append_locked",
+                        lambda records: threads.append(threading.current_thread().name) or append(records))
+    store.record(Event(1, 100.0, "started", 3, {"interval": 5}))
+    deadline = time.monotonic() + 5
+    while not threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threads == ["jigglypuff-history"]
+    store.record(Event(2, 105.0, "jiggled", 3, {}))
+    assert store.query(0.0, 200.0, now=200.0)["counts"] == {"started": 1, "jiggled": 1}
+
+    def fail(records):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_append_locked", fail)
+    with caplog.at_level("WARNING", logger="jigglypuff.history"):
+        for i in range(5):
+            store.record(Event(10 + i, 200.0 + i, "jiggled", 3, {}))
+            store.flush()
+    assert len([r for r in caplog.records if "disk full" in r.getMessage()]) == 1
+    store.close()
+
+
+def test_writers_are_followed_separately(tmp_path):
+    """Two servers both use session 1; one stopping or releasing does not end the other's coverage."""
+    store = _store(tmp_path)
+    store.append(0.0, _KIND_CODES["started"], 10.0, 1, writer=100)
+    store.append(1.0, _KIND_CODES["started"], 10.0, 1, writer=200)
+    store.append(5.0, _KIND_CODES["stopped"], 10.0, 1, writer=100)
+    for when in (11.0, 21.0):
+        store.append(when, _KIND_CODES["jiggled"], 10.0, 1, writer=200)
+    store.append(30.0, _KIND_CODES["inhibited"], 0.0, 1, flags=1, writer=100)
+    store.append(35.0, _KIND_CODES["released"], 0.0, 1, writer=200)
+    store.append(60.0, _KIND_CODES["released"], 0.0, 1, writer=100)
+
+    report = store.query(0.0, 80.0, now=1000.0)
+    assert report["sessions"] == 2
+    assert [(gap["start"], gap["end"]) for gap in report["gaps"]] == [(60.0, 80.0)]
+    # Stepping back from a later start passes the other writer's records
+    assert store.query(36.0, 40.0, now=1000.0)["covered_seconds"] == pytest.approx(4.0)
+    assert store.query(26.0, 34.0, now=1000.0)["covered_seconds"] == pytest.approx(8.0)
+    store.close()
+
+
+def test_shared_file_stays_sorted(tmp_path):
+    """Two writers share one file; times never go back and a torn record is dropped."""
+    first, second = _store(tmp_path), _store(tmp_path)
+    first.append(100.0, _KIND_CODES["jiggled"], 5.0, 1)
+    assert second.append(90.0, _KIND_CODES["jiggled"], 5.0, 2) == 100.0
+    with open(first.path, "ab") as f:
+        f.write(b"\0" * 7)
+    first.append(110.0, _KIND_CODES["jiggled"], 5.0, 1)
+
+    assert os.path.getsize(first.path) == len(MAGIC) + 3 * RECORD.size
+    assert second.query(0.0, 200.0, now=200.0)["counts"] == {"jiggled": 3}
+    first.close()
+    second.close()
+
+    with open(tmp_path / "other.bin", "wb") as f:
+        f.write(b"not a history file")
+    with pytest.raises(ValueError):
+        _store(tmp_path, "other.bin").append(1.0, 0)
+
+
+def test_query_jiggly_history_tool(tmp_path, monkeypatch):
+    """The tool reads ISO times and reports the session that just ran."""
+    import mcp_server
+
+    monkeypatch.setattr(mcp_server, "history", _store(tmp_path, stride=1024))
+    monkeypatch.setenv("JIGGLYPUFF_BACKEND", "recording")
+    began = time.time()
+    try:
+        asyncio.run(mcp_server.wake_up_jiggly(interval=60))
+        time.sleep(0.2)
+    finally:
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+
+    start = datetime.fromtimestamp(int(began) - 60, timezone.utc).isoformat()
+    report = json.loads(asyncio.run(mcp_server.query_jiggly_history(start, timezone="UTC")))
+    assert report["counts"]["started"] == 1 and report["counts"]["stopped"] == 1
+    assert 0 < report["covered_seconds"] < 60
+    assert report["start"] == report["gaps"][0]["start"] == start
+
+    assert asyncio.run(mcp_server.query_jiggly_history("yesterday")).startswith("Error querying jiggle history")
+    mcp_server.history.close()
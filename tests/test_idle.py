@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for idle-aware jiggling, using the file-based idle source as a
+stand-in for X11 and logind.
+"""
+
+import ctypes
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.idle import FileIdleSource, get_idle_source
+
+
+def _write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_file_idle_source_reads_seconds_or_mtime():
+    """A number is taken literally; an empty file reports time since it was touched."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "idle")
+        source = FileIdleSource(path)
+        assert source.idle_seconds() is None
+
+        _write(path, "42.5")
+        assert source.idle_seconds() == 42.5
+
+        _write(path, "")
+        os.utime(path, (time.time() - 10, time.time() - 10))
+        assert 9 <= source.idle_seconds() <= 11
+
+
+def test_idle_source_specs():
+    """Sources are selected by spec and unknown specs are rejected."""
+    assert get_idle_source("none") is None
+    assert get_idle_source("file:/tmp/idle").path == "/tmp/idle"
+    try:
+        get_idle_source("bogus")
+        assert False, "Unknown idle source should raise ValueError"
+    except ValueError:
+        pass
+
+
+def test_ticks_are_skipped_while_user_is_active():
+    """No movement is injected while the user keeps the machine busy."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "idle")
+        _write(path, "0")
+        backend = RecordingBackend()
+        engine = JiggleEngine(backend, interval=0.05, offset=1,
+                              idle_source=FileIdleSource(path), idle_threshold=0.6)
+        engine.start()
+        time.sleep(0.3)
+
+        assert backend.jiggles == 0
+        assert engine.skipped >= 1
+        assert engine.skip_ratio is None
+
+        # The user walks away: the next check jiggles
+        _write(path, "120")
+        time.sleep(0.2)
+        engine.stop()
+
+        assert backend.jiggles >= 1
+        assert engine.skip_ratio == engine.skipped / engine.ticks
+
+
+def test_skipped_tick_waits_until_threshold_is_near():
+    """After a skip the engine sleeps until idle time reaches the threshold."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "idle")
+        _write(path, "")
+        backend = RecordingBackend()
+        # Threshold of 1.5s with a 10s interval: one skip, then a jiggle ~1.5s later
+        engine = JiggleEngine(backend, interval=10, offset=1,
+                              idle_source=FileIdleSource(path), idle_threshold=1.5)
+        engine.start()
+        time.sleep(0.3)
+        assert (backend.jiggles, engine.skipped) == (0, 1)
+
+        # The jiggle is due 1.5s after the file was written; the next one not for 10s
+        time.sleep(1.7)
+        engine.stop()
+        assert (backend.jiggles, engine.skipped) == (1, 1)
+
+
+def _fake_sd_bus(properties, reads):
+    """Stands in for libsystemd: records property reads and answers from ``properties``."""
+    libc = ctypes.CDLL(None)
+    libc.strdup.restype = ctypes.c_void_p
+    libc.strdup.argtypes = [ctypes.c_char_p]
+
+    def sd_bus_open_system(bus):
+        bus._obj.value = 1
+        return 0
+
+    def sd_bus_path_encode(prefix, session, path):
+        # Labels starting with a digit are escaped, as sd-bus does
+        path._obj.value = libc.strdup(prefix + b"/_3" + session)
+        return 0
+
+    def sd_bus_get_property_trivial(bus, destination, path, interface, member, error, kind, value):
+        reads.append((path, interface, member, kind))
+        value._obj.value = properties[member.decode()]
+        return 0
+
+    def sd_bus_flush_close_unref(bus):
+        reads.append("closed")
+
+    # Plain functions, so the source can set argtypes and restype on them
+    return types.SimpleNamespace(
+        sd_bus_open_system=sd_bus_open_system,
+        sd_bus_path_encode=sd_bus_path_encode,
+        sd_bus_get_property_trivial=sd_bus_get_property_trivial,
+        sd_bus_error_free=lambda error: None,
+        sd_bus_flush_close_unref=sd_bus_flush_close_unref,
+    )
+
+
+def test_logind_source_reads_idle_hint_over_dbus(monkeypatch):
+    """Properties come from sd-bus, and an unset IdleHint means unknown, not active."""
+    from jigglypuff import idle
+
+    since = int(time.clock_gettime(time.CLOCK_MONOTONIC) * 1e6) - 90_000_000
+    properties, reads = {"IdleHint": 0, "IdleSinceHintMonotonic": since}, []
+    monkeypatch.setattr(idle, "_find_library", lambda name: "libsystemd.so.0")
+    monkeypatch.setattr(idle.ctypes.cdll, "LoadLibrary", lambda path: _fake_sd_bus(properties, reads))
+
+    source = idle.LogindIdleSource("3")
+    assert source._path == b"/org/freedesktop/login1/session/_33"
+    assert source.idle_seconds() is None
+    assert reads == [(b"/org/freedesktop/login1/session/_33", b"org.freedesktop.login1.Session",
+                           b"IdleHint", b"b")]
+
+    properties["IdleHint"] = 1
+    assert 89 <= source.idle_seconds() <= 91
+    assert reads[-1][2:] == (b"IdleSinceHintMonotonic", b"t")
+    source.close()
+    assert reads[-1] == "closed"
+
+
+def test_auto_does_not_pick_logind(monkeypatch):
+    """An unset IdleHint looks the same as an active user, so auto never falls back to logind."""
+    from jigglypuff import idle
+
+    monkeypatch.setattr(idle.X11IdleSource, "is_available", classmethod(lambda cls: False))
+    monkeypatch.setattr(idle.LogindIdleSource, "is_available", classmethod(lambda cls: True))
+    assert idle.get_idle_source("auto") is None
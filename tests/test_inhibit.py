@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the inhibit and hybrid wake strategies, using a stand-in
+inhibitor command instead of systemd-inhibit or caffeinate.
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.inhibit import Inhibitor
+
+# Like systemd-inhibit, the stand-in keeps a child process alive under it
+STAND_IN_INHIBITOR = ["sh", "-c", "sleep 600 & wait"]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+def _group_members(pgid):
+    members = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid and fields[0] != "Z":
+            members.append(int(entry))
+    return members
+
+
+def test_inhibit_strategy_injects_no_movement():
+    """The inhibit strategy holds the inhibitor and never touches the pointer."""
+    backend = RecordingBackend()
+    engine = JiggleEngine(backend, interval=0.05, offset=1, strategy="inhibit",
+                          inhibitor=Inhibitor(STAND_IN_INHIBITOR))
+    engine.start()
+    time.sleep(0.3)
+
+    assert engine.running
+    assert engine.inhibitor.alive
+    assert backend.jiggles == 0
+    assert len(backend.moves) == 0
+
+    pgid = engine.inhibitor.pid
+    assert len(_group_members(pgid)) == 2
+    assert engine.stop()
+    assert not engine.running
+    time.sleep(0.1)
+    assert _group_members(pgid) == []
+
+
+def test_hybrid_strategy_jiggles_rarely():
+    """Hybrid keeps the inhibitor and spaces jiggles out."""
+    backend = RecordingBackend()
+    engine = JiggleEngine(backend, interval=30, offset=1, strategy="hybrid",
+                          inhibitor=Inhibitor(STAND_IN_INHIBITOR))
+    assert engine.interval == 240
+
+    engine.start()
+    time.sleep(0.2)
+    assert engine.inhibitor.alive
+    assert backend.jiggles == 1
+    engine.stop()
+    assert not engine.inhibitor.alive
+
+
+def test_dead_inhibitor_ends_inhibit_session():
+    """If the inhibitor dies the session is reported as no longer running."""
+    engine = JiggleEngine(RecordingBackend(), strategy="inhibit",
+                          inhibitor=Inhibitor(STAND_IN_INHIBITOR))
+    engine.start()
+    os.killpg(engine.inhibitor.pid, signal.SIGKILL)
+    time.sleep(0.2)
+
+    assert not engine.running
+    assert engine.inhibitor.returncode == -signal.SIGKILL
+    engine.stop()
+
+
+def test_missing_inhibitor_is_an_error():
+    """Without any inhibitor command the session refuses to start."""
+    inhibitor = Inhibitor()
+    inhibitor.command = None
+    engine = JiggleEngine(RecordingBackend(), strategy="inhibit", inhibitor=inhibitor)
+    try:
+        engine.start()
+        assert False, "Starting without an inhibitor should fail"
+    except RuntimeError as e:
+        assert "JIGGLYPUFF_INHIBITOR" in str(e)
+
+
+def test_server_strategies_share_start_stop_status():
+    """The strategy is chosen on wake_up_jiggly; the other tools work unchanged."""
+    import mcp_server
+
+    os.environ["JIGGLYPUFF_INHIBITOR"] = "sleep 600"
+    try:
+        result = asyncio.run(mcp_server.wake_up_jiggly(strategy="inhibit"))
+        print(f"Wake up result: {result}")
+        assert "started jiggling successfully" in result
+        assert "inhibit strategy, inhibitor PID" in result
+        pid = mcp_server.jiggler.inhibitor.pid
+
+        assert "inhibit strategy" in asyncio.run(mcp_server.check_jiggly_status())
+        assert "put to sleep successfully" in asyncio.run(mcp_server.put_jiggly_to_sleep())
+        time.sleep(0.1)
+        assert not _pid_alive(pid)
+    finally:
+        del os.environ["JIGGLYPUFF_INHIBITOR"]
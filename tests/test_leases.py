@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for reference-counted jiggle leases.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff.leases import LeaseManager
+
+
+def test_effective_settings_merge_all_leases():
+    """The shortest interval and the largest offset win."""
+    manager = LeaseManager()
+    manager.acquire("agent-a", ttl=60, interval=30, offset=1)
+    manager.acquire("agent-b", ttl=60, interval=10, offset=1)
+    manager.acquire("agent-c", ttl=60, interval=60, offset=4)
+
+    assert manager.effective() == (10, 4)
+    manager.release("agent-b")
+    assert manager.effective() == (30, 4)
+    manager.clear()
+    assert manager.effective() is None
+
+
+def test_renew_extends_only_live_leases():
+    """Renewing moves the expiry forward; unknown owners get None."""
+    now = [100.0]
+    manager = LeaseManager(clock=lambda: now[0])
+    manager.acquire("agent-a", ttl=10, interval=30, offset=1)
+
+    now[0] = 108.0
+    lease = manager.renew("agent-a")
+    assert lease.expires_at == 118.0
+
+    lease = manager.renew("agent-a", ttl=30)
+    assert lease.expires_at == 138.0
+    assert manager.renew("agent-b") is None
+    manager.clear()
+
+
+def test_expired_leases_are_reaped_automatically():
+    """The expiry timer removes stale leases and reports their owners."""
+    expired = []
+    manager = LeaseManager(on_expire=expired.extend)
+    manager.acquire("short", ttl=0.1, interval=30, offset=1)
+    manager.acquire("long", ttl=60, interval=30, offset=1)
+
+    time.sleep(0.4)
+    assert expired == ["short"]
+    assert [lease.owner for lease in manager.active()] == ["long"]
+    manager.clear()
+
+
+def test_server_keeps_one_jiggler_while_any_lease_is_live():
+    """Overlapping agents share one session until the last lease is released."""
+    import mcp_server
+
+    result = asyncio.run(mcp_server.acquire_jiggly_lease("agent-a", ttl=60, interval=30, offset=1))
+    print(f"Acquire A: {result}")
+    session_id = mcp_server.jiggler.session_id
+
+    result = asyncio.run(mcp_server.acquire_jiggly_lease("agent-b", ttl=60, interval=10, offset=2))
+    print(f"Acquire B: {result}")
+    assert "interval=10s, offset=2px (2 active leases)" in result
+    assert mcp_server.jiggler.session_id == session_id
+
+    result = asyncio.run(mcp_server.release_jiggly_lease("agent-b"))
+    print(f"Release B: {result}")
+    assert "interval=30s, offset=1px (1 active leases)" in result
+    assert mcp_server.jiggler.running
+    assert mcp_server.jiggler.session_id == session_id
+
+    result = asyncio.run(mcp_server.renew_jiggly_lease("agent-a"))
+    assert "renewed for 60s" in result
+
+    result = asyncio.run(mcp_server.release_jiggly_lease("agent-a"))
+    print(f"Release A: {result}")
+    assert "no active leases" in result
+    assert "is sleeping" in asyncio.run(mcp_server.check_jiggly_status())
+
+
+def test_finishing_a_task_keeps_other_agents_leases():
+    """disable_jiggling_after_tasks releases only the caller's lease."""
+    import mcp_server
+
+    os.environ["JIGGLYPUFF_BACKEND"] = "recording"
+    try:
+        asyncio.run(mcp_server.acquire_jiggly_lease("agent-a", ttl=60))
+        asyncio.run(mcp_server.acquire_jiggly_lease("agent-b", ttl=60))
+
+        result = asyncio.run(mcp_server.disable_jiggling_after_tasks("agent-a"))
+        assert "(1 active leases)" in result
+        result = asyncio.run(mcp_server.disable_jiggling_after_tasks())
+        assert "keeps jiggling for 1 active leases (agent-b)" in result
+        result = asyncio.run(mcp_server.post_jiggly_event("task_complete"))
+        assert [lease.owner for lease in mcp_server.leases.active()] == ["agent-b"]
+        assert mcp_server.jiggler.running
+
+        asyncio.run(mcp_server.release_jiggly_lease("agent-b"))
+        assert "is sleeping" in asyncio.run(mcp_server.check_jiggly_status())
+    finally:
+        del os.environ["JIGGLYPUFF_BACKEND"]
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+
+
+def test_manual_session_gets_its_settings_back():
+    """A manual session retuned for a lease returns to its own interval afterwards."""
+    import mcp_server
+
+    os.environ["JIGGLYPUFF_BACKEND"] = "recording"
+    try:
+        asyncio.run(mcp_server.wake_up_jiggly(interval=120, offset=1))
+        session_id = mcp_server.jiggler.session_id
+
+        asyncio.run(mcp_server.acquire_jiggly_lease("agent-a", ttl=60, interval=10, offset=3))
+        assert (mcp_server.jiggler.interval, mcp_server.jiggler.offset) == (10, 3)
+        # A lease asking for less than the session keeps the session's settings
+        asyncio.run(mcp_server.acquire_jiggly_lease("agent-a", ttl=60, interval=300, offset=1))
+        assert (mcp_server.jiggler.interval, mcp_server.jiggler.offset) == (120, 1)
+
+        result = asyncio.run(mcp_server.release_jiggly_lease("agent-a"))
+        assert "back to interval=120s, offset=1px" in result
+        assert mcp_server.jiggler.session_id == session_id and mcp_server.jiggler.running
+        assert mcp_server.manual_settings is None
+    finally:
+        del os.environ["JIGGLYPUFF_BACKEND"]
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the buffered, rotating jiggler log.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleLog
+from jigglypuff import logsink
+from jigglypuff.logsink import default_log_path
+
+# `date` output as written by jiggly_puff.sh, e.g. "Sat Oct 18 09:05:01 UTC 2026"
+DATE_LINE = re.compile(r"^\w{3} \w{3} [ \d]\d \d\d:\d\d:\d\d \S+ \d{4}: Mouse jiggled$")
+
+
+def test_lines_keep_the_script_format():
+    """Lines look exactly like the ones the bash loop appended."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = JiggleLog(os.path.join(tmp, "jiggler.log"))
+        log.write("Mouse jiggled")
+        log.close()
+
+        with open(log.path) as f:
+            assert DATE_LINE.match(f.read().rstrip("\n"))
+
+
+def test_writes_are_buffered_until_interval():
+    """Nothing reaches the disk until the flush interval elapses."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = JiggleLog(os.path.join(tmp, "jiggler.log"), flush_interval=0.2)
+        log.write("Mouse jiggled")
+        log.write("Mouse jiggled")
+        assert not os.path.exists(log.path)
+
+        time.sleep(0.5)
+        with open(log.path) as f:
+            assert f.read().count("Mouse jiggled") == 2
+        log.close()
+
+
+def test_writes_flush_by_size():
+    """A full buffer is written without waiting for the timer."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = JiggleLog(os.path.join(tmp, "jiggler.log"), flush_bytes=100, flush_interval=60)
+        for _ in range(3):
+            log.write("Mouse jiggled")
+
+        with open(log.path) as f:
+            assert f.read().count("Mouse jiggled") == 3
+        log.close()
+
+
+def test_rotation_respects_retention_cap():
+    """Rotated copies never exceed the configured number of backups."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jiggler.log")
+        log = JiggleLog(path, flush_bytes=1, max_bytes=200, backups=2)
+        for _ in range(100):
+            log.write("Mouse jiggled")
+        log.close()
+
+        assert sorted(os.listdir(tmp)) == ["jiggler.log", "jiggler.log.1", "jiggler.log.2"]
+        for name in os.listdir(tmp):
+            assert os.path.getsize(os.path.join(tmp, name)) <= 200
+
+
+def test_default_path_is_per_instance():
+    """Each server process gets its own log file unless overridden."""
+    os.environ.pop("JIGGLYPUFF_LOG", None)
+    assert str(os.getpid()) in os.path.basename(default_log_path())
+
+    os.environ["JIGGLYPUFF_LOG"] = "/tmp/custom_jiggler.log"
+    try:
+        assert default_log_path() == "/tmp/custom_jiggler.log"
+    finally:
+        del os.environ["JIGGLYPUFF_LOG"]
+
+
+def test_one_writer_thread_flushes_every_window():
+    """Timed flushes reuse the log's writer thread instead of starting one per window."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = JiggleLog(os.path.join(tmp, "jiggler.log"), flush_interval=0.05)
+        writers = set()
+        for _ in range(3):
+            log.write("Mouse jiggled")
+            writers.add(log._writer)
+            time.sleep(0.2)
+        assert len(writers) == 1
+        with open(log.path) as f:
+            assert f.read().count("Mouse jiggled") == 3
+        writer = log._writer
+        log.close()
+        writer.join(1)
+        assert not writer.is_alive()
+
+
+def test_instance_logs_are_kept_and_capped(monkeypatch):
+    """Logs survive close; only the newest logs of exited instances are kept."""
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.setattr(tempfile, "tempdir", tmp)
+        monkeypatch.delenv("JIGGLYPUFF_LOG", raising=False)
+        # pid_max is below 2**22 on Linux, so these instances are gone
+        exited = []
+        for age, pid in enumerate(range(2**22 + 1, 2**22 + 4)):
+            path = os.path.join(tmp, f"mouse_jiggler.{pid}.log")
+            for name in (path, path + ".1"):
+                open(name, "w").close()
+                os.utime(name, (time.time() - 100 * (age + 1),) * 2)
+            exited.append(os.path.basename(path))
+        monkeypatch.setattr(logsink, "KEEP_INSTANCE_LOGS", 2)
+
+        log = JiggleLog(flush_bytes=1)
+        assert log.per_instance
+        log.write("Mouse jiggled")
+        log.close()
+        assert sorted(os.listdir(tmp)) == sorted(
+            [os.path.basename(log.path)] + [name + suffix for name in exited[:2] for suffix in ("", ".1")])
+        with open(log.path) as f:
+            assert DATE_LINE.match(f.read().rstrip("\n"))
+
+
+def test_sizes_count_encoded_bytes():
+    """Rotation sees the bytes on disk, not the characters of the lines."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jiggler.log")
+        log = JiggleLog(path, flush_bytes=1, max_bytes=300, backups=1)
+        for _ in range(10):
+            log.write("Mäuschen gerüttelt ✓")
+        log.close()
+        assert log._size == os.path.getsize(path)
+        assert all(os.path.getsize(os.path.join(tmp, name)) <= 300 for name in os.listdir(tmp))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the event loop lag monitor and non-blocking control tools.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff.looplag import LoopLagMonitor
+from jigglypuff.metrics import MetricsRegistry
+
+
+def test_monitor_reports_worst_stall():
+    """A handler that blocks the loop shows up as the worst lag."""
+
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, metrics=MetricsRegistry())
+        async with monitor.track():
+            await asyncio.sleep(0.05)
+            time.sleep(0.2)  # a blocking handler
+            await asyncio.sleep(0.05)
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.samples >= 3
+    assert 0.15 < monitor.worst < 0.5
+
+
+def test_monitor_sleeps_while_idle():
+    """No timer runs between requests; a stall inside the last request still counts."""
+
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, metrics=MetricsRegistry())
+        async with monitor.track():
+            assert monitor.running
+            async with monitor.track():
+                await asyncio.sleep(0.03)
+            assert monitor.running
+        assert not monitor.running
+        samples = monitor.samples
+        await asyncio.sleep(0.1)
+        idle_samples = monitor.samples - samples
+
+        async with monitor.track():
+            time.sleep(0.2)  # blocks until the request ends, before the timer can run
+        return monitor, idle_samples
+
+    monitor, idle_samples = asyncio.run(scenario())
+    assert idle_samples == 0
+    assert 0.15 < monitor.worst < 0.5
+    assert not monitor.running
+
+
+def test_slow_stop_does_not_block_the_loop():
+    """Stopping an inhibitor that ignores SIGTERM takes a second, off the loop."""
+    import mcp_server
+
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, metrics=MetricsRegistry())
+        async with monitor.track():
+            result = await mcp_server.wake_up_jiggly(strategy="inhibit")
+            await asyncio.sleep(0.1)
+            began = time.monotonic()
+            stopped = await mcp_server.put_jiggly_to_sleep()
+            elapsed = time.monotonic() - began
+        return result, stopped, elapsed, monitor
+
+    os.environ["JIGGLYPUFF_INHIBITOR"] = "sh -c 'trap \"\" TERM; sleep 600'"
+    try:
+        result, stopped, elapsed, monitor = asyncio.run(scenario())
+    finally:
+        del os.environ["JIGGLYPUFF_INHIBITOR"]
+
+    assert "started jiggling successfully" in result
+    assert "put to sleep successfully" in stopped
+    assert elapsed >= 0.9  # the inhibitor had to be killed
+    assert monitor.worst < 0.2
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics registry, the engine's instruments and the exporter.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.metrics import Histogram, MetricsRegistry, PrometheusExporter
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    """Quantiles report the upper bound of the bucket they fall in."""
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    for value in [0.0005] * 90 + [0.05] * 9 + [1.0]:
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.95) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_engine_records_ticks_latency_and_session():
+    """A session fills the tick counters, latency/drift histograms and session length."""
+    registry = MetricsRegistry()
+    engine = JiggleEngine(RecordingBackend(), 0.05, 1, metrics=registry)
+    engine.start()
+    time.sleep(0.3)
+    engine.stop()
+
+    snapshot = registry.snapshot()
+    assert snapshot["ticks_executed_total"] == engine.ticks >= 3
+    assert snapshot["ticks_scheduled_total"] >= snapshot["ticks_executed_total"]
+    assert snapshot["ticks_skipped_total"] == 0
+    assert snapshot["backend_call_seconds"]["recording"]["count"] == engine.ticks
+    assert snapshot["tick_drift_seconds"]["count"] >= engine.ticks - 1
+    assert snapshot["session_seconds"]["count"] == 1
+    json.dumps(snapshot)
+
+
+def test_prometheus_text_format():
+    """Counters, labelled histograms and gauges render as exposition text."""
+    registry = MetricsRegistry()
+    registry.counter("tool_calls_total", "MCP tool calls", tool="wake_up_jiggly").inc(2)
+    registry.histogram("tool_call_seconds", buckets=(0.1, 1.0), tool="wake_up_jiggly").observe(0.05)
+    registry.gauge("session_uptime_seconds", lambda: 12.5)
+    registry.gauge("absent", lambda: None)
+
+    text = registry.prometheus()
+    assert "# HELP jigglypuff_tool_calls_total MCP tool calls" in text
+    assert 'jigglypuff_tool_calls_total{tool="wake_up_jiggly"} 2' in text
+    assert 'jigglypuff_tool_call_seconds_bucket{tool="wake_up_jiggly",le="0.1"} 1' in text
+    assert 'jigglypuff_tool_call_seconds_bucket{tool="wake_up_jiggly",le="+Inf"} 1' in text
+    assert "jigglypuff_session_uptime_seconds 12.5" in text
+    assert "absent" not in text
+
+
+def test_exporter_file_and_port():
+    """The exporter writes a file and serves the same text on localhost."""
+    registry = MetricsRegistry()
+    registry.counter("ticks_executed_total").inc(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jigglypuff.prom")
+        exporter = PrometheusExporter(registry, path=path, port=0, interval=0.05)
+        exporter.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics", timeout=5) as response:
+                assert "jigglypuff_ticks_executed_total 7" in response.read().decode()
+        finally:
+            exporter.stop()
+        with open(path) as f:
+            assert "jigglypuff_ticks_executed_total 7" in f.read()
+
+
+def test_metrics_resource_counts_tool_calls():
+    """Tool calls through the MCP server show up in the jigglypuff-metrics resource."""
+    import mcp_server
+
+    async def scenario():
+        await mcp_server.mcp.call_tool("check_jiggly_status", {})
+        await mcp_server.mcp.call_tool("check_jiggly_status", {})
+        contents = await mcp_server.mcp.read_resource("jigglypuff://metrics")
+        return json.loads(list(contents)[0].content)
+
+    metrics = asyncio.run(scenario())
+    assert metrics["tool_calls_total"]["check_jiggly_status"] >= 2
+    assert metrics["tool_call_seconds"]["check_jiggly_status"]["p99"] is not None
+    assert metrics["session"] is None
+    # Resource metrics are labelled by the registered name, not the URI the client sent
+    reads = mcp_server.REGISTRY.snapshot()["resource_reads_total"]
+    assert reads["jigglypuff-metrics"] >= 1
+    assert not any("://" in name for name in reads)
+
+
+def test_instruments_are_safe_to_share_between_threads():
+    """Increments and observations from many threads are never lost."""
+    registry = MetricsRegistry()
+    counter = registry.counter("shared_total")
+    histogram = registry.histogram("shared_seconds")
+
+    def work():
+        for _ in range(20000):
+            counter.inc()
+            histogram.observe(0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value == 160000
+    assert histogram.count == sum(histogram.counts) == 160000
+
+
+def test_prometheus_histograms_are_consistent_while_observed():
+    """Buckets, +Inf and count of one histogram come from the same moment."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("busy_seconds")
+    done = threading.Event()
+
+    def work():
+        while not done.is_set():
+            histogram.observe(0.001)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    try:
+        for _ in range(200):
+            lines = dict(line.rsplit(" ", 1) for line in registry.prometheus().splitlines()
+                         if line.startswith("jigglypuff_busy_seconds"))
+            assert lines['jigglypuff_busy_seconds_bucket{le="+Inf"}'] == lines["jigglypuff_busy_seconds_count"]
+            assert lines['jigglypuff_busy_seconds_bucket{le="5.0"}'] == lines["jigglypuff_busy_seconds_count"]
+    finally:
+        done.set()
+        thread.join()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process pointer backends: XTEST against an Xvfb server,
+uinput where /dev/uinput is writable, both against fakes of the C
+interfaces on any host, and picking a backend once.
+"""
+
+import ctypes
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, UinputBackend, XTestBackend, backends, get_backend
+
+
+class _FakeLibrary:
+    """Stands in for a ctypes library; every call is logged to ``calls``."""
+
+    def __init__(self, calls, returns):
+        self._calls = calls
+        self._returns = returns
+
+    def __getattr__(self, name):
+        def function(*args):
+            self._calls.append((name, args))
+            return self._returns.get(name, 0)
+        setattr(self, name, function)
+        return function
+
+
+@pytest.fixture
+def fake_x11(monkeypatch):
+    """Fake libX11 and libXtst with one display; yields the list of calls."""
+    calls = []
+    libraries = {
+        "libX11.so.6": _FakeLibrary(calls, {"XOpenDisplay": 0xD15, "XDefaultRootWindow": 0x100}),
+        "libXtst.so.6": _FakeLibrary(calls, {"XTestQueryExtension": 1}),
+    }
+    monkeypatch.setattr(backends, "_find_library", lambda name: f"lib{name}.so.6")
+    monkeypatch.setattr(ctypes.cdll, "LoadLibrary", libraries.__getitem__)
+    yield calls
+
+
+@pytest.fixture
+def fake_uinput(monkeypatch):
+    """Fake /dev/uinput; yields the ioctls and writes made on it, in order."""
+    calls = []
+    monkeypatch.setattr(os, "open", lambda path, flags: calls.append(("open", path, flags)) or 42)
+    monkeypatch.setattr(os, "write", lambda fd, data: calls.append(("write", fd, data)) or len(data))
+    monkeypatch.setattr(os, "close", lambda fd: calls.append(("close", fd)))
+    monkeypatch.setattr(backends.fcntl, "ioctl", lambda fd, request, arg=0: calls.append(("ioctl", request, arg)))
+    yield calls
+
+
+@pytest.fixture
+def xvfb():
+    """A private Xvfb server; yields its display name."""
+    if not shutil.which("Xvfb") or not (backends._find_library("X11") and backends._find_library("Xtst")):
+        pytest.skip("needs Xvfb, libX11 and libXtst")
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "640x480x24", "-nolisten", "tcp"],
+        pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    # Xvfb writes the display number it picked once it accepts connections
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip()
+    try:
+        if not number:
+            pytest.skip("Xvfb did not start")
+        yield f":{number}"
+    finally:
+        server.terminate()
+        server.wait(timeout=5)
+
+
+def test_xtest_moves_the_pointer(xvfb):
+    """Moves shift the real pointer, and a jiggle brings it back."""
+    backend = XTestBackend(xvfb)
+    try:
+        x, y = backend.position()
+        backend.move(5, 2)
+        assert backend.position() == (x + 5, y + 2)
+        backend.jiggle(3)
+        assert backend.position() == (x + 5, y + 2)
+
+        # Moves are queued and flushed without a round trip
+        began = time.perf_counter()
+        for _ in range(500):
+            backend.move(1, 0)
+            backend.move(-1, 0)
+        assert (time.perf_counter() - began) / 1000 < 0.001
+    finally:
+        backend.close()
+
+
+def test_engine_tick_through_xtest(xvfb):
+    """One engine tick moves the pointer out by the offset and home again."""
+    seen = []
+
+    class Watched(XTestBackend):
+        def move(self, dx, dy):
+            super().move(dx, dy)
+            seen.append(self.position())
+
+    probe = XTestBackend(xvfb)
+    before = probe.position()
+    engine = JiggleEngine(Watched(xvfb), interval=5, offset=4)
+    engine.start()
+    deadline = time.monotonic() + 2
+    while engine.ticks < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.stop(timeout=1)
+
+    assert engine.ticks == 1
+    assert seen == [(before[0] + 4, before[1]), before]
+    assert probe.position() == before
+    probe.close()
+
+
+def test_target_display_option(xvfb):
+    """A named target can drive its own X display."""
+    import mcp_server
+
+    result = mcp_server._add_target("xvfb", display=xvfb, interval=5)
+    try:
+        assert "xtest backend" in result
+        assert mcp_server.targets.get("xvfb").backend.display == xvfb
+    finally:
+        mcp_server._remove_target("xvfb")
+    assert "does not take display" in mcp_server._add_target("bad", backend="recording", display=xvfb)
+
+
+def test_unknown_options_are_checked_before_construction(monkeypatch):
+    """A bad option is a ValueError; a TypeError from inside a constructor is not rewritten."""
+    with pytest.raises(ValueError, match="recording backend does not take display"):
+        get_backend("recording", display=":9")
+
+    class Broken(backends.RecordingBackend):
+        def __init__(self, history: int = 10):
+            raise TypeError("bug in the constructor")
+
+    monkeypatch.setitem(backends.BACKENDS, "broken", Broken)
+    with pytest.raises(TypeError, match="bug in the constructor"):
+        get_backend("broken", history=5)
+
+
+def test_xtest_call_sequence(fake_x11):
+    """A move is one fake relative motion and a flush, with no round trip."""
+    backend = XTestBackend(":7")
+    assert fake_x11[0] == ("XOpenDisplay", (b":7",))
+    assert fake_x11[1][0] == "XTestQueryExtension" and fake_x11[1][1][0] == 0xD15
+    del fake_x11[:]
+
+    backend.jiggle(3)
+    assert fake_x11 == [
+        ("XTestFakeRelativeMotionEvent", (0xD15, 3, 0, 0)), ("XFlush", (0xD15,)),
+        ("XTestFakeRelativeMotionEvent", (0xD15, -3, 0, 0)), ("XFlush", (0xD15,)),
+    ]
+    del fake_x11[:]
+    backend.close()
+    backend.close()
+    assert fake_x11 == [("XCloseDisplay", (0xD15,))]
+    with pytest.raises(OSError):
+        backend.move(1, 0)
+
+
+def test_xtest_without_display_or_extension(fake_x11):
+    """A display that cannot be opened, or lacks XTEST, is an OSError and is not leaked."""
+    x11 = ctypes.cdll.LoadLibrary("libX11.so.6")
+    x11._returns["XOpenDisplay"] = 0
+    with pytest.raises(OSError, match="cannot open"):
+        XTestBackend(":9")
+
+    x11._returns["XOpenDisplay"] = 0xD15
+    ctypes.cdll.LoadLibrary("libXtst.so.6")._returns["XTestQueryExtension"] = 0
+    with pytest.raises(OSError, match="no XTEST"):
+        XTestBackend(":9")
+    assert fake_x11[-1] == ("XCloseDisplay", (0xD15,))
+
+
+def test_uinput_ioctls_and_struct_layout(fake_uinput):
+    """Ioctl numbers and structs match <linux/uinput.h> and <linux/input.h>."""
+    assert ctypes.sizeof(backends._UinputSetup) == 92
+    assert backends._UinputSetup.name.offset == 8 and backends._UinputSetup.ff_effects_max.offset == 88
+    assert ctypes.sizeof(backends._InputEvent) == 2 * ctypes.sizeof(ctypes.c_long) + 8
+
+    backend = UinputBackend("/dev/fake-uinput")
+    open_call, *ioctls = fake_uinput
+    assert open_call == ("open", "/dev/fake-uinput", os.O_WRONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+    assert [(request, arg) for _, request, arg in ioctls[:5]] == [
+        (0x40045564, 1),       # UI_SET_EVBIT, EV_KEY
+        (0x40045565, 0x110),   # UI_SET_KEYBIT, BTN_LEFT
+        (0x40045564, 2),       # UI_SET_EVBIT, EV_REL
+        (0x40045566, 0),       # UI_SET_RELBIT, REL_X
+        (0x40045566, 1),       # UI_SET_RELBIT, REL_Y
+    ]
+    request, setup = ioctls[5][1:]
+    assert request == 0x405C5503  # UI_DEV_SETUP
+    assert struct.unpack_from("=4H", setup) == (0x06, 0x1234, 0x5678, 1)
+    assert setup[8:88].rstrip(b"\0") == UinputBackend.device_name.encode()
+    assert ioctls[6][1] == 0x5501  # UI_DEV_CREATE
+    del fake_uinput[:]
+
+    backend.move(5, -2)
+    (kind, fd, data), = fake_uinput
+    assert (kind, fd) == ("write", 42)
+    timeval = 2 * ctypes.sizeof(ctypes.c_long)
+    events = [struct.unpack_from("=HHi", data, offset + timeval)
+              for offset in range(0, len(data), ctypes.sizeof(backends._InputEvent))]
+    assert events == [(2, 0, 5), (2, 1, -2), (0, 0, 0)]
+
+    del fake_uinput[:]
+    backend.close()
+    assert fake_uinput == [("ioctl", 0x5502, 0), ("close", 42)]  # UI_DEV_DESTROY
+    with pytest.raises(OSError):
+        backend.move(1, 0)
+
+
+@pytest.mark.skipif(not UinputBackend.is_available(), reason="needs write access to /dev/uinput")
+def test_uinput_creates_and_removes_a_virtual_pointer():
+    """The virtual mouse exists while the backend is open."""
+    backend = UinputBackend()
+    try:
+        with open("/proc/bus/input/devices") as f:
+            assert UinputBackend.device_name in f.read()
+        backend.jiggle(1)
+    finally:
+        backend.close()
+    with open("/proc/bus/input/devices") as f:
+        assert UinputBackend.device_name not in f.read()
+
+
+def test_auto_backend_is_picked_once(monkeypatch):
+    """The host is probed on the first request only; native fails cleanly without one."""
+    probes = []
+
+    def unavailable(cls):
+        probes.append(cls.name)
+        return False
+
+    for cls in (*backends.NATIVE_BACKENDS.values(), backends.CliclickBackend):
+        monkeypatch.setattr(cls, "is_available", classmethod(unavailable))
+    monkeypatch.setattr(backends, "_chosen", {})
+    monkeypatch.delenv("JIGGLYPUFF_BACKEND", raising=False)
+
+    assert get_backend().name == "recording"
+    assert get_backend("auto").name == "recording"
+    assert probes == ["coregraphics", "xtest", "uinput", "cliclick"]
+
+    with pytest.raises(OSError):
+        get_backend("native")
+    with pytest.raises(ValueError):
+        get_backend("recording", display=":1")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for suspend detection and the low-power timer profile.
+"""
+
+import ctypes
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.metrics import MetricsRegistry
+from jigglypuff.power import PROFILES, PowerProfile, SuspendDetector, get_power_profile
+
+
+class FakeBootClock:
+    """Runs with the monotonic clock, plus whatever time was spent 'suspended'."""
+
+    def __init__(self):
+        self.asleep = 0.0
+
+    def __call__(self):
+        return time.monotonic() + self.asleep
+
+
+def test_suspend_detector_measures_gaps():
+    """Only growth of boot time over monotonic time counts, and only once."""
+    clock = FakeBootClock()
+    detector = SuspendDetector(clock=clock)
+    assert detector.available
+    assert detector.check() == 0.0
+
+    clock.asleep = 120
+    assert 119 < detector.check() < 121
+    assert detector.check() == 0.0
+    assert detector.suspends == 1
+
+    assert not SuspendDetector(clock=lambda: None).available
+    assert SuspendDetector(clock=lambda: None).check() == 0.0
+
+
+def test_engine_replans_after_resume():
+    """After a suspend the engine jiggles right away and counts no missed ticks."""
+    clock = FakeBootClock()
+    backend = RecordingBackend()
+    engine = JiggleEngine(backend, interval=5, offset=1, metrics=MetricsRegistry(),
+                          suspend_detector=SuspendDetector(clock=clock))
+    engine.start()
+    deadline = time.monotonic() + 1
+    while engine.ticks < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    clock.asleep = 3600
+    # A real resume fires the wait's boot-clock backstop; a fake suspend cannot
+    engine._wake.set()
+    deadline = time.monotonic() + 1
+    while engine.ticks < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.stop(timeout=1)
+
+    assert engine.ticks == 2
+    assert engine.missed_ticks == 0
+    assert engine.suspend_detector.suspends == 1
+
+
+def test_low_power_aligns_deadlines():
+    """Deadlines are rounded up to the profile's boundary, never coarser than the interval."""
+    low = PROFILES["low"]
+    assert low.align_up(12.3, 30) == 13.0
+    assert low.align_up(12.3, 0.5) == 12.5
+    assert PROFILES["default"].align_up(12.3, 30) == 12.3
+
+    engine = JiggleEngine(RecordingBackend(), interval=30, offset=1,
+                          metrics=MetricsRegistry(), power=low)
+    due = int(time.monotonic()) + 100.25
+    assert engine._next_due(due) == due - 0.25 + 31
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="per-thread settings are Linux only")
+def test_low_power_profile_applies_to_the_thread():
+    """Timer slack and the nice value change for the calling thread only."""
+    result = {}
+
+    def worker():
+        result["applied"] = PowerProfile("test", timer_slack=0.02, nice=10).apply()
+        # PR_GET_TIMERSLACK
+        result["slack"] = ctypes.CDLL(None).prctl(30, 0, 0, 0, 0)
+        result["nice"] = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert result["applied"] == ["timer_slack", "nice"]
+    assert result["slack"] == 20_000_000
+    assert result["nice"] == 10
+    assert os.getpriority(os.PRIO_PROCESS, threading.get_native_id()) != 10
+
+
+def test_power_profile_lookup(monkeypatch):
+    """Profiles are chosen by name or JIGGLYPUFF_POWER; unknown names are rejected."""
+    monkeypatch.setenv("JIGGLYPUFF_POWER", "low")
+    assert get_power_profile().name == "low"
+    assert get_power_profile("default").align is None
+    with pytest.raises(ValueError):
+        get_power_profile("turbo")
@@ -3,6 +3,7 @@
 Test script to validate the jigglypuff rule compliance tools.
 """
 
+import asyncio
 import sys
 import os
 import subprocess
@@ -19,24 +20,24 @@ def test_rule_compliance_tools():
         
         # Test enable_jiggling_before_tasks
         print("Testing enable_jiggling_before_tasks...")
-        result = mcp_server.enable_jiggling_before_tasks()
+        result = asyncio.run(mcp_server.enable_jiggling_before_tasks())
         print(f"Result: {result}")
         
         # Give it a moment to start
         time.sleep(1)
         
         # Check status
-        status = mcp_server.check_jiggly_status()
+        status = asyncio.run(mcp_server.check_jiggly_status())
         print(f"Status after enabling: {status}")
         assert "jiggling" in status, "Jiggling should be active after enabling"
         
         # Test disable_jiggling_after_tasks
         print("Testing disable_jiggling_after_tasks...")
-        result = mcp_server.disable_jiggling_after_tasks()
+        result = asyncio.run(mcp_server.disable_jiggling_after_tasks())
         print(f"Result: {result}")
         
         # Check status again
-        status = mcp_server.check_jiggly_status()
+        status = asyncio.run(mcp_server.check_jiggly_status())
         print(f"Status after disabling: {status}")
         assert "sleeping" in status, "Jiggling should be inactive after disabling"
         
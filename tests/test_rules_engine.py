@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for the executable rules engine: compiling jigglypuff_rules.json into
+a trigger index, hot reload, and running rules through post_jiggly_event.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from jigglypuff.rules import RuleBook, RulesError, compile_rules
+
+
+def _write(path, rules):
+    with open(path, "w") as f:
+        json.dump({"rules": rules}, f)
+    # Make sure the edit is visible even on coarse mtime filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _rule(name, trigger, tool, **parameters):
+    action = {"type": "mcp_call", "server": "jigglypuff", "tool": tool}
+    if parameters:
+        action["parameters"] = parameters
+    return {"name": name, "trigger": {"type": trigger}, "actions": [action]}
+
+
+def test_shipped_rules_compile():
+    """The repository's rules file maps both task triggers to their tools."""
+    book = RuleBook(os.path.join(ROOT, "jigglypuff_rules.json"))
+
+    start = book.actions_for("task_start")
+    assert [(a.rule, a.tool, a.parameters) for a in start] == [
+        ("enable_jiggling_before_tasks", "wake_up_jiggly", {"interval": 30, "offset": 1})
+    ]
+    assert [a.tool for a in book.actions_for("task_complete")] == ["disable_jiggling_after_tasks"]
+    assert book.actions_for("no_such_trigger") == ()
+
+
+def test_compile_skips_foreign_actions_and_rejects_bad_rules():
+    """Actions for other servers are ignored; malformed rules raise RulesError."""
+    foreign = _rule("other", "task_start", "x")
+    foreign["actions"][0]["server"] = "elsewhere"
+    assert compile_rules({"rules": [foreign]}) == {}
+
+    with pytest.raises(RulesError):
+        compile_rules({"rules": [{"name": "broken", "actions": []}]})
+    with pytest.raises(RulesError):
+        compile_rules({"not_rules": []})
+
+
+def test_hot_reload_and_bad_edits():
+    """Edits take effect without a restart; a broken edit keeps the old rules."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rules.json")
+        _write(path, [_rule("a", "task_start", "wake_up_jiggly")])
+        book = RuleBook(path)
+        assert [a.rule for a in book.actions_for("task_start")] == ["a"]
+
+        # Unchanged file: no re-parse however many events arrive
+        for _ in range(1000):
+            book.actions_for("task_start")
+        assert book.loads == 1
+
+        _write(path, [_rule("b", "task_start", "check_jiggly_status")])
+        assert [a.rule for a in book.actions_for("task_start")] == ["b"]
+        assert book.loads == 2
+
+        with open(path, "w") as f:
+            f.write("{not json")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 2_000_000_000))
+        assert [a.rule for a in book.actions_for("task_start")] == ["b"]
+        assert book.last_error is not None
+
+
+def test_lookup_cost_is_flat_in_rule_count():
+    """Matching an event costs about the same with 10 or 1000 rules."""
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        for count in (10, 1000):
+            path = os.path.join(tmp, f"rules-{count}.json")
+            _write(path, [_rule(f"r{i}", f"trigger_{i}", "check_jiggly_status") for i in range(count)])
+            book = RuleBook(path)
+            book.index()
+            began = time.perf_counter()
+            for i in range(2000):
+                book.actions_for(f"trigger_{i % count}")
+            timings[count] = time.perf_counter() - began
+        assert timings[1000] < timings[10] * 5
+
+
+def test_post_jiggly_event_runs_rules():
+    """Posting task_start/task_complete starts and stops the jiggler."""
+    import mcp_server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rules.json")
+        _write(path, [
+            _rule("start", "task_start", "wake_up_jiggly", interval=30, offset=2),
+            _rule("finish", "task_complete", "put_jiggly_to_sleep"),
+            _rule("typo", "task_complete", "no_such_tool"),
+        ])
+        saved = mcp_server.rulebook
+        mcp_server.rulebook = RuleBook(path)
+        try:
+            result = asyncio.run(mcp_server.post_jiggly_event("task_start"))
+            assert "start: wake_up_jiggly -> jigglypuff started jiggling successfully" in result
+            assert mcp_server.jiggler.running and mcp_server.jiggler.offset == 2
+
+            result = asyncio.run(mcp_server.post_jiggly_event("task_complete"))
+            assert "put to sleep successfully" in result
+            assert "typo: unknown tool no_such_tool" in result
+            assert "No rules for idle" in asyncio.run(mcp_server.post_jiggly_event("idle"))
+
+            listed = json.loads(asyncio.run(mcp_server.get_jigglypuff_rules()))
+            assert [a["tool"] for a in listed["triggers"]["task_start"]] == ["wake_up_jiggly"]
+        finally:
+            mcp_server.rulebook = saved
+            asyncio.run(mcp_server.put_jiggly_to_sleep())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for time-window schedules: edge computation across DST, the single
+timer heap, wall clock changes, and the server driving the jiggler.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import timerfd
+from jigglypuff.schedules import ScheduleManager, parse_days
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_parse_days():
+    assert parse_days("mon-fri") == parse_days("weekdays") == {0, 1, 2, 3, 4}
+    assert parse_days("sat,sun") == parse_days("weekends") == {5, 6}
+    assert parse_days("fri-mon") == {4, 5, 6, 0}
+    assert parse_days("daily") == set(range(7))
+    with pytest.raises(ValueError):
+        parse_days("someday")
+
+
+def test_edges_follow_dst():
+    """A 09:00-17:00 window keeps its local times when the UTC offset changes."""
+    manager = ScheduleManager()
+    window = manager.add_recurring("daily", "09:00", "17:00", 30, 1, tz=NEW_YORK)
+    manager.close()
+
+    # Saturday evening before the March 8 2026 switch to EDT
+    saturday_evening = _utc(2026, 3, 7, 23, 0)
+    assert window.next_edge(saturday_evening) == _utc(2026, 3, 8, 13, 0)   # 09:00 EDT
+    assert window.active_at(_utc(2026, 3, 7, 14, 30))                       # 09:30 EST
+    assert not window.active_at(_utc(2026, 3, 8, 13, 30) - 3600)            # 08:30 EDT
+
+    # And back to EST on November 1 2026
+    assert window.next_edge(_utc(2026, 10, 31, 23, 0)) == _utc(2026, 11, 1, 14, 0)
+
+
+def test_overnight_and_nonexistent_times():
+    """Windows may run past midnight; a start in the spring-forward gap still fires."""
+    manager = ScheduleManager()
+    overnight = manager.add_recurring("mon-fri", "22:00", "06:00", 30, 1, tz=NEW_YORK)
+    gap = manager.add_recurring("sun", "02:30", "04:00", 30, 1, tz=NEW_YORK)
+    manager.close()
+
+    # Friday 22:00 to Saturday 06:00 EST
+    assert overnight.active_at(_utc(2026, 1, 10, 7, 0))       # Sat 02:00 EST
+    assert not overnight.active_at(_utc(2026, 1, 10, 12, 0))  # Sat 07:00 EST
+    # 02:30 does not exist on March 8 2026; the window opens as the clocks jump
+    start = gap.next_edge(_utc(2026, 3, 8, 5, 0))
+    assert _utc(2026, 3, 8, 7, 0) <= start <= _utc(2026, 3, 8, 7, 30)
+    assert gap.next_edge(start) == _utc(2026, 3, 8, 8, 0)     # 04:00 EDT
+
+
+def test_one_off_window_opens_and_closes():
+    """Edges fire from the timer and an expired one-off window is dropped."""
+    changes = []
+    manager = ScheduleManager(on_change=lambda active: changes.append([w.id for w in active]))
+    now = time.time()
+    window = manager.add_once(now + 0.2, now + 0.5, 30, 1)
+    try:
+        assert manager.upcoming()[0][1:] == (window, "start")
+        assert _wait_for(lambda: changes == [[window.id]])
+        assert manager.upcoming()[0][1:] == (window, "end")
+        assert _wait_for(lambda: changes == [[window.id], []])
+        assert manager.windows() == []
+    finally:
+        manager.close()
+
+
+def test_thousands_of_windows_share_one_timer():
+    """Adding many windows is fast and keeps a single timer thread."""
+    manager = ScheduleManager()
+    began = time.perf_counter()
+    try:
+        for i in range(3000):
+            manager.add_recurring("mon-fri", f"{i % 24:02d}:{i % 60:02d}", f"{(i + 1) % 24:02d}:30", 30, 1)
+        elapsed = time.perf_counter() - began
+        # A timerfd watcher thread, or else a monotonic timer (other tests' lease timers
+        # may re-arm meanwhile, so only this manager's count)
+        timers = sum(t is manager._watcher or isinstance(t, threading.Timer)
+                     and getattr(t.function, "__self__", None) is manager
+                     for t in threading.enumerate())
+        upcoming = manager.upcoming(limit=50)
+    finally:
+        manager.close()
+
+    print(f"Added 3000 windows in {elapsed * 1e3:.0f}ms")
+    assert elapsed < 5
+    assert timers <= 1
+    edges = [edge for edge, _, _ in upcoming]
+    assert edges == sorted(edges) and len(edges) == 50
+
+
+@pytest.mark.skipif(not timerfd.available(), reason="timerfd is Linux only")
+def test_no_wakeups_between_edges():
+    """With the next edge an hour away, the timer thread sleeps through."""
+    manager = ScheduleManager()
+    now = time.time()
+    manager.add_once(now + 3600, now + 7200, 30, 1)
+    try:
+        time.sleep(0.1)
+        status = f"/proc/self/task/{manager._watcher.native_id}/status"
+
+        def switches():
+            with open(status) as f:
+                return next(int(line.split()[1]) for line in f if line.startswith("voluntary_ctxt_switches"))
+
+        before = switches()
+        time.sleep(1.0)
+        assert switches() == before
+    finally:
+        manager.close()
+
+
+def test_wall_clock_change_recomputes_edges():
+    """Moving the wall clock forward into a window opens it at once."""
+    skew = [0.0]
+    changes = []
+    manager = ScheduleManager(on_change=lambda active: changes.append(len(active)),
+                              clock=lambda: time.time() + skew[0], max_sleep=0.05)
+    now = time.time()
+    manager.add_once(now + 3600, now + 7200, 30, 1)
+    try:
+        time.sleep(0.1)
+        assert changes == []
+        skew[0] = 3700.0
+        assert _wait_for(lambda: changes == [1])
+        assert manager.clock_changes == 1
+    finally:
+        manager.close()
+
+
+def test_server_jiggles_during_window():
+    """An open window starts the jiggler; its end stops it again."""
+    import mcp_server
+
+    start = datetime.now().astimezone().isoformat()
+    end = datetime.fromtimestamp(time.time() + 0.6).astimezone().isoformat()
+    result = asyncio.run(mcp_server.add_jiggly_schedule(start, end, interval=60, name="batch"))
+    try:
+        assert "window is open now" in result
+        assert mcp_server.jiggler is not None and mcp_server.jiggler.running
+
+        config = json.loads(asyncio.run(mcp_server.get_jigglypuff_config()))
+        assert config["schedules"]["windows"] == 1
+        assert config["schedules"]["upcoming"][0]["transition"] == "end"
+
+        assert _wait_for(lambda: mcp_server.jiggler is None)
+    finally:
+        mcp_server.schedules.clear()
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+
+    bad = asyncio.run(mcp_server.add_jiggly_schedule("09:00", "17:00", days="someday"))
+    assert bad.startswith("Error adding jiggle schedule")
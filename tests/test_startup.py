@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Cold-start budgets for the stdio server.
+
+Editors launch a fresh server per session, so the time to the first
+``initialize`` response is user-visible. Budgets can be relaxed on slow
+machines with JIGGLYPUFF_STARTUP_BUDGET (seconds, wall clock) and
+JIGGLYPUFF_IMPORT_BUDGET_MS (our own modules under -X importtime).
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+STARTUP_BUDGET = float(os.environ.get("JIGGLYPUFF_STARTUP_BUDGET", "3.0"))
+IMPORT_BUDGET_MS = float(os.environ.get("JIGGLYPUFF_IMPORT_BUDGET_MS", "100"))
+
+# Only needed once a client actually uses them
+DEFERRED_MODULES = ("jigglypuff.deadline", "jigglypuff.idle", "jigglypuff.prompts", "http.server")
+
+
+def _import_times() -> dict:
+    """Self time in microseconds of every module imported by mcp_server."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mcp_server"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+\d+ \| (\s*)(\S+)", line)
+        if match:
+            times[match.group(3)] = int(match.group(1))
+    return times
+
+
+def test_main_entry_point_exists():
+    """setup.py's console script points at a real function."""
+    import mcp_server
+
+    assert callable(mcp_server.main)
+
+
+def test_main_does_not_create_a_pointer_backend(monkeypatch):
+    """Starting a server, front-end or not, leaves the backend choice to the first wake-up."""
+    import mcp_server
+    from jigglypuff import backends
+
+    monkeypatch.setattr(backends, "_chosen", {})
+    monkeypatch.setattr(sys, "argv", ["jigglypuff"])
+    monkeypatch.setattr(mcp_server, "install_signal_handlers", lambda cleanup: None)
+    monkeypatch.setattr(mcp_server.mcp, "run", lambda transport: None)
+    created = []
+    monkeypatch.setattr(mcp_server, "get_backend", lambda *args, **kwargs: created.append(args))
+
+    mcp_server.main()
+    assert created == [] and backends._chosen == {}
+
+
+def test_first_initialize_within_budget():
+    """`main` answers initialize within the wall-clock budget."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, JIGGLYPUFF_LOG=os.path.join(tmp, "jiggler.log"))
+        began = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-c", "import mcp_server; mcp_server.main()"],
+            cwd=ROOT, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        try:
+            proc.stdin.write(json.dumps({
+                "jsonrpc": "2.0", "id": 1, "method": "initialize",
+                "params": {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "startup-test", "version": "1.0.0"},
+                },
+            }) + "\n")
+            proc.stdin.flush()
+            response = json.loads(proc.stdout.readline())
+            elapsed = time.perf_counter() - began
+        finally:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+
+    assert response["result"]["serverInfo"]["name"] == "jigglypuff"
+    assert elapsed < STARTUP_BUDGET, f"initialize took {elapsed:.2f}s (budget {STARTUP_BUDGET}s)"
+
+
+def test_import_time_budget():
+    """Our own modules stay cheap to import and lazy ones stay deferred."""
+    times = _import_times()
+    own_ms = sum(
+        us for name, us in times.items() if name == "mcp_server" or name.startswith("jigglypuff")
+    ) / 1000
+
+    assert "mcp_server" in times
+    assert own_ms < IMPORT_BUDGET_MS, f"own modules took {own_ms:.1f}ms (budget {IMPORT_BUDGET_MS}ms)"
+    for module in DEFERRED_MODULES:
+        assert module not in times, f"{module} is imported at startup"
+
+
+def test_registration_is_deferred_until_first_use():
+    """Tools are declared at import and built on the first list."""
+    import asyncio
+    import mcp_server
+
+    tools = asyncio.run(mcp_server.mcp.list_tools())
+    prompts = asyncio.run(mcp_server.mcp.list_prompts())
+    resources = asyncio.run(mcp_server.mcp.list_resources())
+
+    assert not mcp_server.mcp._pending
+    assert {"wake_up_jiggly", "put_jiggly_to_sleep", "check_jiggly_status"} <= {t.name for t in tools}
+    assert {p.name for p in prompts} == {"jigglypuff_help", "jigglypuff_troubleshooting"}
+    assert "jigglypuff-config" in {r.name for r in resources}
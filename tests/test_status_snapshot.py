@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned status snapshot: cached status and config reads,
+invalidation on state changes, and resources/updated notifications.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from jigglypuff.metrics import MetricsRegistry
+from jigglypuff.snapshot import StatusSnapshot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_views_render_once_per_version():
+    """Reads hit the cache until a change or until the cached copy is too old."""
+    renders = []
+
+    def view():
+        renders.append(1)
+        return f"render {len(renders)}"
+
+    clock = Clock()
+    changes = []
+    snapshot = StatusSnapshot({"status": view}, max_age=5, clock=clock, metrics=MetricsRegistry())
+    snapshot.subscribe(lambda version, reason: changes.append((version, reason)))
+
+    assert snapshot.get("status") == "render 1"
+    assert snapshot.get("status") == "render 1"
+    assert len(renders) == 1
+
+    assert snapshot.invalidate("start") == 2
+    assert changes == [(2, "start")]
+    assert snapshot.get("status") == "render 2"
+
+    clock.now = 6
+    assert snapshot.get("status") == "render 3"
+    assert snapshot.version == 2
+
+
+def test_change_during_render_is_not_cached():
+    """A copy rendered across a state change is returned but not kept."""
+    snapshot = None
+    calls = []
+
+    def view():
+        calls.append(1)
+        if len(calls) == 1:
+            snapshot.invalidate("retune")
+        return f"render {len(calls)}"
+
+    snapshot = StatusSnapshot({"config": view}, metrics=MetricsRegistry())
+    assert snapshot.get("config") == "render 1"
+    assert snapshot.get("config") == "render 2"
+    assert snapshot.get("config") == "render 2"
+
+
+def test_server_reads_are_cached_and_changes_bump_the_version():
+    """Start, stop and a crash each give a new version; reads in between are cached."""
+    import mcp_server
+
+    os.environ["JIGGLYPUFF_BACKEND"] = "recording"
+    try:
+        before = mcp_server.snapshot.version
+        asyncio.run(mcp_server.wake_up_jiggly(interval=60))
+        started = mcp_server.snapshot.version
+        assert started > before
+
+        first = asyncio.run(mcp_server.check_jiggly_status())
+        assert "jiggling" in first
+        assert asyncio.run(mcp_server.check_jiggly_status()) is first
+        config = json.loads(asyncio.run(mcp_server.get_jigglypuff_config()))
+        assert config["state_version"] == started and config["last_change"] == "start"
+
+        # A crash reported by the engine changes the state without any tool call
+        session_id = mcp_server.jiggler.session_id
+        mcp_server.jiggler._fail("scheduler crashed: test")
+        assert mcp_server.snapshot.version > started
+        config = json.loads(asyncio.run(mcp_server.get_jigglypuff_config()))
+        assert config["last_change"] == f"session {session_id} failed"
+        assert config["supervisor"]["failures"] == 1
+    finally:
+        del os.environ["JIGGLYPUFF_BACKEND"]
+        asyncio.run(mcp_server.put_jiggly_to_sleep())
+    assert "sleeping" in asyncio.run(mcp_server.check_jiggly_status())
+
+
+def _request(proc, message):
+    proc.stdin.write(json.dumps({"jsonrpc": "2.0", **message}) + "\n")
+    proc.stdin.flush()
+
+
+def test_subscribers_are_notified_over_stdio():
+    """A subscribed client gets resources/updated when the jiggler starts."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, JIGGLYPUFF_LOG=os.path.join(tmp, "jiggler.log"),
+                   JIGGLYPUFF_BACKEND="recording", JIGGLYPUFF_IDLE_SOURCE="none")
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "mcp_server.py")],
+            cwd=ROOT, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        messages = queue.Queue()
+        threading.Thread(target=lambda: [messages.put(json.loads(line)) for line in proc.stdout],
+                         daemon=True).start()
+
+        def receive(match):
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                message = messages.get(timeout=max(0.01, deadline - time.monotonic()))
+                if match(message):
+                    return message
+            raise AssertionError("no matching message")
+
+        try:
+            _request(proc, {"id": 1, "method": "initialize", "params": {
+                "protocolVersion": "2024-11-05", "capabilities": {},
+                "clientInfo": {"name": "snapshot-test", "version": "1.0.0"},
+            }})
+            init = receive(lambda m: m.get("id") == 1)
+            assert init["result"]["capabilities"]["resources"]["subscribe"] is True
+            _request(proc, {"method": "notifications/initialized"})
+
+            _request(proc, {"id": 2, "method": "resources/subscribe",
+                            "params": {"uri": "jigglypuff://status"}})
+            receive(lambda m: m.get("id") == 2)
+
+            _request(proc, {"id": 3, "method": "tools/call",
+                            "params": {"name": "wake_up_jiggly", "arguments": {"interval": 60}}})
+            update = receive(lambda m: m.get("method") == "notifications/resources/updated")
+            assert update["params"]["uri"] == "jigglypuff://status"
+
+            _request(proc, {"id": 4, "method": "resources/read", "params": {"uri": "jigglypuff://status"}})
+            status = receive(lambda m: m.get("id") == 4)
+            assert "jigglypuff is jiggling" in status["result"]["contents"][0]["text"]
+        finally:
+            proc.stdin.close()
+            proc.wait(timeout=10)
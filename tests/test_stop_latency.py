@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+put_jiggly_to_sleep must return well under 100ms at any interval, with the
+shutdown line already in the log.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from jigglypuff import JiggleEngine, JiggleLog, RecordingBackend
+
+STOP_BUDGET = 0.1
+
+INTERVALS = (5, 10, 30, 60, 120, 300)
+
+
+def _last_line(path: str) -> str:
+    with open(path) as f:
+        return f.read().splitlines()[-1]
+
+
+def test_server_stop_latency_across_intervals():
+    """Stopping through the tool takes the same short time from 5s to 300s."""
+    import mcp_server
+
+    latencies = {}
+    for interval in INTERVALS:
+        asyncio.run(mcp_server.wake_up_jiggly(interval, 1))
+        # Stop somewhere inside the interval, not right at a tick
+        time.sleep(random.uniform(0.05, 0.3))
+
+        began = time.perf_counter()
+        result = asyncio.run(mcp_server.put_jiggly_to_sleep())
+        latencies[interval] = time.perf_counter() - began
+
+        assert "put to sleep successfully" in result
+        assert _last_line(mcp_server.jiggle_log.path).endswith(": Mouse jiggler stopped")
+
+    print(f"Stop latency by interval: { {k: round(v * 1e3, 1) for k, v in latencies.items()} } ms")
+    assert max(latencies.values()) < STOP_BUDGET
+
+
+def test_engine_stop_cuts_jiggle_pause_short():
+    """A stop during a jiggle's pause does not wait for the pause to end."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "jiggler.log")
+        backend = RecordingBackend()
+        backend.jiggle_pause = 1.0
+        engine = JiggleEngine(backend, interval=300, offset=1, log=JiggleLog(log_path))
+        engine.start()
+        time.sleep(0.05)  # first jiggle is in its pause
+
+        began = time.perf_counter()
+        assert engine.stop(timeout=5)
+        assert time.perf_counter() - began < STOP_BUDGET
+        assert _last_line(log_path).endswith(": Mouse jiggler stopped")
+        assert (backend.x, backend.y) == (0, 0)
+
+
+def test_engine_stop_does_not_wait_for_helper_teardown():
+    """Closing the pointer helper happens after stop() returns."""
+    from jigglypuff import CliclickBackend
+
+    helper = [sys.executable, "-m", "jigglypuff.cliclick_helper", "--dry-run"]
+    backend = CliclickBackend(helper=helper, pause_ms=0)
+    engine = JiggleEngine(backend, interval=300, offset=1)
+    engine.start()
+    deadline = time.monotonic() + 10
+    while engine.ticks < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pid = backend.coprocess.pid
+
+    began = time.perf_counter()
+    assert engine.stop(timeout=5)
+    assert time.perf_counter() - began < STOP_BUDGET
+
+    # The helper still goes away shortly after
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        raise AssertionError(f"pointer helper {pid} still running")
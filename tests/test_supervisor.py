@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the session supervisor: restarts with backoff after a crash or an
+exited inhibitor, and the crash-loop breaker.
+"""
+
+import os
+import signal
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend
+from jigglypuff.inhibit import Inhibitor
+from jigglypuff.supervisor import Supervisor
+
+STAND_IN_INHIBITOR = ["sh", "-c", "sleep 600 & wait"]
+
+
+class CrashingLog:
+    """Log stand-in whose writes of jiggle lines fail ``crashes`` times."""
+
+    def __init__(self, crashes):
+        self.crashes = crashes
+        self.lines = []
+
+    def write(self, message):
+        if message == "Mouse jiggled" and self.crashes:
+            self.crashes -= 1
+            raise OSError("disk full")
+        self.lines.append(message)
+
+    def flush(self):
+        pass
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_scheduler_crash_is_restarted_with_backoff():
+    """Each crash is restarted after a doubling delay, in the same session."""
+    backend = RecordingBackend()
+    engine = JiggleEngine(backend, interval=0.05, offset=1, log=CrashingLog(crashes=2))
+    supervisor = Supervisor(engine, initial_backoff=0.1, max_backoff=1.0)
+    session_id = engine.session_id
+    engine.start()
+    try:
+        assert _wait_for(lambda: supervisor.failures == 1)
+        assert supervisor.pending and not engine.running
+        assert 0 < supervisor.next_restart_in <= 0.1
+        assert "disk full" in supervisor.last_failure
+
+        assert _wait_for(lambda: supervisor.failures == 2)
+        # Second failure in the window waits twice as long
+        assert 0.1 < supervisor.next_restart_in <= 0.2
+
+        assert _wait_for(lambda: engine.ticks >= 4)
+        assert engine.running
+        assert supervisor.restarts == 2
+        assert supervisor.state == "watching"
+        assert engine.session_id == session_id
+    finally:
+        assert engine.stop(timeout=1)
+    assert not supervisor.pending
+
+
+def test_crash_loop_breaker_gives_up():
+    """A session that keeps failing is left down after max_failures."""
+    engine = JiggleEngine(RecordingBackend(), interval=0.05, offset=1, log=CrashingLog(crashes=100))
+    supervisor = Supervisor(engine, initial_backoff=0.01, max_failures=3, window=60)
+    engine.start()
+    try:
+        assert _wait_for(lambda: supervisor.gave_up)
+        assert supervisor.failures == 4
+        assert supervisor.restarts == 3
+        assert supervisor.state == "gave_up"
+        time.sleep(0.1)
+        assert not engine.running and not supervisor.pending
+    finally:
+        engine.stop(timeout=1)
+
+
+def test_exited_inhibitor_is_restarted():
+    """A killed inhibitor is noticed at once and taken again."""
+    engine = JiggleEngine(RecordingBackend(), interval=1, offset=1, strategy="inhibit",
+                          inhibitor=Inhibitor(STAND_IN_INHIBITOR))
+    supervisor = Supervisor(engine, initial_backoff=0.05)
+    engine.start()
+    try:
+        first = engine.inhibitor.pid
+        os.killpg(first, signal.SIGKILL)
+        assert _wait_for(lambda: supervisor.failures == 1, timeout=1)
+        assert "exited with code -9" in supervisor.last_failure
+
+        assert _wait_for(lambda: engine.running)
+        assert engine.inhibitor.pid != first
+        assert supervisor.restarts == 1
+    finally:
+        assert engine.stop()
+    time.sleep(0.2)
+    # A deliberate stop is not a failure
+    assert supervisor.failures == 1 and not supervisor.pending
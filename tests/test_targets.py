@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for named targets jiggled from one scheduler thread and timer heap.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import RecordingBackend
+from jigglypuff.targets import TargetScheduler
+
+
+class FailingBackend(RecordingBackend):
+    def move(self, dx, dy):
+        raise OSError("display gone")
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _scheduler_threads():
+    return [t for t in threading.enumerate() if t.name == "jigglypuff-targets"]
+
+
+def test_many_targets_share_one_thread():
+    """Hundreds of targets tick on their own intervals from a single thread."""
+    scheduler = TargetScheduler()
+    backends = {f"display-{i}": RecordingBackend() for i in range(200)}
+    try:
+        for i, (name, backend) in enumerate(backends.items()):
+            scheduler.add(name, backend, interval=0.05 if i % 2 else 0.1, offset=1 + i % 3)
+        time.sleep(0.5)
+        assert len(_scheduler_threads()) == 1
+
+        fast = [t.ticks for t in scheduler.targets() if t.interval == 0.05]
+        slow = [t.ticks for t in scheduler.targets() if t.interval == 0.1]
+        assert min(fast) >= 5 and min(slow) >= 3
+        assert sum(fast) > sum(slow)
+    finally:
+        scheduler.close()
+    # Every pointer is back where it started
+    assert all((b.x, b.y) == (0, 0) for b in backends.values())
+
+
+def test_pause_splits_jiggle_without_blocking_others():
+    """A target's pause between its moves does not delay other targets."""
+    scheduler = TargetScheduler()
+    slow = RecordingBackend()
+    slow.jiggle_pause = 0.3
+    fast = RecordingBackend()
+    try:
+        scheduler.add("slow", slow, interval=5, offset=4)
+        scheduler.add("fast", fast, interval=0.02, offset=1)
+        time.sleep(0.2)
+        # The slow target is out, waiting for its return move
+        assert (slow.x, slow.y) == (4, 0)
+        assert fast.jiggles >= 5
+
+        assert scheduler.remove("slow")
+        assert (slow.x, slow.y) == (0, 0)
+    finally:
+        scheduler.close()
+
+
+def test_retune_and_backend_errors():
+    """Retuning takes effect at once; one failing target does not stop the rest."""
+    scheduler = TargetScheduler()
+    backend = RecordingBackend()
+    try:
+        scheduler.add("quiet", backend, interval=300, offset=1)
+        scheduler.add("broken", FailingBackend(), interval=0.02, offset=1)
+        assert _wait_for(lambda: backend.jiggles == 1)
+        scheduler.retune("quiet", 0.02, 2)
+        assert _wait_for(lambda: backend.jiggles >= 3)
+
+        broken = scheduler.get("broken")
+        assert _wait_for(lambda: broken.errors >= 3)
+        assert broken.last_error == "display gone"
+        assert scheduler.retune("missing", 1, 1) is None
+    finally:
+        scheduler.close()
+
+
+def test_server_target_tools():
+    """Targets are added, reported in the config resource and removed through tools."""
+    import mcp_server
+
+    try:
+        result = asyncio.run(mcp_server.add_jiggly_target("vdi-1", backend="recording", interval=5))
+        assert "Target vdi-1 jiggling with the recording backend" in result
+        asyncio.run(mcp_server.add_jiggly_target("vdi-2", backend="recording", interval=600, offset=50))
+
+        config = json.loads(asyncio.run(mcp_server.get_jigglypuff_config()))
+        reported = {t["name"]: t for t in config["targets"]}
+        assert reported["vdi-2"]["interval"] == 300 and reported["vdi-2"]["offset"] == 10
+        assert "2 named targets" in asyncio.run(mcp_server.check_jiggly_status())
+
+        assert "Error adding" in asyncio.run(mcp_server.add_jiggly_target("bad", backend="nope"))
+    finally:
+        asyncio.run(mcp_server.remove_jiggly_target("vdi-1"))
+        asyncio.run(mcp_server.remove_jiggly_target("vdi-2"))
+    assert "No target vdi-1" in asyncio.run(mcp_server.remove_jiggly_target("vdi-1"))
+    assert len(mcp_server.targets) == 0
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for timerfd-backed events: the event semantics, alarms on the boot
+clock, the resume backstop of the engine's waits, and clock-set cancellation.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jigglypuff import JiggleEngine, RecordingBackend, timerfd
+from jigglypuff.metrics import MetricsRegistry
+from jigglypuff.power import PROFILES
+
+pytestmark = pytest.mark.skipif(not timerfd.available(), reason="timerfd is Linux only")
+
+
+def test_behaves_like_an_event():
+    """Timeouts, set and clear work as with threading.Event."""
+    event = timerfd.TimerEvent(backstop=0.01)
+    began = time.monotonic()
+    assert not event.wait(0.05)
+    assert 0.05 <= time.monotonic() - began < 0.5
+
+    threading.Timer(0.05, event.set).start()
+    assert event.wait(5) and event.is_set()
+    assert event.wait(0)
+    event.clear()
+    assert not event.is_set() and not event.wait(0.01)
+    event.close()
+
+
+def test_alarm_on_the_boot_clock():
+    """An alarm ends an otherwise unbounded wait at its time on the timer's clock."""
+    event = timerfd.TimerEvent(timerfd.CLOCK_BOOTTIME)
+    began = time.monotonic()
+    assert not event.wait(alarm=time.clock_gettime(time.CLOCK_BOOTTIME) + 0.05)
+    assert 0.05 <= time.monotonic() - began < 0.5
+    assert not event.clock_was_set
+    event.close()
+
+
+def test_engine_waits_have_a_boot_clock_backstop():
+    """The scheduler's waits sit just past the deadline and the timer slack, so they add no wakeups."""
+    engine = JiggleEngine(RecordingBackend(), interval=30, offset=1, metrics=MetricsRegistry(),
+                          power=PROFILES["low"])
+    assert isinstance(engine._wake, timerfd.TimerEvent)
+    assert engine._wake.clock == timerfd.CLOCK_BOOTTIME
+    assert engine._wake.backstop == pytest.approx(PROFILES["low"].timer_slack + 0.01)
+
+
+def test_setting_the_clock_cancels_a_realtime_alarm():
+    """With cancel_on_set, a wall clock change ends the wait and is reported."""
+    event = timerfd.TimerEvent(timerfd.CLOCK_REALTIME, cancel_on_set=True)
+    result = {}
+
+    def wait():
+        result["set"] = event.wait(alarm=time.time() + 3600)
+        result["clock_was_set"] = event.clock_was_set
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.1)
+    try:
+        # Setting the clock to the time it already shows still counts as a change
+        time.clock_settime(time.CLOCK_REALTIME, time.clock_gettime(time.CLOCK_REALTIME))
+    except PermissionError:
+        event.set()
+        thread.join(5)
+        pytest.skip("needs CAP_SYS_TIME")
+    thread.join(5)
+    assert result == {"set": False, "clock_was_set": True}
+    event.close()